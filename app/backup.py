@@ -0,0 +1,197 @@
+"""
+Backup online al bazei SQLite, fără a bloca scrierile aplicației.
+
+Copia este făcută cu API-ul de backup SQLite (`Connection.backup`) în pași
+mici de pagini, cu o pauză între pași ca traficul live să aibă prioritate.
+Dacă baza se modifică atât de des încât backup-ul o ia mereu de la capăt,
+se trece la `VACUUM INTO` (un singur instantaneu de citire; în modul WAL nu
+blochează scriitorii). Copia e verificată cu `PRAGMA integrity_check` și abia
+apoi redenumită atomic în `backup_dir`; backup-urile mai vechi de
+`backup_retain_days` zile sunt șterse.
+
+Rulare manuală: `python -m app.backup` (citește configs/app.yaml).
+"""
+import glob
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from app import db, metrics
+
+log = logging.getLogger("bodai.backup")
+
+BACKUP_DIR: str = "backups"
+RETAIN_DAYS: float = 14
+# la câte ore rulează backup-ul în fundal (0 = doar manual)
+INTERVAL_HOURS: float = 0
+# pagini copiate per pas și pauza dintre pași (cedează conexiunilor aplicației)
+PAGES_PER_STEP: int = 256
+STEP_PAUSE: float = 0.005
+# de câte ori poate reporni copia incrementală înainte de VACUUM INTO
+MAX_RESTARTS: int = 3
+
+PREFIX = "bodai_"
+
+BACKUPS = metrics.Counter("bodai_backups_total", "Backup-uri ale bazei de date, după rezultat.", ["result"])
+BACKUP_SECONDS = metrics.Histogram(
+    "bodai_backup_seconds", "Durata unui backup (copiere + verificare).",
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+_last_success = 0.0
+metrics.Gauge("bodai_backup_last_success_timestamp", "Momentul ultimului backup reușit (epoch).",
+              lambda: _last_success)
+
+
+class BackupError(Exception):
+    pass
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def configure(cfg: dict) -> None:
+    """Aplică secțiunea `database` din configs/app.yaml."""
+    global BACKUP_DIR, RETAIN_DAYS, INTERVAL_HOURS
+    BACKUP_DIR = cfg.get("backup_dir", BACKUP_DIR).rstrip("/") or BACKUP_DIR
+    RETAIN_DAYS = cfg.get("backup_retain_days", RETAIN_DAYS)
+    INTERVAL_HOURS = cfg.get("backup_interval_hours", INTERVAL_HOURS)
+
+
+def _copy_incremental(src: sqlite3.Connection, dst: sqlite3.Connection) -> None:
+    restarts = 0
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal restarts, last_remaining
+        # „remaining” crește doar când altă conexiune a scris și copia a repornit
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > MAX_RESTARTS:
+                raise _TooManyRestarts()
+        last_remaining = remaining
+        if STEP_PAUSE:
+            time.sleep(STEP_PAUSE)
+
+    src.backup(dst, pages=PAGES_PER_STEP, progress=progress)
+
+
+def _verify(path: str) -> None:
+    conn = sqlite3.connect(path)
+    try:
+        result = conn.execute("PRAGMA integrity_check").fetchall()
+        # copia e un fișier de sine stătător, fără jurnal WAL alăturat
+        conn.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        conn.close()
+    if result != [("ok",)]:
+        raise BackupError(f"Verificarea integrității a eșuat: {result[:5]}")
+
+
+def backup(dest_dir: Optional[str] = None) -> str:
+    """Creează un backup verificat și returnează calea lui."""
+    global _last_success
+    dest_dir = dest_dir or BACKUP_DIR
+    os.makedirs(dest_dir, exist_ok=True)
+    final = os.path.join(dest_dir, f"{PREFIX}{time.strftime('%Y-%m-%d_%H%M%S')}.sqlite3")
+    tmp = final + ".tmp"
+    started = time.perf_counter()
+    # conexiune separată: nu împarte tranzacții cu firele aplicației
+    src = sqlite3.connect(db.DB_PATH, isolation_level=None)
+    try:
+        src.execute(f"PRAGMA busy_timeout={db.PRAGMAS['busy_timeout']}")
+        dst = sqlite3.connect(tmp)
+        try:
+            try:
+                _copy_incremental(src, dst)
+                method = "backup"
+            except _TooManyRestarts:
+                dst.close()
+                os.remove(tmp)
+                src.execute("VACUUM INTO ?", (tmp,))
+                method = "vacuum_into"
+        finally:
+            dst.close()
+        _verify(tmp)
+        os.replace(tmp, final)
+    except BaseException:
+        BACKUPS.inc("error")
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    finally:
+        src.close()
+    elapsed = time.perf_counter() - started
+    BACKUP_SECONDS.observe(elapsed)
+    BACKUPS.inc(method)
+    _last_success = time.time()
+    log.info("Backup %s creat (%s, %.2fs).", final, method, elapsed)
+    return final
+
+
+def prune(dest_dir: Optional[str] = None, retain_days: Optional[float] = None) -> int:
+    """Șterge backup-urile mai vechi de `retain_days` zile; returnează câte au fost șterse."""
+    dest_dir = dest_dir or BACKUP_DIR
+    retain_days = RETAIN_DAYS if retain_days is None else retain_days
+    cutoff = time.time() - retain_days * 86400
+    removed = 0
+    for path in glob.glob(os.path.join(dest_dir, f"{PREFIX}*.sqlite3")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def run() -> str:
+    """Backup + curățarea backup-urilor expirate."""
+    path = backup()
+    prune()
+    return path
+
+# -------------------- PROGRAMARE --------------------
+
+_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def _loop(interval: float) -> None:
+    while not _stop.wait(interval):
+        try:
+            run()
+        except Exception as e:  # un eșec nu oprește backup-urile următoare
+            log.warning("Backup-ul a eșuat: %s", e)
+
+
+def start(interval_hours: Optional[float] = None) -> None:
+    """Rulează backup-ul periodic, pe un fir de fundal."""
+    global _thread
+    interval_hours = INTERVAL_HOURS if interval_hours is None else interval_hours
+    if interval_hours <= 0 or (_thread is not None and _thread.is_alive()):
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, args=(interval_hours * 3600,), name="backup", daemon=True)
+    _thread.start()
+
+
+def stop() -> None:
+    """Oprește firul backup-ului și așteaptă terminarea lui (un start() ulterior pornește unul nou)."""
+    global _thread
+    _stop.set()
+    if _thread is not None and _thread is not threading.current_thread():
+        _thread.join()
+    _thread = None
+
+
+if __name__ == "__main__":
+    import yaml
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    with open("configs/app.yaml", encoding="utf-8") as f:
+        configure(yaml.safe_load(f).get("database", {}))
+    print(run())
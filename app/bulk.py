@@ -0,0 +1,166 @@
+"""
+Import/export în bloc, în format NDJSON (un obiect JSON per linie).
+
+Tipuri de înregistrări:
+    {"type": "memory",  "text": ..., "timestamp": ..., "user_id": ..., "id": ...}
+    {"type": "profile", "category": ..., "info": ..., "timestamp": ..., "user_id": ..., "id": ...}
+    {"type": "context", "session_id": ..., "role": "user"|"bot", "text": ...}
+
+Exportul citește SQLite pe pagini (keyset) și produce text incremental.
+Importul are două etape: întâi toate liniile sunt citite și validate, iar
+rândurile de scris sunt puse într-un fișier temporar (nu în RAM, nu în
+SQLite); abia după ultima linie sunt scrise cu `executemany`, în tranzacții
+de câte COMMIT_EVERY rânduri. Astfel lock-ul de scriere nu e ținut cât timp
+clientul încă trimite date, iar o linie invalidă sau o deconectare opresc
+importul înainte de orice scriere. Indexurile din RAM ale utilizatorilor
+atinși sunt reconstruite o singură dată, la următoarea utilizare.
+La import, `id`-urile din fișier sunt ignorate (rândurile primesc id-uri noi).
+"""
+import json
+import tempfile
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from app import context, db
+
+TYPES = ("memory", "profile", "context")
+_decode = json.JSONDecoder().decode
+# rânduri per executemany la import și per pagină la export
+CHUNK_SIZE = 10000
+# rânduri per tranzacție la import (cât de des e eliberat lock-ul de scriere)
+COMMIT_EVERY = 50000
+
+
+class ImportAborted(Exception):
+    """Sursa importului s-a întrerupt (de ex. clientul s-a deconectat); nimic nu e scris."""
+
+# -------------------- EXPORT --------------------
+
+def _page(table: str, columns: str, user_id: Optional[str]):
+    where = "id>?" if user_id is None else "user_id=? AND id>?"
+
+    def fetch(after_id: int, limit: int):
+        params = (after_id, limit) if user_id is None else (user_id, after_id, limit)
+        return db.connection().execute(
+            f"SELECT {columns} FROM {table} WHERE {where} ORDER BY id LIMIT ?", params
+        ).fetchall()
+    return fetch
+
+
+def export_records(user_id: Optional[str] = None, types: Sequence[str] = TYPES,
+                   session_ids: Sequence[str] = ()) -> Iterator[List[dict]]:
+    """Înregistrările de exportat, în loturi (o pagină SQLite per lot)."""
+    if "memory" in types:
+        for rows in db.iter_pages(_page("memory", "id, text, timestamp, user_id", user_id), 0, CHUNK_SIZE):
+            yield [{"type": "memory", "id": r[0], "text": r[1], "timestamp": r[2], "user_id": r[3]} for r in rows]
+    if "profile" in types:
+        for rows in db.iter_pages(_page("user_profile", "id, category, info, timestamp, user_id", user_id),
+                                  0, CHUNK_SIZE):
+            yield [{"type": "profile", "id": r[0], "category": r[1], "info": r[2], "timestamp": r[3],
+                    "user_id": r[4]} for r in rows]
+    if "context" in types:
+        for sid in session_ids:
+            yield [{"type": "context", "session_id": sid, **entry} for entry in context.get_context(sid)]
+
+
+def to_ndjson(batches: Iterable[List[dict]]) -> Iterator[str]:
+    """Un bloc de text NDJSON per lot."""
+    for batch in batches:
+        if batch:
+            yield "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in batch)
+
+# -------------------- IMPORT --------------------
+
+def parse_ndjson(lines: Iterable[bytes]) -> Iterator[dict]:
+    """Parsează liniile NDJSON (liniile goale sunt ignorate); ValueError cu numărul liniei."""
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = _decode(line.decode("utf-8"))
+        except ValueError as e:
+            raise ValueError(f"Linia {lineno}: JSON invalid ({e})") from None
+        if not isinstance(record, dict) or record.get("type") not in TYPES:
+            raise ValueError(f"Linia {lineno}: tip de înregistrare necunoscut.")
+        yield record
+
+
+def import_records(records: Iterable[dict], default_user: str = db.DEFAULT_USER) -> Dict[str, int]:
+    """
+    Validează toate înregistrările, apoi le scrie în tranzacții de câte
+    COMMIT_EVERY rânduri. Memoria folosită nu depinde de numărul de
+    înregistrări (doar de numărul de sesiuni atinse). O eroare de scriere
+    SQLite (de ex. disc plin) poate lăsa confirmate tranzacțiile de dinainte.
+    Returnează câte rânduri au fost importate, pe tip.
+    """
+    now = int(time.time())
+    stats = {t: 0 for t in TYPES}
+    # contează doar ultimele MAX_CONTEXT mesaje ale fiecărei sesiuni
+    sessions: Dict[str, Deque[dict]] = {}
+
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as spool:
+        for record in records:
+            kind = record["type"]
+            try:
+                if kind == "memory":
+                    row = [kind, str(record["text"]), int(record.get("timestamp") or now),
+                           str(record.get("user_id") or default_user)]
+                elif kind == "profile":
+                    row = [kind, record.get("category"), str(record["info"]), int(record.get("timestamp") or now),
+                           str(record.get("user_id") or default_user)]
+                else:
+                    sid = str(record.get("session_id") or default_user)
+                    sessions.setdefault(sid, deque(maxlen=context.MAX_CONTEXT)).append(
+                        {"role": str(record["role"]), "text": str(record["text"])}
+                    )
+                    continue
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"Înregistrare {kind} invalidă: {e!r}") from None
+            spool.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+        spool.seek(0)
+        batch: List[list] = []
+        for line in spool:
+            batch.append(_decode(line))
+            if len(batch) >= COMMIT_EVERY:
+                _write_rows(batch, stats)
+                batch.clear()
+        _write_rows(batch, stats)
+
+    for sid, entries in sessions.items():
+        for entry in entries:
+            context.add_message(entry["role"], entry["text"], sid)
+        stats["context"] += len(entries)
+    return stats
+
+
+def _write_rows(rows: List[list], stats: Dict[str, int]) -> None:
+    """Scrie rândurile validate (memory/profile) într-o singură tranzacție scurtă."""
+    if not rows:
+        return
+    memories = [tuple(r[1:]) for r in rows if r[0] == "memory"]
+    profile = [tuple(r[1:]) for r in rows if r[0] == "profile"]
+    users_mem = {r[-1] for r in memories}
+    users_prof = {r[-1] for r in profile}
+    try:
+        with db.transaction() as conn, db.fts_deferred(conn):
+            for start in range(0, len(memories), CHUNK_SIZE):
+                conn.executemany("INSERT INTO memory (text, timestamp, user_id) VALUES (?, ?, ?)",
+                                 memories[start:start + CHUNK_SIZE])
+            for start in range(0, len(profile), CHUNK_SIZE):
+                conn.executemany("INSERT INTO user_profile (category, info, timestamp, user_id) VALUES (?, ?, ?, ?)",
+                                 profile[start:start + CHUNK_SIZE])
+            db.record_changes(conn, "memory_reset", ((uid, None) for uid in users_mem))
+            db.record_changes(conn, "profile", ((uid, None) for uid in users_prof))
+    finally:
+        # indexurile sunt reconstruite o singură dată, din SQLite, la următoarea utilizare
+        for uid in users_mem:
+            db.memory_indexes.discard(uid)
+            db.bump_version("memory", uid)
+        for uid in users_prof:
+            db.profile_cache.invalidate(uid)
+            db.bump_version("profile", uid)
+    stats["memory"] += len(memories)
+    stats["profile"] += len(profile)
@@ -0,0 +1,92 @@
+"""
+Notificări de modificare între procese, prin tabela SQLite `change_log`.
+
+În modul multi-worker (`server.workers` > 1) fiecare proces își ține
+propriile cache-uri (indexuri de amintiri, profiluri, KB). Orice scriere
+adaugă, în aceeași tranzacție, o intrare în `change_log` (tip, cheie,
+referință, procesul de origine). Celelalte procese citesc periodic
+intrările noi (o interogare pe cheia primară) și își actualizează
+cache-urile prin handler-ele înregistrate cu `on()`.
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+# activat de main.py când rulează mai mulți workeri
+ENABLED: bool = False
+# cât de des (secunde) verifică un proces modificările celorlalți
+SYNC_INTERVAL: float = 0.05
+# intrările mai vechi de atât (secunde) sunt șterse; un worker nu rămâne niciodată atât în urmă
+RETAIN_SECONDS: float = 3600.0
+PRUNE_INTERVAL: float = 60.0
+
+# identifică procesul curent; propriile modificări nu sunt reaplicate
+ORIGIN: str = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+Handler = Callable[[Optional[str], Optional[int]], None]
+_handlers: Dict[str, Handler] = {}
+_lock = threading.Lock()
+_last_seq: Optional[int] = None
+_last_sync = 0.0
+_last_prune = 0.0
+
+
+def on(kind: str, handler: Handler) -> None:
+    """Înregistrează funcția apelată cu (cheie, referință) pentru modificările de tipul `kind`."""
+    _handlers[kind] = handler
+
+
+def record(conn: sqlite3.Connection, kind: str, key: Optional[str] = None, ref: Optional[int] = None) -> None:
+    """Notează o modificare, în tranzacția apelantului (nimic dacă modul e dezactivat)."""
+    if ENABLED:
+        conn.execute(
+            "INSERT INTO change_log (kind, key, ref, origin, created_at) VALUES (?, ?, ?, ?, ?)",
+            (kind, key, ref, ORIGIN, time.time()),
+        )
+
+
+def record_many(conn: sqlite3.Connection, kind: str, items: Iterable[Tuple[Optional[str], Optional[int]]]) -> None:
+    """Ca `record`, pentru mai multe (cheie, referință) cu un singur executemany."""
+    if ENABLED:
+        now = time.time()
+        conn.executemany(
+            "INSERT INTO change_log (kind, key, ref, origin, created_at) VALUES (?, ?, ?, ?, ?)",
+            ((kind, key, ref, ORIGIN, now) for key, ref in items),
+        )
+
+
+def sync(conn: sqlite3.Connection, force: bool = False) -> int:
+    """
+    Aplică modificările făcute de alte procese de la ultima verificare
+    (cel mult o dată la `SYNC_INTERVAL`). Returnează câte au fost aplicate.
+    """
+    global _last_seq, _last_sync, _last_prune
+    if not ENABLED:
+        return 0
+    now = time.monotonic()
+    if not force and now - _last_sync < SYNC_INTERVAL:
+        return 0
+    with _lock:
+        _last_sync = now
+        if _last_seq is None:
+            # la pornire, cache-urile sunt goale: istoricul nu contează
+            _last_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+            return 0
+        rows = conn.execute(
+            "SELECT seq, kind, key, ref, origin FROM change_log WHERE seq > ? ORDER BY seq", (_last_seq,)
+        ).fetchall()
+        if rows:
+            _last_seq = rows[-1][0]
+        if now - _last_prune > PRUNE_INTERVAL:
+            _last_prune = now
+            conn.execute("DELETE FROM change_log WHERE created_at < ?", (time.time() - RETAIN_SECONDS,))
+    applied = 0
+    for _, kind, key, ref, origin in rows:
+        handler = _handlers.get(kind)
+        if origin != ORIGIN and handler is not None:
+            handler(key, ref)
+            applied += 1
+    return applied
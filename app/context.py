@@ -1,51 +1,277 @@
-from collections import deque
-from typing import Deque, Dict, List
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+import atexit
+import hashlib
 import json
+import logging
 import os
+import queue
+import re
+import threading
+
+from app import db
+
+log = logging.getLogger("bodai.context")
 
 MAX_CONTEXT: int = 10
-CONTEXT_FILE: str = "data/context.json"
+# câte sesiuni active sunt ținute în RAM; cele mai vechi sunt evacuate (rămân pe disc)
+MAX_SESSIONS: int = 1000
+DEFAULT_SESSION: str = "default"
+# "file": jurnale JSONL + deque în RAM (un singur proces);
+# "sqlite": tabela context_log, comună tuturor proceselor worker
+BACKEND: str = "file"
+
+# jurnal append-only al sesiunii implicite: o linie JSON per mesaj
+CONTEXT_FILE: str = "data/context.jsonl"
+# jurnalele celorlalte sesiuni: data/context/<session_id>.jsonl
+CONTEXT_DIR: str = "data/context"
+# formatul vechi (listă JSON rescrisă complet la fiecare mesaj), migrat la încărcare;
+# după migrare fișierul e redenumit cu sufixul MIGRATED_SUFFIX (nu mai e citit)
+LEGACY_CONTEXT_FILE: str = "data/context.json"
+MIGRATED_SUFFIX: str = ".migrated"
+
+# cât așteaptă scriitorul pentru a grupa mai multe mesaje într-o singură scriere
+FLUSH_INTERVAL: float = 0.25
+# după câte linii adăugate un jurnal e compactat la ultimele MAX_CONTEXT mesaje
+COMPACT_EVERY: int = 500
+
+# session_id -> deque; fiecare element are forma {"role": "user"|"bot", "text": "..."}
+_sessions: "OrderedDict[str, Deque[Dict[str, str]]]" = OrderedDict()
+_sessions_lock = threading.Lock()
 
-# fiecare element are forma {"role": "user"|"bot", "text": "..."}
-context_memory: Deque[Dict[str, str]] = deque(maxlen=MAX_CONTEXT)
+_SAFE_SESSION = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
 
 
 # ------------------- FUNCȚII DE BAZĂ -------------------
 
-def add_message(role: str, text: str) -> None:
-    """Adaugă un mesaj (user/bot) în memorie și salvează în fișier"""
-    context_memory.append({"role": role, "text": text})
-    save_context()
+def add_message(role: str, text: str, session_id: str = DEFAULT_SESSION) -> None:
+    """Adaugă un mesaj (user/bot) în sesiune; scrierea pe disc se face în fundal"""
+    if BACKEND == "sqlite":
+        db.add_context_entry(session_id, role, text, MAX_CONTEXT)
+        return
+    entry = {"role": role, "text": text}
+    _session(session_id).append(entry)
+    _writer.submit(("append", session_id, entry))
+
+
+def get_context(session_id: str = DEFAULT_SESSION) -> List[Dict[str, str]]:
+    """Returnează lista conversațiilor recente ale sesiunii"""
+    if BACKEND == "sqlite":
+        return [{"role": role, "text": text} for role, text in db.get_context_entries(session_id, MAX_CONTEXT)]
+    return list(_session(session_id))
+
+
+def clear_context(session_id: str = DEFAULT_SESSION) -> None:
+    """Șterge complet memoria conversațională a sesiunii (RAM + fișier)"""
+    if BACKEND == "sqlite":
+        db.clear_context_entries(session_id)
+        return
+    _session(session_id).clear()
+    _writer.submit(("clear", session_id, None))
 
 
-def get_context() -> List[Dict[str, str]]:
-    """Returnează lista conversațiilor recente"""
-    return list(context_memory)
+def active_sessions() -> int:
+    """Numărul de sesiuni ținute în RAM"""
+    return len(_sessions)
 
 
-def clear_context() -> None:
-    """Șterge complet memoria conversațională (RAM + fișier)"""
-    context_memory.clear()
-    if os.path.exists(CONTEXT_FILE):
-        os.remove(CONTEXT_FILE)
+def _session(session_id: str) -> Deque[Dict[str, str]]:
+    """Returnează deque-ul sesiunii (LRU), încărcându-l de pe disc la nevoie"""
+    with _sessions_lock:
+        dq = _sessions.get(session_id)
+        if dq is not None:
+            _sessions.move_to_end(session_id)
+            return dq
+    dq = deque(_load_entries(session_id), maxlen=MAX_CONTEXT)
+    with _sessions_lock:
+        # alt fir ar fi putut încărca sesiunea între timp
+        dq = _sessions.setdefault(session_id, dq)
+        _sessions.move_to_end(session_id)
+        while len(_sessions) > MAX_SESSIONS:
+            # jurnalul e deja pe disc, deci evacuarea doar eliberează RAM-ul
+            _sessions.popitem(last=False)
+    return dq
+
+
+def session_file(session_id: str) -> str:
+    """Calea jurnalului unei sesiuni"""
+    if session_id == DEFAULT_SESSION:
+        return CONTEXT_FILE
+    name = session_id if _SAFE_SESSION.match(session_id) else hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+    return os.path.join(CONTEXT_DIR, name + ".jsonl")
 
 
 # ------------------- PERSISTENȚĂ -------------------
 
-def save_context() -> None:
-    """Salvează conversația actuală în fișier JSON"""
-    os.makedirs(os.path.dirname(CONTEXT_FILE), exist_ok=True)
-    with open(CONTEXT_FILE, "w", encoding="utf-8") as f:
-        json.dump(list(context_memory), f, indent=2, ensure_ascii=False)
+class _ContextWriter:
+    """
+    Fir de fundal care adaugă mesajele în jurnalele JSONL ale sesiunilor.
+    Mesajele sosite în aceeași fereastră `FLUSH_INTERVAL` sunt scrise
+    cu o singură operație per fișier; compactarea folosește un fișier
+    temporar și `os.replace`, deci fișierul de pe disc este mereu complet.
+    """
+
+    def __init__(self) -> None:
+        self._queue: "queue.Queue[Tuple[str, str, Optional[Dict[str, str]]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._since_compact: Dict[str, int] = {}
+        # session_id -> operații trimise dar încă nescrise
+        self._pending: Dict[str, int] = {}
+        self._pending_lock = threading.Lock()
+
+    def submit(self, op: Tuple[str, str, Optional[Dict[str, str]]]) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="context-writer", daemon=True)
+                    self._thread.start()
+        with self._pending_lock:
+            self._pending[op[1]] = self._pending.get(op[1], 0) + 1
+        self._queue.put(op)
+
+    def has_pending(self, session_id: str) -> bool:
+        return bool(self._pending.get(session_id))
+
+    def flush(self) -> None:
+        """Blochează până când toate mesajele trimise au ajuns pe disc."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while True:
+                    batch.append(self._queue.get(timeout=FLUSH_INTERVAL))
+            except queue.Empty:
+                pass
+            try:
+                self._write(batch)
+            except Exception as e:
+                log.warning("Eroare la salvarea contextului: %s", e)
+            finally:
+                with self._pending_lock:
+                    for _, session_id, _ in batch:
+                        left = self._pending.get(session_id, 1) - 1
+                        if left > 0:
+                            self._pending[session_id] = left
+                        else:
+                            self._pending.pop(session_id, None)
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch: List[Tuple[str, str, Optional[Dict[str, str]]]]) -> None:
+        # per sesiune: după un "clear", doar mesajele ulterioare mai contează
+        pending: Dict[str, List[Dict[str, str]]] = {}
+        truncate = set()
+        for kind, session_id, entry in batch:
+            if kind == "clear":
+                pending[session_id] = []
+                truncate.add(session_id)
+            elif entry is not None:
+                pending.setdefault(session_id, []).append(entry)
 
+        for session_id, entries in pending.items():
+            path = session_file(session_id)
+            if session_id in truncate and os.path.exists(path):
+                os.remove(path)
+                self._since_compact.pop(session_id, None)
+            if session_id in truncate and session_id == DEFAULT_SESSION and os.path.exists(LEGACY_CONTEXT_FILE):
+                # migrarea nu a avut loc (sau a eșuat): contextul vechi e șters odată cu sesiunea
+                os.replace(LEGACY_CONTEXT_FILE, LEGACY_CONTEXT_FILE + MIGRATED_SUFFIX)
+            if not entries:
+                continue
 
-def load_context() -> None:
-    """Încarcă ultimul context din fișier, dacă există"""
-    if os.path.exists(CONTEXT_FILE):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries))
+            count = self._since_compact.get(session_id, 0) + len(entries)
+            if count >= COMPACT_EVERY:
+                compact_context(session_id)
+                count = 0
+            self._since_compact[session_id] = count
+
+
+_writer = _ContextWriter()
+
+
+def flush_context() -> None:
+    """Așteaptă scrierea pe disc a mesajelor în curs (la oprire sau în teste)"""
+    _writer.flush()
+
+
+atexit.register(flush_context)
+
+
+def compact_context(session_id: str = DEFAULT_SESSION) -> None:
+    """Rescrie jurnalul sesiunii cu ultimele MAX_CONTEXT mesaje, atomic (tmp + rename)"""
+    path = session_file(session_id)
+    entries = _tail_entries(path, MAX_CONTEXT)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries))
+    os.replace(tmp, path)
+
+
+def _tail_entries(path: str, n: int, block: int = 8192) -> List[Dict[str, str]]:
+    """Citește doar ultimele `n` linii ale jurnalului, de la coadă spre început."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b""
+        while pos > 0 and data.count(b"\n") <= n:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    entries: List[Dict[str, str]] = []
+    for line in data.splitlines()[-n:]:
         try:
-            with open(CONTEXT_FILE, "r", encoding="utf-8") as f:
-                data: List[Dict[str, str]] = json.load(f)
-                context_memory.extend(data[-MAX_CONTEXT:])
-                print(f"[INFO] Context încărcat: {len(data)} mesaje.")
-        except Exception as e:
-            print(f"[WARN] Eroare la încărcarea contextului: {e}")
+            entries.append(json.loads(line))
+        except ValueError:
+            continue  # linie trunchiată (de ex. oprire în timpul scrierii)
+    return entries
+
+
+def _load_entries(session_id: str) -> List[Dict[str, str]]:
+    """Ultimele MAX_CONTEXT mesaje ale sesiunii de pe disc (lista goală dacă nu există)"""
+    path = session_file(session_id)
+    try:
+        if _writer.has_pending(session_id):
+            # sesiune evacuată cu mesaje încă nescrise: rar, doar imediat după evacuare
+            _writer.flush()
+        if os.path.exists(path):
+            return _tail_entries(path, MAX_CONTEXT)
+        if session_id == DEFAULT_SESSION and os.path.exists(LEGACY_CONTEXT_FILE):
+            return _migrate_legacy(path)
+    except Exception as e:
+        log.warning("Eroare la încărcarea contextului: %s", e)
+    return []
+
+
+def _migrate_legacy(path: str) -> List[Dict[str, str]]:
+    """
+    Mută contextul din formatul vechi în jurnalul sesiunii implicite, atomic,
+    apoi redenumește fișierul vechi: altfel ar fi migrat din nou după fiecare
+    ștergere a contextului, iar mesajele șterse ar reapărea.
+    """
+    with open(LEGACY_CONTEXT_FILE, "r", encoding="utf-8") as f:
+        data = json.load(f)[-MAX_CONTEXT:]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in data))
+    os.replace(tmp, path)
+    os.replace(LEGACY_CONTEXT_FILE, LEGACY_CONTEXT_FILE + MIGRATED_SUFFIX)
+    log.info("Context migrat din %s (%d mesaje).", LEGACY_CONTEXT_FILE, len(data))
+    return data
+
+
+def load_context(session_id: str = DEFAULT_SESSION) -> None:
+    """Încarcă ultimul context al sesiunii din jurnal (doar ultimele MAX_CONTEXT mesaje)"""
+    if BACKEND == "sqlite":
+        return
+    data = _session(session_id)
+    if data:
+        log.info("Context încărcat: %d mesaje.", len(data))
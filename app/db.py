@@ -1,115 +1,586 @@
-import sqlite3, os, time
+import sqlite3, os, time, threading, functools
+from contextlib import contextmanager
+
+from app import changes, metrics
+from app.memory_index import MemoryIndex, MemoryIndexCache
+from app.profile_cache import Profile, ProfileCache
 
 DB_PATH = "data/bodai.sqlite3"
 
+# Pragma-uri aplicate fiecărei conexiuni noi
+PRAGMAS = {
+    "journal_mode": "WAL",        # cititorii nu mai blochează scriitorii
+    "synchronous": "NORMAL",      # suficient de sigur în modul WAL, mult mai puține fsync-uri
+    "cache_size": -20000,         # ~20 MB cache de pagini per conexiune
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,         # așteaptă lock-ul în loc de "database is locked"
+}
+# câte statement-uri pregătite păstrează fiecare conexiune (refolosite după textul SQL)
+STATEMENT_CACHE_SIZE = 256
+
+DEFAULT_USER = "default"
+# câți utilizatori își țin indexul de amintiri în RAM (LRU)
+MAX_INDEXED_USERS = 100
+# câte amintiri (cele mai noi) încarcă indexul unui utilizator; None = toate
+MAX_INDEXED_MEMORIES = None
+# tabela FTS5 `memory_fts` (retriever-ul `fts`); dezactivată, e ștearsă cu triggerele ei
+FTS_ENABLED = False
+
+# indexurile TF-IDF ale amintirilor (per utilizator), ținute la zi de funcțiile de mai jos
+memory_indexes = MemoryIndexCache(MAX_INDEXED_USERS)
+# profilurile utilizatorilor activi, pre-grupate pe categorii
+profile_cache = ProfileCache(MAX_INDEXED_USERS)
+
+# -------------------- CONNECTION MANAGER --------------------
+_local = threading.local()
+_all_connections = []
+_conn_lock = threading.Lock()
+_generation = 0  # incrementat de close_connections() ca firele să se reconecteze
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        DB_PATH,
+        isolation_level=None,  # tranzacțiile sunt gestionate explicit de transaction()
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    with _conn_lock:
+        _all_connections.append(conn)
+    return conn
+
+
+def connection() -> sqlite3.Connection:
+    """Returnează conexiunea firului curent (creată o singură dată per fir)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "key", None) != (DB_PATH, _generation):
+        conn = _connect()
+        _local.conn, _local.key, _local.depth = conn, (DB_PATH, _generation), 0
+    return conn
+
+
+@contextmanager
+def transaction():
+    """
+    Context manager pentru o tranzacție pe conexiunea firului curent.
+    Tranzacțiile imbricate se alătură celei exterioare; doar cea exterioară
+    face COMMIT/ROLLBACK.
+    """
+    conn = connection()
+    if _local.depth:
+        _local.depth += 1
+        try:
+            yield conn
+        finally:
+            _local.depth -= 1
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    _local.depth = 1
+    _local.touched = set()
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        # indexurile pot conține modificări anulate; se reîncarcă la nevoie
+        memory_indexes.reset()
+        profile_cache.reset()
+        _bump_epoch()
+        raise
+    else:
+        conn.execute("COMMIT")
+        # versiunile cresc abia după COMMIT: cine le citește vede deja datele noi
+        # (funcțiile de scriere le cresc încă o dată după actualizarea indexurilor din RAM)
+        for kind, user_id in _local.touched:
+            bump_version(kind, user_id)
+    finally:
+        _local.depth = 0
+        _local.touched = set()
+
+
+def close_connections() -> None:
+    """Închide toate conexiunile deschise (la oprirea aplicației)."""
+    global _generation
+    with _conn_lock:
+        conns = list(_all_connections)
+        _all_connections.clear()
+        _generation += 1
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+# -------------------- VERSIUNI DE DATE --------------------
+# (tip, user_id) -> scrieri confirmate care au atins amintirile ("memory") sau
+# profilul ("profile") utilizatorului; fac parte din cheia cache-ului de răspunsuri
+_versions = {}
+_versions_lock = threading.Lock()
+_epoch = 0  # incrementat la ROLLBACK, când toate indexurile sunt aruncate
+
+
+def _bump_epoch() -> None:
+    global _epoch
+    with _versions_lock:
+        _epoch += 1
+
+
+def bump_version(kind: str, user_id: str) -> None:
+    with _versions_lock:
+        _versions[(kind, user_id)] = _versions.get((kind, user_id), 0) + 1
+
+
+def data_version(user_id: str = DEFAULT_USER):
+    """(epoca, versiunea amintirilor, versiunea profilului) utilizatorului."""
+    return _epoch, _versions.get(("memory", user_id), 0), _versions.get(("profile", user_id), 0)
+
+
+def has_pending_changes() -> bool:
+    """True dacă tranzacția deschisă pe firul curent a modificat deja amintiri sau profiluri."""
+    return bool(getattr(_local, "touched", None))
+
+
+def record_change(conn: sqlite3.Connection, kind: str, user_id: str, ref: int | None = None) -> None:
+    """
+    Notează o scriere, în tranzacția curentă: în `change_log` pentru ceilalți
+    workeri și în versiunea datelor utilizatorului (crește la COMMIT).
+    `kind`: memory_add | memory_upd | memory_del | memory_reset | profile.
+    """
+    changes.record(conn, kind, user_id, ref)
+    _local.touched.add((kind.split("_", 1)[0], user_id))
+
+
+def record_changes(conn: sqlite3.Connection, kind: str, items) -> None:
+    """Ca `record_change`, pentru mai multe perechi (user_id, ref)."""
+    items = list(items)
+    changes.record_many(conn, kind, items)
+    _local.touched.update((kind.split("_", 1)[0], user_id) for user_id, _ in items)
+
+# -------------------- INSTRUMENTARE --------------------
+def _timed(fn):
+    """Numără apelurile și măsoară durata lor (bodai_db_call_seconds{op=...})."""
+    op = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            metrics.DB_ERRORS.inc(op)
+            raise
+        finally:
+            metrics.DB_CALL_SECONDS.observe(time.perf_counter() - start, op)
+    return wrapper
+
 # -------------------- INIT --------------------
+@_timed
 def init_db():
     """Creează structura de bază de date dacă nu există."""
-    os.makedirs("data", exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-
-    # Memoria generală (amintiri conversaționale)
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS memory (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        text TEXT NOT NULL,
-        timestamp INTEGER NOT NULL
-    )
-    """)
+    os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+    with transaction() as conn:
+        # Memoria generală (amintiri conversaționale)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS memory (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            text TEXT NOT NULL,
+            timestamp INTEGER NOT NULL,
+            user_id TEXT NOT NULL DEFAULT 'default'
+        )
+        """)
+
+        # Profil personal (informații despre utilizator)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_profile (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT,
+            info TEXT NOT NULL,
+            timestamp INTEGER NOT NULL,
+            user_id TEXT NOT NULL DEFAULT 'default'
+        )
+        """)
+
+        # bazele create înainte de partiționarea pe utilizatori
+        for table in ("memory", "user_profile"):
+            columns = [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+            if "user_id" not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN user_id TEXT NOT NULL DEFAULT '{DEFAULT_USER}'")
+
+        # Arhiva amintirilor scoase din setul activ (vezi app/retention.py)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS memory_archive (
+            id INTEGER PRIMARY KEY,
+            text TEXT NOT NULL,
+            timestamp INTEGER NOT NULL,
+            user_id TEXT NOT NULL DEFAULT 'default',
+            archived_at INTEGER NOT NULL,
+            reason TEXT NOT NULL
+        )
+        """)
+
+        # Modificările notate pentru celelalte procese worker (vezi app/changes.py)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            key TEXT,
+            ref INTEGER,
+            origin TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+        """)
+
+        # Contextul conversațiilor, când e partajat între procese (context.BACKEND = "sqlite")
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS context_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            text TEXT NOT NULL
+        )
+        """)
+
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_memory_user ON memory (user_id, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_memory_timestamp ON memory (timestamp)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_profile_user ON user_profile (user_id, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_profile_user_category ON user_profile (user_id, category, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_archive_user ON memory_archive (user_id, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_change_log_created ON change_log (created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_context_session ON context_log (session_id, id)")
+
+        if FTS_ENABLED:
+            _create_fts(conn)
+        else:
+            _drop_fts(conn)
 
-    # Profil personal (informații despre utilizator)
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS user_profile (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        category TEXT,
-        info TEXT NOT NULL,
-        timestamp INTEGER NOT NULL
+
+def _create_fts(conn: sqlite3.Connection) -> None:
+    """
+    Index full-text peste memory.text, sincronizat prin triggere. Coloana
+    `user_key` ține un token unic per utilizator ('u' + hex(user_id)), deci
+    filtrul pe utilizator face parte din MATCH și nu scanează toată tabela.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(memory_fts)")]
+    if columns and "user_key" not in columns:
+        _drop_fts(conn)  # schema veche (doar `text`): reconstruită mai jos
+        columns = []
+    conn.execute("""
+    CREATE VIEW IF NOT EXISTS memory_fts_source AS
+        SELECT id, text, 'u' || hex(user_id) AS user_key FROM memory
+    """)
+    conn.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS memory_fts USING fts5(
+        text, user_key, content='memory_fts_source', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
     )
     """)
+    conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS memory_fts_vocab USING fts5vocab(memory_fts, 'col')")
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS memory_fts_ai AFTER INSERT ON memory BEGIN
+        INSERT INTO memory_fts (rowid, text, user_key) VALUES (new.id, new.text, 'u' || hex(new.user_id));
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS memory_fts_ad AFTER DELETE ON memory BEGIN
+        INSERT INTO memory_fts (memory_fts, rowid, text, user_key)
+        VALUES ('delete', old.id, old.text, 'u' || hex(old.user_id));
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS memory_fts_au AFTER UPDATE OF text, user_id ON memory BEGIN
+        INSERT INTO memory_fts (memory_fts, rowid, text, user_key)
+        VALUES ('delete', old.id, old.text, 'u' || hex(old.user_id));
+        INSERT INTO memory_fts (rowid, text, user_key) VALUES (new.id, new.text, 'u' || hex(new.user_id));
+    END
+    """)
+    if not columns:
+        # amintirile existente sunt indexate o singură dată
+        conn.execute("INSERT INTO memory_fts (memory_fts) VALUES ('rebuild')")
+
+
+def fts_user_key(user_id: str) -> str:
+    """Tokenul utilizatorului în coloana `memory_fts.user_key` (același ca 'u' || hex(user_id) din SQLite)."""
+    return "u" + user_id.encode("utf-8").hex()
+
+
+@contextmanager
+def fts_deferred(conn: sqlite3.Connection):
+    """
+    Pentru inserări în bloc, în interiorul unei tranzacții: triggerul de
+    inserare FTS e suspendat, iar rândurile noi sunt indexate la final
+    printr-un singur INSERT ... SELECT (de câteva ori mai rapid).
+    """
+    if not FTS_ENABLED:
+        yield
+        return
+    start = conn.execute("SELECT COALESCE(MAX(id), 0) FROM memory").fetchone()[0]
+    conn.execute("DROP TRIGGER IF EXISTS memory_fts_ai")
+    yield
+    conn.execute("INSERT INTO memory_fts (rowid, text, user_key) "
+                 "SELECT id, text, 'u' || hex(user_id) FROM memory WHERE id > ?", (start,))
+    _create_fts(conn)
+
 
-    conn.commit()
-    conn.close()
+def _drop_fts(conn: sqlite3.Connection) -> None:
+    # fără triggere, tabela ar rămâne în urmă; e reconstruită la reactivare
+    for trigger in ("memory_fts_ai", "memory_fts_ad", "memory_fts_au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute("DROP TABLE IF EXISTS memory_fts_vocab")
+    conn.execute("DROP TABLE IF EXISTS memory_fts")
+    conn.execute("DROP VIEW IF EXISTS memory_fts_source")
 
 # -------------------- MEMORY MANAGEMENT --------------------
-def add_memory(text: str):
+@_timed
+def add_memory(text: str, user_id: str = DEFAULT_USER):
     """Adaugă o amintire conversațională."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("INSERT INTO memory (text, timestamp) VALUES (?, ?)", (text, int(time.time())))
-    conn.commit()
-    conn.close()
-
-def get_memories():
-    """Returnează toate amintirile."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT id, text, timestamp FROM memory ORDER BY id DESC")
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    with transaction() as conn:
+        cur = conn.execute("INSERT INTO memory (text, timestamp, user_id) VALUES (?, ?, ?)",
+                           (text, int(time.time()), user_id))
+        mem_id = cur.lastrowid
+        record_change(conn, "memory_add", user_id, mem_id)
+    index = memory_indexes.peek(user_id)
+    if index is not None:
+        index.add(mem_id, text)
+    bump_version("memory", user_id)
+    return mem_id
+
+@_timed
+def get_memories(user_id: str = DEFAULT_USER, limit: int | None = None):
+    """Returnează amintirile utilizatorului, cele mai noi întâi (cel mult `limit`)."""
+    return connection().execute(
+        "SELECT id, text, timestamp FROM memory WHERE user_id=? ORDER BY id DESC LIMIT ?",
+        (user_id, -1 if limit is None else limit)
+    ).fetchall()
 
-def search_memories():
-    """Returnează toate amintirile (pentru căutare)."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT id, text, timestamp FROM memory")
-    rows = c.fetchall()
-    conn.close()
+@_timed
+def search_memories(user_id: str = DEFAULT_USER, limit: int | None = None):
+    """Returnează amintirile utilizatorului în ordinea id-urilor (cu `limit`: doar cele mai noi)."""
+    if limit is None:
+        return connection().execute(
+            "SELECT id, text, timestamp FROM memory WHERE user_id=? ORDER BY id", (user_id,)
+        ).fetchall()
+    rows = connection().execute(
+        "SELECT id, text, timestamp FROM memory WHERE user_id=? ORDER BY id DESC LIMIT ?", (user_id, limit)
+    ).fetchall()
+    rows.reverse()
     return rows
 
-def delete_memory(mem_id: int):
+@_timed
+def list_memories(user_id: str = DEFAULT_USER, after_id: int = 0, limit: int = 50):
+    """O pagină de amintiri (id, text, timestamp) cu id > `after_id`, în ordinea id-urilor."""
+    return connection().execute(
+        "SELECT id, text, timestamp FROM memory WHERE user_id=? AND id>? ORDER BY id LIMIT ?",
+        (user_id, after_id, limit)
+    ).fetchall()
+
+@_timed
+def delete_memory(mem_id: int, user_id: str = DEFAULT_USER):
     """Șterge o amintire după ID."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("DELETE FROM memory WHERE id=?", (mem_id,))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute("DELETE FROM memory WHERE id=? AND user_id=?", (mem_id, user_id))
+        record_change(conn, "memory_del", user_id, mem_id)
+    index = memory_indexes.peek(user_id)
+    if index is not None:
+        index.remove(mem_id)
+    bump_version("memory", user_id)
 
-def update_memory(mem_id: int, text: str):
+@_timed
+def delete_memories(mem_ids, user_id: str = DEFAULT_USER):
+    """Șterge mai multe amintiri într-o singură tranzacție (un singur commit)."""
+    mem_ids = list(mem_ids)
+    if not mem_ids:
+        return 0
+    with transaction() as conn:
+        conn.executemany("DELETE FROM memory WHERE id=? AND user_id=?", ((i, user_id) for i in mem_ids))
+        record_changes(conn, "memory_del", [(user_id, i) for i in mem_ids])
+    index = memory_indexes.peek(user_id)
+    if index is not None:
+        index.remove_many(mem_ids)
+    bump_version("memory", user_id)
+    return len(mem_ids)
+
+@_timed
+def update_memory(mem_id: int, text: str, user_id: str = DEFAULT_USER):
     """Actualizează textul unei amintiri."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("UPDATE memory SET text=? WHERE id=?", (text, mem_id))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute("UPDATE memory SET text=? WHERE id=? AND user_id=?", (text, mem_id, user_id))
+        record_change(conn, "memory_upd", user_id, mem_id)
+    index = memory_indexes.peek(user_id)
+    if index is not None:
+        index.update(mem_id, text)
+    bump_version("memory", user_id)
+
+def get_memory_index(user_id: str = DEFAULT_USER) -> MemoryIndex:
+    """Returnează indexul amintirilor utilizatorului, încărcându-l din SQLite la prima utilizare."""
+    sync_changes()
+    return memory_indexes.get(
+        user_id, lambda: [(r[0], r[1]) for r in search_memories(user_id, MAX_INDEXED_MEMORIES)]
+    )
 
 # -------------------- USER PROFILE --------------------
-def add_profile_info(category: str, info: str):
+@_timed
+def add_profile_info(category: str, info: str, user_id: str = DEFAULT_USER):
     """Adaugă o informație despre utilizator (profil personal)."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("INSERT INTO user_profile (category, info, timestamp) VALUES (?, ?, ?)", 
-              (category, info, int(time.time())))
-    conn.commit()
-    conn.close()
-
-def get_profile():
-    """Returnează întregul profil personal (categorie + informație)."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT category, info FROM user_profile ORDER BY id DESC")
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    with transaction() as conn:
+        conn.execute("INSERT INTO user_profile (category, info, timestamp, user_id) VALUES (?, ?, ?, ?)",
+                     (category, info, int(time.time()), user_id))
+        record_change(conn, "profile", user_id)
+    profile_cache.add(user_id, category, info)
+    bump_version("profile", user_id)
+
+def get_profile(user_id: str = DEFAULT_USER):
+    """Returnează întregul profil personal (categorie + informație), din cache."""
+    return list(get_cached_profile(user_id).rows)
+
+def get_cached_profile(user_id: str = DEFAULT_USER) -> Profile:
+    """Profilul pre-grupat pe categorii; SQLite e citit doar la ratare de cache."""
+    sync_changes()
+    return profile_cache.get(user_id, lambda: load_profile(user_id))
+
+@_timed
+def load_profile(user_id: str = DEFAULT_USER):
+    """Citește profilul direct din SQLite (fără cache), cele mai noi întâi."""
+    return connection().execute(
+        "SELECT category, info FROM user_profile WHERE user_id=? ORDER BY id DESC", (user_id,)
+    ).fetchall()
 
-def delete_profile_entry(profile_id: int):
+@_timed
+def list_profile(user_id: str = DEFAULT_USER, category: str | None = None, after_id: int = 0, limit: int = 50):
+    """O pagină din profil (id, categorie, informație, timestamp) cu id > `after_id`, opțional pe o categorie."""
+    if category is None:
+        return connection().execute(
+            "SELECT id, category, info, timestamp FROM user_profile WHERE user_id=? AND id>? ORDER BY id LIMIT ?",
+            (user_id, after_id, limit)
+        ).fetchall()
+    return connection().execute(
+        "SELECT id, category, info, timestamp FROM user_profile "
+        "WHERE user_id=? AND category=? AND id>? ORDER BY id LIMIT ?",
+        (user_id, category, after_id, limit)
+    ).fetchall()
+
+@_timed
+def update_profile_entry(profile_id: int, info: str, user_id: str = DEFAULT_USER):
+    """Actualizează textul unei înregistrări din profilul personal."""
+    with transaction() as conn:
+        conn.execute("UPDATE user_profile SET info=? WHERE id=? AND user_id=?", (info, profile_id, user_id))
+        record_change(conn, "profile", user_id)
+    profile_cache.invalidate(user_id)
+    bump_version("profile", user_id)
+
+@_timed
+def delete_profile_entry(profile_id: int, user_id: str = DEFAULT_USER):
     """Șterge o înregistrare din profilul personal."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("DELETE FROM user_profile WHERE id=?", (profile_id,))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute("DELETE FROM user_profile WHERE id=? AND user_id=?", (profile_id, user_id))
+        record_change(conn, "profile", user_id)
+    profile_cache.invalidate(user_id)
+    bump_version("profile", user_id)
 
-def clear_profile():
+@_timed
+def clear_profile(user_id: str = DEFAULT_USER):
     """Șterge complet profilul personal."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("DELETE FROM user_profile")
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute("DELETE FROM user_profile WHERE user_id=?", (user_id,))
+        record_change(conn, "profile", user_id)
+    profile_cache.invalidate(user_id)
+    bump_version("profile", user_id)
+
+# -------------------- CONTEXT PARTAJAT --------------------
+@_timed
+def add_context_entry(session_id: str, role: str, text: str, keep: int):
+    """Adaugă un mesaj în contextul sesiunii, păstrând doar ultimele `keep`."""
+    with transaction() as conn:
+        conn.execute("INSERT INTO context_log (session_id, role, text) VALUES (?, ?, ?)", (session_id, role, text))
+        conn.execute(
+            "DELETE FROM context_log WHERE session_id=? AND id < "
+            "(SELECT id FROM context_log WHERE session_id=? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (session_id, session_id, keep - 1)
+        )
+
+@_timed
+def get_context_entries(session_id: str, limit: int):
+    """Ultimele `limit` mesaje ale sesiunii (role, text), în ordine cronologică."""
+    rows = connection().execute(
+        "SELECT role, text FROM context_log WHERE session_id=? ORDER BY id DESC LIMIT ?", (session_id, limit)
+    ).fetchall()
+    rows.reverse()
+    return rows
+
+@_timed
+def clear_context_entries(session_id: str):
+    with transaction() as conn:
+        conn.execute("DELETE FROM context_log WHERE session_id=?", (session_id,))
+
+# -------------------- SINCRONIZARE ÎNTRE PROCESE --------------------
+def sync_changes(force: bool = False) -> int:
+    """Aplică modificările făcute de ceilalți workeri (vezi app/changes.py)."""
+    return changes.sync(connection(), force)
+
+
+def publish_change(kind: str, key: str | None = None, ref: int | None = None) -> None:
+    """Anunță celelalte procese despre o modificare din afara tabelelor (de ex. reîncărcarea KB)."""
+    if changes.ENABLED:
+        with transaction() as conn:
+            changes.record(conn, kind, key, ref)
+
+def _on_memory_written(user_id, mem_id):
+    index = memory_indexes.peek(user_id)
+    if index is not None:
+        row = connection().execute("SELECT text FROM memory WHERE id=? AND user_id=?", (mem_id, user_id)).fetchone()
+        if row is None:
+            index.remove(mem_id)
+        elif index.get(mem_id) is None:
+            index.add(mem_id, row[0])
+        else:
+            index.update(mem_id, row[0])
+    bump_version("memory", user_id)
+
+
+def _on_memory_deleted(user_id, mem_id):
+    index = memory_indexes.peek(user_id)
+    if index is not None:
+        index.remove(mem_id)
+    bump_version("memory", user_id)
+
+
+def _on_memory_reset(user_id, _):
+    memory_indexes.discard(user_id)
+    bump_version("memory", user_id)
+
+
+def _on_profile_changed(user_id, _):
+    profile_cache.invalidate(user_id)
+    bump_version("profile", user_id)
+
+
+changes.on("memory_add", _on_memory_written)
+changes.on("memory_upd", _on_memory_written)
+changes.on("memory_del", _on_memory_deleted)
+# import în bloc / retenție: indexul e reîncărcat din SQLite la următoarea utilizare
+changes.on("memory_reset", _on_memory_reset)
+changes.on("profile", _on_profile_changed)
+
+# -------------------- PAGINARE --------------------
+def iter_pages(fetch_page, after_id: int = 0, page_size: int = 1000):
+    """
+    Parcurge un tabel pagină cu pagină (keyset pe `id`, prima coloană):
+    `fetch_page(after_id, limit)` e apelat până la o pagină incompletă.
+    """
+    while True:
+        rows = fetch_page(after_id, page_size)
+        if rows:
+            yield rows
+            after_id = rows[-1][0]
+        if len(rows) < page_size:
+            return
 
 # -------------------- CONNECTION --------------------
 def get_connection():
-    """Returnează o conexiune activă (pentru operații manuale)."""
-    return sqlite3.connect(DB_PATH)
+    """
+    Returnează conexiunea partajată a firului curent (pentru operații manuale).
+    Nu trebuie închisă; pentru scrieri folosește `transaction()`.
+    """
+    return connection()
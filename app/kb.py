@@ -0,0 +1,408 @@
+"""
+Knowledge base cu index precompilat, cache binar pe disc și reîncărcare la cald.
+
+Indexul KB este serializat într-un fișier cache versionat (`data/kb.cache`),
+identificat după hash-ul conținutului din `data/knowledge.json`, backend și
+versiunea formatului. La pornire, dacă hash-ul se potrivește, cache-ul este
+mapat în memorie (mmap) în loc să fie reconstruit: pentru ambele backend-uri
+postările/matricea sunt citite direct din fișier (fără pickle); în heap
+ajung doar textele intrărilor și vocabularul.
+
+Cererile folosesc un instantaneu imuabil (`current()`); o reîncărcare
+construiește noul index în fundal și îl înlocuiește printr-o singură
+atribuire, deci cererile în curs își termină lucrul pe versiunea veche.
+
+Formatul fișierului:
+    MAGIC (8 octeți) | versiune (uint32) | lungime antet (uint32) | antet JSON
+    | secțiuni aliniate la 8 octeți, descrise în antet ca [offset, lungime].
+"""
+import hashlib
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from app import metrics, normalize, nlp_utils, tfidf_sparse
+
+log = logging.getLogger("bodai.kb")
+
+KB_PATH: str = "data/knowledge.json"
+CACHE_FILE: str = "data/kb.cache"
+# python | sparse (sparse necesită numpy + scipy)
+BACKEND: str = "python"
+# la câte secunde e verificat fișierul KB pentru modificări (0 = dezactivat)
+WATCH_INTERVAL: float = 2.0
+
+MAGIC = b"BODAIKB\0"
+# trebuie incrementată la orice schimbare de format sau de tokenizare
+FORMAT_VERSION = 2
+_PREFIX = struct.Struct("<8sII")
+
+KB_RELOADS = metrics.Counter("bodai_kb_reloads_total", "Reîncărcări ale knowledge base.", ["result"])
+
+
+class KnowledgeBase:
+    """Instantaneu imuabil al KB: întrebări, răspunsuri și indexul TF-IDF."""
+
+    def __init__(self, questions: List[str], answers: List[str], index, version: str,
+                 backend: str, from_cache: bool = False) -> None:
+        self.questions = questions
+        self.answers = answers
+        self.index = index
+        self.version = version
+        self.backend = backend
+        self.from_cache = from_cache
+        self.loaded_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self.answers)
+
+    def search(self, tokens: List[str]) -> Tuple[Optional[int], float]:
+        """Cea mai apropiată întrebare: (index, scor) sau (None, 0.0)."""
+        top = self.index.search(tokens, k=1)
+        return top[0] if top else (None, 0.0)
+
+    def info(self) -> Dict:
+        return {
+            "version": self.version[:12],
+            "entries": len(self),
+            "backend": self.backend,
+            "from_cache": self.from_cache,
+            "loaded_at": int(self.loaded_at),
+        }
+
+
+def configure(kb_cfg: dict, backend: Optional[str] = None, workers: int = 1) -> None:
+    """
+    Aplică secțiunea `kb` din configs/app.yaml (și `nlp.backend`). Cu mai
+    mulți workeri backend-ul e mereu `sparse`: indexul python ar fi
+    deserializat (și copiat în RAM) de fiecare worker, în loc să fie mapat.
+    """
+    global BACKEND, KB_PATH, CACHE_FILE, WATCH_INTERVAL
+    BACKEND = backend or BACKEND
+    if workers > 1:
+        if not tfidf_sparse.AVAILABLE:
+            raise RuntimeError(f"Cu {workers} workeri, KB necesită backend-ul sparse (numpy și scipy).")
+        if BACKEND != "sparse":
+            log.info("KB: backend-ul %s e înlocuit cu sparse (%d workeri).", BACKEND, workers)
+        BACKEND = "sparse"
+    KB_PATH = kb_cfg.get("path", KB_PATH)
+    CACHE_FILE = kb_cfg.get("cache_file", CACHE_FILE)
+    WATCH_INTERVAL = kb_cfg.get("watch_interval_seconds", WATCH_INTERVAL)
+
+
+def _backend() -> str:
+    return "sparse" if BACKEND == "sparse" and tfidf_sparse.AVAILABLE else "python"
+
+
+def content_version(raw: bytes, backend: str) -> str:
+    """Cheia cache-ului: hash-ul conținutului KB + backend + versiunea formatului."""
+    h = hashlib.sha256(raw)
+    h.update(f"|{backend}|{FORMAT_VERSION}".encode())
+    return h.hexdigest()
+
+class MappedIndex:
+    """
+    Indexul inversat al backend-ului python, citit direct din cache-ul mapat:
+    postările sunt stocate pe termeni (CSR), ca tablouri uint32 (documente,
+    frecvențe), iar normele documentelor ca float64. Scorurile și ordinea
+    rezultatelor sunt identice cu `nlp_utils.InvertedIndex.search`.
+    """
+
+    def __init__(self, terms: List[str], term_ptr, post_docs, post_tfs, norms) -> None:
+        self.rows = {term: i for i, term in enumerate(terms)}
+        self.term_ptr, self.post_docs, self.post_tfs, self.norms = term_ptr, post_docs, post_tfs, norms
+
+    def __len__(self) -> int:
+        return len(self.norms)
+
+    @staticmethod
+    def sections(index: nlp_utils.InvertedIndex, doc_count: int) -> Dict[str, Tuple[bytes, Optional[str]]]:
+        """Secțiunile cache-ului pentru un `InvertedIndex` cu id-urile 0..doc_count-1."""
+        terms = list(index.postings)
+        term_ptr, post_docs, post_tfs = array("I", [0]), array("I"), array("I")
+        for term in terms:
+            plist = index.postings[term]  # ordinea de inserare, ca la acumularea din InvertedIndex
+            post_docs.extend(plist.keys())
+            post_tfs.extend(plist.values())
+            term_ptr.append(len(post_docs))
+        norms = array("d", (index.norm(i) for i in range(doc_count)))
+        return {
+            "terms": (json.dumps(terms, ensure_ascii=False).encode(), None),
+            "term_ptr": (term_ptr.tobytes(), "I"), "post_docs": (post_docs.tobytes(), "I"),
+            "post_tfs": (post_tfs.tobytes(), "I"), "norms": (norms.tobytes(), "d"),
+        }
+
+    def search(self, query_tokens: List[str], k: int = 1) -> List[Tuple[int, float]]:
+        """Top-k (doc_id, scor cosinus), descrescător; la egalitate câștigă id-ul mai mic."""
+        qtf = Counter(t for t in query_tokens if t in self.rows)
+        if not qtf:
+            return []
+        n = len(self.norms)
+        idf = {}
+        for t in qtf:
+            row = self.rows[t]
+            idf[t] = math.log((n + 1) / (self.term_ptr[row + 1] - self.term_ptr[row] + 1)) + 1
+        qvec = {t: c * idf[t] for t, c in qtf.items()}
+        qnorm = math.sqrt(sum(v * v for v in qvec.values()))
+        if qnorm == 0:
+            return []
+
+        acc: Dict[int, float] = {}
+        docs, tfs = self.post_docs, self.post_tfs
+        for term, weight in qvec.items():
+            w = weight * idf[term]
+            row = self.rows[term]
+            for p in range(self.term_ptr[row], self.term_ptr[row + 1]):
+                acc[docs[p]] = acc.get(docs[p], 0.0) + w * tfs[p]
+
+        scored = {}
+        for doc_id, num in acc.items():
+            dnorm = self.norms[doc_id]
+            if num > 0 and dnorm > 0:
+                scored[doc_id] = num / (qnorm * dnorm)
+        return heapq.nsmallest(k, scored.items(), key=lambda r: (-r[1], r[0]))
+
+# -------------------- CONSTRUIRE --------------------
+
+def build(items: List[Dict], version: str, backend: str) -> KnowledgeBase:
+    """Construiește indexul KB din intrările {"q": ..., "a": ...}."""
+    questions = [item["q"] for item in items]
+    answers = [item["a"] for item in items]
+    docs = [normalize.tokens(q, cached=False) for q in questions]
+    if backend == "sparse":
+        index = tfidf_sparse.SparseTfidfIndex(docs)
+    else:
+        index = nlp_utils.InvertedIndex()
+        for i, doc in enumerate(docs):
+            index.add(i, doc)
+    return KnowledgeBase(questions, answers, index, version, backend)
+
+# -------------------- CACHE PE DISC --------------------
+
+def _sections(kb: KnowledgeBase) -> Dict[str, Tuple[bytes, Optional[str]]]:
+    """Secțiunile de scris: nume -> (octeți, dtype numpy sau None)."""
+    sections = {"entries": (json.dumps({"q": kb.questions, "a": kb.answers}, ensure_ascii=False).encode(), None)}
+    index = kb.index
+    if kb.backend == "sparse":
+        m = index.matrix
+        sections["vocab"] = (json.dumps(index.vocab, ensure_ascii=False).encode(), None)
+        for name, arr in (("idf", index.idf), ("data", m.data), ("indices", m.indices),
+                          ("indptr", m.indptr), ("doc_ids", index.doc_ids)):
+            sections[name] = (arr.tobytes(), arr.dtype.str)
+    else:
+        sections.update(MappedIndex.sections(index, len(kb.questions)))
+    return sections
+
+
+def save_cache(kb: KnowledgeBase, path: str) -> None:
+    """Scrie cache-ul atomic (fișier temporar + os.replace)."""
+    sections = _sections(kb)
+    layout: Dict[str, list] = {}
+    offset = 0
+    for name, (data, dtype) in sections.items():
+        layout[name] = [offset, len(data), dtype]
+        offset += (len(data) + 7) & ~7
+    shape = list(kb.index.matrix.shape) if kb.backend == "sparse" else None
+    header = json.dumps({"version": kb.version, "shape": shape, "byteorder": sys.byteorder,
+                         "sections": layout}).encode()
+    start = (_PREFIX.size + len(header) + 7) & ~7
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(tmp, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        f.write(b"\0" * (start - _PREFIX.size - len(header)))
+        for name, (data, _) in sections.items():
+            f.write(data)
+            f.write(b"\0" * (((len(data) + 7) & ~7) - len(data)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_cache(path: str, version: str) -> Optional[KnowledgeBase]:
+    """
+    Încarcă indexul din cache dacă versiunea se potrivește (altfel None).
+    Postările (python) și matricea (sparse) rămân mapate direct din fișier.
+    """
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        magic, fmt, header_len = _PREFIX.unpack_from(mm, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            return None
+        header = json.loads(mm[_PREFIX.size:_PREFIX.size + header_len])
+        if header.get("version") != version or header.get("byteorder") != sys.byteorder:
+            return None
+        start = (_PREFIX.size + header_len + 7) & ~7
+        layout = header["sections"]
+
+        def raw(name: str) -> memoryview:
+            offset, length, _ = layout[name]
+            return memoryview(mm)[start + offset:start + offset + length]
+
+        def typed(name: str) -> memoryview:
+            view = raw(name)
+            if layout[name][2] is None or len(view) % struct.calcsize(layout[name][2]):
+                raise ValueError(f"secțiunea {name} nu are tipul așteptat")
+            return view.cast(layout[name][2])
+
+        entries = json.loads(bytes(raw("entries")))
+        if "post_docs" in layout:
+            index = MappedIndex(json.loads(bytes(raw("terms"))), typed("term_ptr"), typed("post_docs"),
+                                typed("post_tfs"), typed("norms"))
+        elif tfidf_sparse.AVAILABLE and "data" in layout:
+            tfidf_sparse.load()
+            np = tfidf_sparse.np
+
+            def array(name: str):
+                offset, length, dtype = layout[name]
+                return np.frombuffer(mm, dtype=np.dtype(dtype), count=length // np.dtype(dtype).itemsize,
+                                     offset=start + offset)
+
+            index = tfidf_sparse.SparseTfidfIndex.from_arrays(
+                json.loads(bytes(raw("vocab"))), array("idf"), array("data"), array("indices"),
+                array("indptr"), tuple(header["shape"]), array("doc_ids"),
+            )
+        else:
+            return None
+    except (ValueError, KeyError, TypeError, struct.error) as e:
+        log.warning("Cache KB invalid (%s), se reconstruiește: %s", path, e)
+        return None
+    backend = "python" if "post_docs" in layout else "sparse"
+    return KnowledgeBase(entries["q"], entries["a"], index, version, backend, from_cache=True)
+
+
+def load(kb_path: Optional[str] = None, cache_file: Optional[str] = None) -> KnowledgeBase:
+    """Încarcă KB din cache dacă e valid, altfel îl construiește și rescrie cache-ul."""
+    kb_path = kb_path or KB_PATH
+    cache_file = CACHE_FILE if cache_file is None else cache_file
+    with open(kb_path, "rb") as f:
+        raw = f.read()
+    backend = _backend()
+    version = content_version(raw, backend)
+    kb = load_cache(cache_file, version) if cache_file else None
+    if kb is not None:
+        return kb
+    kb = build(json.loads(raw.decode("utf-8")), version, backend)
+    if cache_file:
+        try:
+            save_cache(kb, cache_file)
+        except OSError as e:
+            log.warning("Nu s-a putut scrie cache-ul KB: %s", e)
+    return kb
+
+# -------------------- INSTANȚA CURENTĂ --------------------
+
+_current: Optional[KnowledgeBase] = None
+_reload_lock = threading.Lock()
+_watcher: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def current() -> KnowledgeBase:
+    """Instantaneul curent al KB (încărcat la prima utilizare)."""
+    kb = _current
+    if kb is None:
+        with _reload_lock:
+            if _current is None:
+                _swap(load())
+            kb = _current
+    return kb
+
+
+def _swap(kb: KnowledgeBase) -> None:
+    global _current
+    _current = kb  # o singură atribuire: cererile văd fie versiunea veche, fie pe cea nouă
+
+
+def reload() -> bool:
+    """
+    Reconstruiește KB dacă fișierul s-a schimbat și îl înlocuiește atomic.
+    Returnează True dacă a fost încărcată o versiune nouă. O singură
+    reîncărcare rulează la un moment dat; apelurile concurente sunt ignorate.
+    """
+    if not _reload_lock.acquire(blocking=False):
+        return False
+    try:
+        old = _current
+        started = time.perf_counter()
+        try:
+            kb = load()
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            KB_RELOADS.inc("error")
+            log.warning("Reîncărcarea KB a eșuat, rămâne versiunea curentă: %s", e)
+            return False
+        if old is not None and kb.version == old.version:
+            KB_RELOADS.inc("unchanged")
+            return False
+        _swap(kb)
+        KB_RELOADS.inc("ok")
+        log.info("KB reîncărcat: %d intrări, versiunea %s (%.3fs).",
+                 len(kb), kb.version[:12], time.perf_counter() - started)
+        return True
+    finally:
+        _reload_lock.release()
+
+
+def reload_in_background() -> bool:
+    """Pornește o reîncărcare pe un fir separat; False dacă una rulează deja."""
+    if _reload_lock.locked():
+        return False
+    threading.Thread(target=reload, name="kb-reload", daemon=True).start()
+    return True
+
+
+def reloading() -> bool:
+    return _reload_lock.locked()
+
+
+def _file_stamp(path: str) -> Optional[Tuple[float, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime, st.st_size
+
+
+def _watch(interval: float) -> None:
+    stamp = _file_stamp(KB_PATH)
+    while not _stop.wait(interval):
+        new = _file_stamp(KB_PATH)
+        if new is not None and new != stamp:
+            stamp = new
+            reload()
+
+
+def start_watcher(interval: Optional[float] = None) -> None:
+    """Urmărește fișierul KB (mtime/mărime) și îl reîncarcă la modificare."""
+    global _watcher
+    interval = WATCH_INTERVAL if interval is None else interval
+    if interval <= 0 or (_watcher is not None and _watcher.is_alive()):
+        return
+    _stop.clear()
+    _watcher = threading.Thread(target=_watch, args=(interval,), name="kb-watcher", daemon=True)
+    _watcher.start()
+
+
+def stop_watcher() -> None:
+    """Oprește watcher-ul și așteaptă terminarea firului (un start_watcher() ulterior pornește unul nou)."""
+    global _watcher
+    _stop.set()
+    if _watcher is not None and _watcher is not threading.current_thread():
+        _watcher.join()
+    _watcher = None
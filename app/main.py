@@ -1,79 +1,201 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from fastapi.staticfiles import StaticFiles
-import json, yaml
-from rapidfuzz import fuzz
+import asyncio, json, logging, os, queue, sqlite3, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List, Tuple
 
-from app import nlp_utils, db, context
-from app.patterns import match_pattern
+from app import (backup, bulk, changes, db, context, kb, metrics, memory_fts, memory_index, normalize,
+                 reply_cache, retention)
+from app.patterns import PATTERN_KEYWORDS, pattern_response
+from app.router import Hit, IntentRouter
 
 # ---------------- CONFIG ----------------
-with open("configs/app.yaml", encoding="utf-8") as f:
-    config = yaml.safe_load(f)
-
-app = FastAPI(title=config["app_name"], version=config["version"])
-
-db.init_db()
-context.load_context()
+# citită la import: titlul aplicației, logging-ul, executorul /chat și modul multi-proces
+# trebuie fixate înainte de prima cerere. Costul nu depinde de date, iar workerii porniți
+# de app/serve.py primesc configurația deja parsată (BODAI_CONFIG) și nu importă PyYAML.
+CONFIG_FILE = "configs/app.yaml"
+
+def load_config() -> dict:
+    """Configurația de la launcher (BODAI_CONFIG) sau, altfel, din configs/app.yaml."""
+    raw = os.environ.get("BODAI_CONFIG")
+    if raw:
+        return json.loads(raw)
+    import yaml
+
+    with open(CONFIG_FILE, encoding="utf-8") as f:
+        return yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+config = load_config()
+
+def setup_logging(cfg: dict) -> None:
+    """Configurează loggerul "bodai" (consolă + fișier) din secțiunea `logging`."""
+    logger = logging.getLogger("bodai")
+    if logger.handlers:
+        return
+    logger.setLevel(cfg.get("level", "INFO"))
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    handlers: List[logging.Handler] = [logging.StreamHandler()]
+    if cfg.get("file"):
+        os.makedirs(os.path.dirname(cfg["file"]) or ".", exist_ok=True)
+        handlers.append(logging.FileHandler(cfg["file"], encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+
+setup_logging(config.get("logging", {}))
+log = logging.getLogger("bodai.main")
+
+sessions_cfg = config.get("sessions", {})
+context.MAX_SESSIONS = sessions_cfg.get("max_active", context.MAX_SESSIONS)
+db.memory_indexes.max_users = sessions_cfg.get("max_indexed_users", db.MAX_INDEXED_USERS)
+db.profile_cache.max_users = db.memory_indexes.max_users
+
+nlp_cfg = config.get("nlp", {})
+# index (TF-IDF în RAM, per utilizator) | fts (candidați BM25 din SQLite FTS5)
+MEMORY_RETRIEVER = nlp_cfg.get("memory_retriever", "index")
+memory_fts.CANDIDATES = nlp_cfg.get("fts_candidates", memory_fts.CANDIDATES)
+memory_fts.FUZZY_FALLBACK = nlp_cfg.get("fts_fuzzy_fallback", memory_fts.FUZZY_FALLBACK)
+db.FTS_ENABLED = MEMORY_RETRIEVER == "fts"
+
+retention.configure(config.get("retention", {}))
+backup.configure(config.get("database", {}))
+
+server_cfg = config.get("server", {})
+# procese worker (vezi app/serve.py); BODAI_WORKERS e setat de launcher
+WORKERS = int(os.environ.get("BODAI_WORKERS") or server_cfg.get("workers", 1))
+if WORKERS > 1:
+    # contextul și modificările amintirilor/profilurilor trec prin SQLite, comun tuturor workerilor
+    changes.ENABLED = True
+    changes.SYNC_INTERVAL = server_cfg.get("sync_interval_ms", 50) / 1000
+    context.BACKEND = "sqlite"
 
 BOT_PERSONALITY = "empatic, curios și atent, dar concis"
 
 # ---------------- MODELS ----------------
 class Message(BaseModel):
     message: str
+    user_id: str = db.DEFAULT_USER
+    # implicit, fiecare utilizator are o singură conversație (session_id = user_id)
+    session_id: str | None = None
+
+class BatchMessages(BaseModel):
+    messages: List[str]
+    user_id: str = db.DEFAULT_USER
+    session_id: str | None = None
 
 # ---------------- KNOWLEDGE BASE ----------------
-with open("data/knowledge.json", encoding="utf-8") as f:
-    knowledge_base = json.load(f)
+# indexul KB e încărcat la pornire, în fundal (warm_up), din cache-ul binar
+# (data/kb.cache) dacă e la zi, și reîncărcat la cald când data/knowledge.json se schimbă
+memory_index.FUZZY_WORKERS = nlp_cfg.get("fuzzy_workers", memory_index.FUZZY_WORKERS)
+memory_index.FUZZY_PARALLEL_MIN = nlp_cfg.get("fuzzy_parallel_min", memory_index.FUZZY_PARALLEL_MIN)
+normalize.set_cache_size(nlp_cfg.get("token_cache_size", normalize.TOKEN_CACHE_SIZE))
 
-kb_questions = [item["q"] for item in knowledge_base]
-kb_docs = [nlp_utils.tokenize(q) for q in kb_questions]
-kb_vocab, kb_df, kb_N = nlp_utils.build_tfidf(kb_docs)
-kb_vectors = [nlp_utils.tfidf_vector(doc, kb_vocab, kb_df, kb_N) for doc in kb_docs]
+kb.configure(config.get("kb", {}), nlp_cfg.get("backend"), WORKERS)
+# un POST /admin/kb/reload primit de alt worker
+changes.on("kb", lambda *_: kb.reload_in_background())
 
 # ---------------- HELPER KEYWORDS ----------------
 PERSONAL_Q_KEYWORDS = [
     "despre mine", "despre tine", "îți amintești", "iti amintesti",
     "eu", "mie", "mie îmi", "ce știi despre mine", "ce stii despre mine"
 ]
-PERSONAL_MEM_PATTERNS = ["imi ", "îmi ", "am ", "m-am", "prefer", "plac", "îmi place", "imi place"]
 
-def is_personal_query(text: str) -> bool:
-    return any(k in text.lower() for k in PERSONAL_Q_KEYWORDS)
+LEARN_PREFIXES = ["tine minte ca", "noteaza ca", "salveaza ca"]
+PERSONAL_TRIGGERS = [
+    ("imi place", "hobby"), ("îmi place", "hobby"),
+    ("prefer", "preferinta"), ("locuiesc in", "loc"),
+    ("sunt din", "loc"), ("ma numesc", "identitate"),
+    ("lucrez ca", "profesie")
+]
+CONVERSATIONAL = {
+    "salut": "Bună, eu sunt BODAI.",
+    "buna": "Salut! Ce mai faci?",
+    "ce faci": "Sunt bine, tu ce faci?",
+    "cum esti": "Sunt bine, mulțumesc! Tu?",
+    "cine esti": "Sunt BODAI, asistentul tău personal."
+}
+PROFILE_QUESTIONS = ["ce stii despre mine", "despre mine"]
+
+MOOD_POSITIVE = ["bine", "fericit", "super", "excelent", "perfect"]
+MOOD_NEGATIVE = ["obosit", "trist", "plictisit", "stresat", "rau", "nervos"]
+FALLBACKS = [
+    ("ce faci", "Lucrez la procesarea cererilor tale 😄 Tu ce faci?"),
+    ("cum esti", "Sunt bine, mulțumesc! Mă bucur că vorbim."),
+    ("salut", "Salut din nou! Ce mai e nou la tine?"),
+    ("buna", "Salut din nou! Ce mai e nou la tine?"),
+    ("nu", "Am înțeles, nicio problemă. 😊"),
+    ("da", "Mă bucur să aud asta! 😄"),
+]
 
-def looks_personal_memory(text: str) -> bool:
-    return any(p in text.lower() for p in PERSONAL_MEM_PATTERNS)
+# ---------------- ROUTERS ----------------
+# Toate verificările de dinainte de retrieval, compilate într-o singură trecere.
+# Ordinea adăugării = precedența pașilor din chat().
+chat_router = IntentRouter()
+for prefix in LEARN_PREFIXES:
+    chat_router.add("learn", prefix, kind="prefix")
+for trigger, cat in PERSONAL_TRIGGERS:
+    chat_router.add("profile_learn", trigger, payload=(trigger, cat))
+chat_router.add("forget", "uita ca", kind="prefix")
+for keywords, responses in PATTERN_KEYWORDS:
+    for kw in keywords:
+        chat_router.add("pattern", kw, kind="word", payload=responses)
+for key, resp in CONVERSATIONAL.items():
+    chat_router.add("conversational", key, payload=resp)
+for question in PROFILE_QUESTIONS:
+    chat_router.add("profile_summary", question)
+chat_router.compile()
+
+# Verificările din smart_reply / is_personal_query, pe textul cu litere mici
+reply_router = IntentRouter()
+for mood in MOOD_POSITIVE:
+    reply_router.add("mood_positive", mood)
+for mood in MOOD_NEGATIVE:
+    reply_router.add("mood_negative", mood)
+for key, resp in FALLBACKS:
+    reply_router.add("fallback", key, payload=resp)
+for kw in PERSONAL_Q_KEYWORDS:
+    reply_router.add("personal_query", kw)
+reply_router.compile()
+
+def is_personal_query(text: str, hits: List[Hit] | None = None) -> bool:
+    if hits is None:
+        hits = reply_router.scan(text.lower())
+    return any(h.rule.name == "personal_query" for h in hits)
 
 # ---------------- SMART REPLY ----------------
-def smart_reply(user_text: str, memory_match: str | None = None, fuzzy_score: float | None = None):
+def smart_reply(user_text: str, memory_match: str | None = None, fuzzy_score: float | None = None,
+                user_id: str = db.DEFAULT_USER, hits: List[Hit] | None = None,
+                norm: normalize.NormalizedText | None = None):
     """Construiește un răspuns empatic, contextual și profil-aware."""
     # 🔹 Integrare cu profilul utilizatorului
-    profile = db.get_profile()
-    known_likes = [info for cat, info in profile if cat in ("hobby", "preferinta")]
-    known_location = next((info for cat, info in profile if cat == "loc"), None)
-
-    # 🔹 Analiză dispoziție
-    mood_positive = ["bine", "fericit", "super", "excelent", "perfect"]
-    mood_negative = ["obosit", "trist", "plictisit", "stresat", "rau", "nervos"]
-    text = user_text.lower()
-
-    for mood in mood_positive:
-        if mood in text:
-            if known_likes:
-                return f"Mă bucur să aud asta! Poate mai târziu te bucuri și de puțin {known_likes[0]} 😄"
-            return "Mă bucur să aud că ești bine! 😊"
-
-    for mood in mood_negative:
-        if mood in text:
-            if "cafea" in " ".join(known_likes).lower():
-                return "Îmi pare rău că te simți așa... Poate o cafea bună te-ar ajuta puțin ☕"
-            elif known_location:
-                return f"Îmi pare rău să aud asta... Poate o plimbare prin {known_location} ți-ar prinde bine. 🌳"
-            return "Îmi pare rău că te simți așa... Dacă vrei, putem vorbi puțin. 💬"
+    profile = db.get_cached_profile(user_id)
+    known_likes = profile.likes
+    known_location = profile.first("loc")
+
+    # 🔹 Analiză dispoziție (pozitiv înaintea negativului, ca înainte)
+    text = norm.lower if norm is not None else user_text.lower()
+    if hits is None:
+        hits = reply_router.scan(text)
+    mood = next((h.rule.name for h in hits if h.rule.name in ("mood_positive", "mood_negative")), None)
+
+    if mood == "mood_positive":
+        if known_likes:
+            return f"Mă bucur să aud asta! Poate mai târziu te bucuri și de puțin {known_likes[0]} 😄"
+        return "Mă bucur să aud că ești bine! 😊"
+
+    if mood == "mood_negative":
+        if "cafea" in " ".join(known_likes).lower():
+            return "Îmi pare rău că te simți așa... Poate o cafea bună te-ar ajuta puțin ☕"
+        elif known_location:
+            return f"Îmi pare rău să aud asta... Poate o plimbare prin {known_location} ți-ar prinde bine. 🌳"
+        return "Îmi pare rău că te simți așa... Dacă vrei, putem vorbi puțin. 💬"
 
     # 🔹 Context conversațional bazat pe memorie
     if memory_match:
-        shared = len(set(user_text.lower().split()) & set(memory_match.lower().split()))
+        shared = len(set(text.split()) & set(memory_match.lower().split()))
         if shared < 2 and (fuzzy_score or 0) < 70:
             return "Nu cred că te refereai la asta. Poți detalia puțin mai clar?"
 
@@ -89,206 +211,572 @@ def smart_reply(user_text: str, memory_match: str | None = None, fuzzy_score: fl
             return f"Îmi amintesc: {memory_match}"
 
     # 🔹 Fallback conversațional
-    if "ce faci" in text:
-        return "Lucrez la procesarea cererilor tale 😄 Tu ce faci?"
-    if "cum esti" in text:
-        return "Sunt bine, mulțumesc! Mă bucur că vorbim."
-    if "salut" in text or "buna" in text:
-        return "Salut din nou! Ce mai e nou la tine?"
-    if "nu" in text:
-        return "Am înțeles, nicio problemă. 😊"
-    if "da" in text:
-        return "Mă bucur să aud asta! 😄"
+    fallback = next((h for h in hits if h.rule.name == "fallback"), None)
+    if fallback:
+        return fallback.rule.payload
     return f"Încă învăț să gândesc mai complex. Țin minte că sunt {BOT_PERSONALITY}. Povestește-mi ceva despre tine!"
 
+# ---------------- RETRIEVAL STAGES ----------------
+def memory_source(uid: str, tokens):
+    """Amintirile printre care se caută: indexul din RAM sau candidații FTS5 ai mesajului."""
+    if MEMORY_RETRIEVER == "fts":
+        return memory_fts.retrieve(uid, tokens)
+    return db.get_memory_index(uid)
+
+def search_memory_tfidf(mem_index, tokens: List[str]) -> Tuple[int | None, float]:
+    """Cea mai apropiată amintire după TF-IDF: (id, scor) sau (None, 0.0)."""
+    top = mem_index.search(tokens, k=1)
+    return top[0] if top else (None, 0.0)
+
+def search_memory_fuzzy(mem_index, user_text: str, personal_mode: bool) -> Tuple[str | None, float]:
+    """Fallback fuzzy peste amintiri: (text, scor) sau (None, 0)."""
+    best_id, best_f_score = mem_index.fuzzy_search(user_text, personal_only=personal_mode)
+    return (mem_index.get(best_id) if best_id is not None else None), best_f_score
+
+def search_kb(tokens: List[str]) -> Tuple[str | None, float]:
+    """Răspunsul celei mai apropiate întrebări din knowledge base: (răspuns, scor) sau (None, 0.0)."""
+    snapshot = kb.current()  # aceeași versiune pentru căutare și răspuns, chiar dacă KB e reîncărcat între timp
+    best_idx, best_score = snapshot.search(tokens)
+    return (snapshot.answers[best_idx] if best_idx is not None else None), best_score
+
+# ---------------- METRICS ----------------
+stage_timer = metrics.CHAT_STAGE_SECONDS.time
+
+metrics.Gauge("bodai_active_sessions", "Sesiuni de context ținute în memorie.", context.active_sessions)
+metrics.Gauge("bodai_indexed_users", "Utilizatori cu indexul de amintiri în RAM.", lambda: len(db.memory_indexes))
+metrics.Gauge("bodai_kb_entries", "Intrări în knowledge base.", lambda: len(kb.current()))
+metrics.Gauge("bodai_reply_cache_entries", "Răspunsuri ținute în cache.", lambda: len(replies))
+metrics.Gauge("bodai_reply_cache_hit_ratio", "Fracțiunea mesajelor /chat servite din cache.", reply_cache.hit_ratio)
+
+# ---------------- CONCURRENCY ----------------
+# /chat face I/O SQLite și scorare CPU; totul rulează într-un pool dedicat și
+# mărginit, astfel încât bucla async nu se blochează, iar cererile lente nu
+# ocupă threadpool-ul comun al Starlette.
+chat_cfg = config.get("chat", {})
+CHAT_WORKERS = chat_cfg.get("workers", 8)
+CHAT_MAX_CONCURRENCY = chat_cfg.get("max_concurrency", 64)
+CHAT_QUEUE_TIMEOUT = chat_cfg.get("queue_timeout_seconds", 5)
+CHAT_TIMEOUT = chat_cfg.get("timeout_seconds", 10)
+BATCH_MAX_MESSAGES = chat_cfg.get("batch_max_messages", 10000)
+BATCH_TIMEOUT = chat_cfg.get("batch_timeout_seconds", 300)
+# mesaje per tranzacție în /chat/batch (cât de des e eliberat lock-ul de scriere)
+BATCH_COMMIT_EVERY = max(1, chat_cfg.get("batch_commit_every", 100))
+
+# răspunsurile deterministe, după textul normalizat și versiunile datelor (vezi app/reply_cache.py)
+replies = reply_cache.ReplyCache(chat_cfg.get("reply_cache_size", reply_cache.MAX_ENTRIES),
+                                 chat_cfg.get("reply_cache_ttl_seconds", reply_cache.TTL))
+# etape cu efecte secundare (învățare, uitare) sau alegere aleatoare (pattern_response)
+UNCACHED_STAGES = {"learn", "profile_learn", "forget", "pattern"}
+
+# recreate la fiecare pornire (lifespan): după oprire, executorul nu mai acceptă lucru,
+# iar semaforul e legat de bucla async pe care a fost folosit
+chat_executor = ThreadPoolExecutor(max_workers=CHAT_WORKERS, thread_name_prefix="chat")
+chat_slots = asyncio.Semaphore(CHAT_MAX_CONCURRENCY)
+
+async def run_chat(fn, *args, timeout: float = CHAT_TIMEOUT, cancel: threading.Event | None = None):
+    """
+    Rulează `fn(*args)` în executorul /chat, cu limită de concurență și timeout.
+
+    La timeout clientul primește 504, dar firul nu poate fi întrerupt: locul
+    din `chat_slots` rămâne ocupat până când `fn` se termină efectiv, deci
+    limita de concurență acoperă și lucrul abandonat. Un 504 NU înseamnă că
+    mesajul nu a fost aplicat: ce a apucat să învețe/uite rămâne scris.
+    Dacă e dat `cancel`, e setat la timeout, iar `fn` îl poate verifica
+    pentru a sări peste scrierile rămase (vezi process_batch).
+    """
+    try:
+        await asyncio.wait_for(chat_slots.acquire(), CHAT_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Server ocupat, încearcă din nou.")
+    loop = asyncio.get_running_loop()
+    try:
+        job = chat_executor.submit(fn, *args)
+    except BaseException:
+        chat_slots.release()
+        raise
+    job.add_done_callback(lambda _job: _release_slot(loop))
+    try:
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job)), timeout)
+    except asyncio.TimeoutError:
+        if cancel is not None:
+            cancel.set()
+        raise HTTPException(status_code=504, detail="Procesarea mesajului a durat prea mult.")
+
+def _release_slot(loop: asyncio.AbstractEventLoop) -> None:
+    """Eliberează locul din `chat_slots` pe bucla care l-a ocupat (apelat din firul executorului)."""
+    try:
+        loop.call_soon_threadsafe(chat_slots.release)
+    except RuntimeError:
+        pass  # bucla s-a închis deja (oprirea serverului)
+
+# ---------------- STARTUP ----------------
+# Importul modulului nu atinge datele: schema SQLite, contextul și indexul KB
+# sunt pregătite de warm_up(), pe un fir pornit din lifespan, deci serverul
+# acceptă conexiuni imediat, indiferent de mărimea datelor. Cererile API
+# așteaptă (cel mult STARTUP_WAIT secunde) până când serviciul e pregătit.
+STARTUP_WAIT = server_cfg.get("startup_wait_seconds", 30)
+# cererile care nu depind de date răspund și în timpul pornirii
+READY_EXEMPT = {"/health", "/health/ready", "/metrics"}
+
+ready = threading.Event()
+startup_error: str | None = None
+_warm_lock = threading.Lock()
+
+def warm_up() -> None:
+    """Pregătește serviciul (schema, contextul, KB, joburile de fundal); apelurile repetate nu mai fac nimic."""
+    with _warm_lock:
+        if ready.is_set():
+            return
+        started = time.perf_counter()
+        db.init_db()
+        context.load_context()
+        kb.current()
+        kb.start_watcher()
+        if WORKERS == 1:
+            # cu mai mulți workeri, retenția și backup-ul rulează o singură dată, în procesul launcher-ului
+            retention.start()
+            backup.start()
+        ready.set()
+        log.info("BODAI pregătit în %.3fs.", time.perf_counter() - started)
+
+def _warm_up_in_background() -> None:
+    global startup_error
+    try:
+        warm_up()
+    except Exception as e:
+        startup_error = f"{type(e).__name__}: {e}"
+        log.exception("Pornirea a eșuat.")
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """
+    Pornire: executor /chat nou și warm-up pe un fir de fundal. Oprire:
+    joburile de fundal și executorul sunt oprite, iar `ready` e resetat,
+    deci o nouă pornire în același proces (teste, reload) refă warm-up-ul.
+    """
+    global chat_executor, chat_slots, startup_error
+    chat_executor = ThreadPoolExecutor(max_workers=CHAT_WORKERS, thread_name_prefix="chat")
+    chat_slots = asyncio.Semaphore(CHAT_MAX_CONCURRENCY)
+    startup_error = None
+    warm = threading.Thread(target=_warm_up_in_background, name="warm-up", daemon=True)
+    warm.start()
+    try:
+        yield
+    finally:
+        await asyncio.get_running_loop().run_in_executor(None, warm.join)
+        with _warm_lock:
+            ready.clear()
+            kb.stop_watcher()
+            retention.stop()
+            backup.stop()
+        chat_executor.shutdown(wait=True, cancel_futures=True)
+        context.flush_context()
+        db.close_connections()
+
+async def wait_until_ready(request: Request) -> None:
+    """Dependență globală: cererile API așteaptă încheierea pornirii (503 după STARTUP_WAIT)."""
+    if ready.is_set() or request.url.path in READY_EXEMPT:
+        return
+    deadline = time.monotonic() + STARTUP_WAIT
+    while not ready.is_set():
+        if startup_error is not None or time.monotonic() > deadline:
+            raise HTTPException(status_code=503, detail="Serverul pornește, încearcă din nou.",
+                                headers={"Retry-After": "1"})
+        await asyncio.sleep(0.01)
+
 # ---------------- ENDPOINTS ----------------
+app = FastAPI(title=config["app_name"], version=config["version"], lifespan=lifespan,
+              dependencies=[Depends(wait_until_ready)])
+
 @app.get("/health")
 def health_check():
-    return {"status": "OK", "version": config["version"]}
-
-@app.post("/chat")
-def chat(msg: Message):
-    user_text = msg.message.strip()
-    if not user_text:
-        raise HTTPException(status_code=400, detail="Mesajul este gol.")
-
-    text_norm = nlp_utils.remove_diacritics(user_text.lower())
-    context.add_message("user", user_text)
-
+    """Liveness: procesul răspunde, și în timpul pornirii; `ready` arată dacă servește cereri."""
+    return {"status": "OK", "version": config["version"], "ready": ready.is_set()}
+
+@app.get("/health/ready")
+def readiness_check():
+    """Readiness: 200 după pornire, 503 cât timp indexurile se încarcă (sau dacă pornirea a eșuat)."""
+    if ready.is_set():
+        return {"status": "ready", "kb_version": kb.current().info()["version"]}
+    if startup_error is not None:
+        return JSONResponse(status_code=503, content={"status": "failed", "error": startup_error})
+    return JSONResponse(status_code=503, content={"status": "starting"})
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Metricile aplicației în formatul text Prometheus."""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+def route_reply(rule, user_text: str, uid: str) -> str | None:
+    """Răspunsul pentru o regulă din chat_router, sau None dacă regula nu se aplică."""
     # 0) învățare directă manuală
-    if text_norm.startswith(("tine minte ca", "noteaza ca", "salveaza ca")):
+    if rule.name == "learn":
         info = user_text.split("ca", 1)[-1].strip()
         if info:
-            db.add_memory(info)
-            reply = f"Am notat: {info}"
-        else:
-            reply = "Spune-mi exact ce vrei să țin minte."
-        context.add_message("bot", reply)
-        return {"reply": reply}
+            db.add_memory(info, uid)
+            return f"Am notat: {info}"
+        return "Spune-mi exact ce vrei să țin minte."
 
     # 0.2) învățare automată (profil personal)
-    personal_triggers = [
-        ("imi place", "hobby"), ("îmi place", "hobby"),
-        ("prefer", "preferinta"), ("locuiesc in", "loc"),
-        ("sunt din", "loc"), ("ma numesc", "identitate"),
-        ("lucrez ca", "profesie")
-    ]
-    for trigger, cat in personal_triggers:
-        if trigger in text_norm:
-            info = user_text.split(trigger, 1)[-1].strip()
-            if info:
-                db.add_profile_info(cat, info)
-                reply = f"Am notat în profilul tău că {trigger} {info}."
-                context.add_message("bot", reply)
-                return {"reply": reply}
+    if rule.name == "profile_learn":
+        trigger, cat = rule.payload
+        info = user_text.split(trigger, 1)[-1].strip()
+        if not info:
+            return None
+        db.add_profile_info(cat, info, uid)
+        return f"Am notat în profilul tău că {trigger} {info}."
 
     # 0.5) uitare
-    if text_norm.startswith("uita ca"):
+    if rule.name == "forget":
         info = user_text.split("ca", 1)[-1].strip()
         if not info:
-            reply = "Spune-mi ce vrei să uit."
-            context.add_message("bot", reply)
-            return {"reply": reply}
-
-        rows = db.search_memories()
-        deleted = []
-        for r in rows:
-            if fuzz.partial_ratio(info.lower(), r[1].lower()) > 70:
-                conn = db.get_connection()
-                cur = conn.cursor()
-                cur.execute("DELETE FROM memory WHERE id=?", (r[0],))
-                conn.commit()
-                conn.close()
-                deleted.append(r[1])
-        reply = f"Am uitat: {', '.join(deleted)}" if deleted else "Nu am găsit nimic de uitat."
-        context.add_message("bot", reply)
-        return {"reply": reply}
+            return "Spune-mi ce vrei să uit."
+        from rapidfuzz import fuzz, process
+
+        if MEMORY_RETRIEVER == "fts":
+            rows = memory_fts.bounded_rows(uid, normalize.tokens(info))
+        else:
+            rows = db.get_memory_index(uid).rows()
+        found = process.extract(
+            info, [r[1] for r in rows], scorer=fuzz.partial_ratio,
+            processor=str.lower, score_cutoff=70, limit=None
+        )
+        picked = sorted(idx for _, score, idx in found if score > 70)
+        db.delete_memories((rows[i][0] for i in picked), uid)
+        deleted = [rows[i][1] for i in picked]
+        return f"Am uitat: {', '.join(deleted)}" if deleted else "Nu am găsit nimic de uitat."
 
     # 1) pattern matching
-    pattern_resp = match_pattern(text_norm)
-    if pattern_resp:
-        context.add_message("bot", pattern_resp)
-        return {"reply": pattern_resp}
+    if rule.name == "pattern":
+        return pattern_response(rule.payload)
 
     # 1.5) conversații simple
-    conversational = {
-        "salut": "Bună, eu sunt BODAI.",
-        "buna": "Salut! Ce mai faci?",
-        "ce faci": "Sunt bine, tu ce faci?",
-        "cum esti": "Sunt bine, mulțumesc! Tu?",
-        "cine esti": "Sunt BODAI, asistentul tău personal."
-    }
-    for key, resp in conversational.items():
-        if key in text_norm:
-            context.add_message("bot", resp)
-            return {"reply": resp}
+    if rule.name == "conversational":
+        return rule.payload
 
     # 2) întrebare despre profil
-    if "ce stii despre mine" in text_norm or "despre mine" in text_norm:
-        profile = db.get_profile()
+    if rule.name == "profile_summary":
+        profile = db.get_cached_profile(uid).rows
         if not profile:
-            reply = "Încă nu știu prea multe despre tine. Spune-mi ce îți place sau unde locuiești. 🙂"
-        else:
-            summary = []
-            for cat, info in profile:
-                if cat == "hobby": summary.append(f"îți place {info}")
-                elif cat == "loc": summary.append(f"locuiești în {info}")
-                elif cat == "profesie": summary.append(f"lucrezi ca {info}")
-                elif cat == "preferinta": summary.append(f"preferi {info}")
-                elif cat == "identitate": summary.append(f"te numești {info}")
-            reply = "Știu despre tine că " + ", ".join(summary) + "."
-        context.add_message("bot", reply)
-        return {"reply": reply}
+            return "Încă nu știu prea multe despre tine. Spune-mi ce îți place sau unde locuiești. 🙂"
+        summary = []
+        for cat, info in profile:
+            if cat == "hobby": summary.append(f"îți place {info}")
+            elif cat == "loc": summary.append(f"locuiești în {info}")
+            elif cat == "profesie": summary.append(f"lucrezi ca {info}")
+            elif cat == "preferinta": summary.append(f"preferi {info}")
+            elif cat == "identitate": summary.append(f"te numești {info}")
+        return "Știu despre tine că " + ", ".join(summary) + "."
+    return None
+
+def answer(stage: str, reply: str, sid: str) -> str:
+    """Înregistrează răspunsul în context și etapa care a răspuns în metrici."""
+    metrics.CHAT_ANSWERS.inc(stage)
+    context.add_message("bot", reply, sid)
+    return reply
+
+def process_message(user_text: str, uid: str, sid: str) -> str:
+    """
+    Pipeline-ul sincron al unui mesaj (rutare, învățare, retrieval, KB).
+    Rulează în executorul dedicat /chat; returnează răspunsul.
+    """
+    with stage_timer("total"):
+        return _process_message(user_text, uid, sid)
+
+def _process_message(user_text: str, uid: str, sid: str) -> str:
+    # textul e normalizat o singură dată; toate etapele folosesc aceleași forme
+    norm = normalize.normalize(user_text)
+    # modificările altor workeri (KB, amintiri, profil); fără efect cu un singur proces
+    db.sync_changes()
+    context.add_message("user", user_text, sid)
+
+    # versiunile sunt citite înaintea calculului: o scriere concurentă doar invalidează cheia
+    key = (uid, norm.lower, db.data_version(uid), kb.current().version)
+    cached = replies.get(key)
+    if cached is not None:
+        return answer("cache", cached, sid)
+
+    stage, reply = compute_reply(user_text, norm, uid)
+    # în interiorul unui lot, răspunsul poate depinde de scrieri încă necomise
+    if stage not in UNCACHED_STAGES and not db.has_pending_changes():
+        replies.put(key, reply)
+    return answer(stage, reply, sid)
+
+def compute_reply(user_text: str, norm: normalize.NormalizedText, uid: str) -> Tuple[str, str]:
+    """Etapa care răspunde și răspunsul ei: (etapă, răspuns)."""
+    # 0) – 2) o singură trecere a routerului; regulile vin în ordinea pașilor
+    with stage_timer("route"):
+        hits = chat_router.scan(norm.folded)
+    for hit in hits:
+        rule = hit.rule
+        with stage_timer(rule.name):
+            reply = route_reply(rule, user_text, uid)
+        if reply is not None:
+            log.debug("route: %s (%r)", rule.name, rule.pattern)
+            return rule.name, reply
 
     # 3) memorie conversațională (TF-IDF + fuzzy)
-    tokens = nlp_utils.tokenize(user_text)
-    rows = db.search_memories()
-    if rows:
-        mem_texts = [r[1] for r in rows]
-        mem_docs = [nlp_utils.tokenize(t) for t in mem_texts]
-        mvocab, mdf, mN = nlp_utils.build_tfidf(mem_docs)
-        mvecs = [nlp_utils.tfidf_vector(doc, mvocab, mdf, mN) for doc in mem_docs]
-        qvec = nlp_utils.tfidf_vector(tokens, mvocab, mdf, mN)
-
-        best_idx, best_score = None, 0.0
-        for i, dvec in enumerate(mvecs):
-            s = nlp_utils.cosine_sim(qvec, dvec)
-            if s > best_score:
-                best_idx, best_score = i, s
-        print(f"DEBUG => MEM TF-IDF: {best_score:.3f}")
-
-        if best_idx is not None and best_score > 0.05:
-            match = rows[best_idx][1]
-            reply = smart_reply(user_text, match)
-            context.add_message("bot", reply)
-            return {"reply": reply}
-
-        personal_mode = is_personal_query(user_text)
-        candidates = rows if not personal_mode else [r for r in rows if looks_personal_memory(r[1])]
-        best_f_idx, best_f_score = None, 0
-        for i, row in enumerate(candidates):
-            s = fuzz.partial_ratio(user_text.lower(), row[1].lower())
-            if s > best_f_score:
-                best_f_idx, best_f_score = i, s
-        print(f"DEBUG => MEM Fuzzy ({'personal' if personal_mode else 'all'}): {best_f_score}")
-
-        if best_f_idx is not None and best_f_score > 50:
-            picked = candidates[best_f_idx][1]
-            reply = smart_reply(user_text, picked, best_f_score)
-            context.add_message("bot", reply)
-            return {"reply": reply}
+    tokens = norm.tokens
+    reply_hits = reply_router.scan(norm.lower)
+    mem_index = memory_source(uid, tokens)
+    if len(mem_index):
+        with stage_timer("memory_tfidf"):
+            best_id, best_score = search_memory_tfidf(mem_index, tokens)
+        log.debug("MEM TF-IDF: %.3f", best_score)
+
+        if best_id is not None and best_score > 0.05:
+            match = mem_index.get(best_id)
+            return "memory_tfidf", smart_reply(user_text, match, user_id=uid, hits=reply_hits, norm=norm)
+
+        personal_mode = is_personal_query(user_text, reply_hits)
+        with stage_timer("memory_fuzzy"):
+            picked, best_f_score = search_memory_fuzzy(mem_index, norm.folded, personal_mode)
+        log.debug("MEM Fuzzy (%s): %s", "personal" if personal_mode else "all", best_f_score)
+
+        if picked is not None and best_f_score > 50:
+            return "memory_fuzzy", smart_reply(user_text, picked, best_f_score, user_id=uid, hits=reply_hits, norm=norm)
 
     # 4) knowledge base
-    qvec_kb = nlp_utils.tfidf_vector(tokens, kb_vocab, kb_df, kb_N)
-    best_kb_idx, best_kb_score = None, 0.0
-    for i, dvec in enumerate(kb_vectors):
-        s = nlp_utils.cosine_sim(qvec_kb, dvec)
-        if s > best_kb_score:
-            best_kb_idx, best_kb_score = i, s
-    print(f"DEBUG => KB score: {best_kb_score:.3f}")
-
-    if best_kb_idx is not None and best_kb_score > 0.15:
-        reply = knowledge_base[best_kb_idx]["a"]
-        context.add_message("bot", reply)
-        return {"reply": reply}
+    with stage_timer("kb"):
+        kb_answer, best_kb_score = search_kb(tokens)
+    log.debug("KB score: %.3f", best_kb_score)
+
+    if kb_answer is not None and best_kb_score > 0.15:
+        return "kb", kb_answer
 
     # 5) fallback final
-    reply = smart_reply(user_text)
-    context.add_message("bot", reply)
+    with stage_timer("fallback"):
+        reply = smart_reply(user_text, user_id=uid, hits=reply_hits, norm=norm)
+    return "fallback", reply
+
+@app.post("/chat")
+async def chat(msg: Message):
+    user_text = msg.message.strip()
+    if not user_text:
+        raise HTTPException(status_code=400, detail="Mesajul este gol.")
+
+    uid = msg.user_id
+    sid = msg.session_id or uid
+    reply = await run_chat(process_message, user_text, uid, sid)
     return {"reply": reply}
 
+def process_batch(messages: List[str], uid: str, sid: str,
+                  cancel: threading.Event | None = None) -> List[dict]:
+    """
+    Procesează mesajele în ordine, cu stare partajată pe tot lotul: profilul
+    și indexul de amintiri sunt încărcate o singură dată, iar ce se
+    învață/uită e scris în tranzacții de câte BATCH_COMMIT_EVERY mesaje,
+    ca lock-ul de scriere SQLite să nu fie ținut pe toată durata lotului.
+    Dacă `cancel` e setat (lotul a depășit timeout-ul), tranzacțiile deja
+    confirmate rămân, iar mesajele rămase nu mai sunt procesate.
+    """
+    if MEMORY_RETRIEVER == "index":
+        db.get_memory_index(uid)
+    db.get_cached_profile(uid)
+    results = []
+    for start in range(0, len(messages), BATCH_COMMIT_EVERY):
+        if cancel is not None and cancel.is_set():
+            break
+        with db.transaction():
+            for message in messages[start:start + BATCH_COMMIT_EVERY]:
+                user_text = message.strip()
+                if not user_text:
+                    results.append({"error": "Mesajul este gol."})
+                    continue
+                results.append({"reply": process_message(user_text, uid, sid)})
+    return results
+
+@app.post("/chat/batch")
+async def chat_batch(batch: BatchMessages):
+    """Procesează o listă de mesaje (reluare de loguri, seturi de regresie, importuri)."""
+    if len(batch.messages) > BATCH_MAX_MESSAGES:
+        raise HTTPException(status_code=413, detail=f"Maxim {BATCH_MAX_MESSAGES} mesaje per lot.")
+    uid = batch.user_id
+    sid = batch.session_id or uid
+    cancel = threading.Event()
+    batch_replies = await run_chat(process_batch, batch.messages, uid, sid, cancel,
+                                   timeout=BATCH_TIMEOUT, cancel=cancel)
+    return {"replies": batch_replies}
+
 # ---------------- CONTEXT MANAGEMENT ----------------
 @app.get("/context")
-def get_context():
-    return {"context": context.get_context()}
+def get_context(session_id: str = context.DEFAULT_SESSION):
+    return {"context": context.get_context(session_id)}
 
 @app.delete("/context")
-def clear_context():
-    context.clear_context()
+def clear_context(session_id: str = context.DEFAULT_SESSION):
+    context.clear_context(session_id)
     return {"status": "cleared"}
 
+# ---------------- KNOWLEDGE BASE ADMIN ----------------
+@app.get("/admin/kb")
+def kb_status():
+    """Versiunea KB încărcată și dacă o reîncărcare este în curs."""
+    return {**kb.current().info(), "reloading": kb.reloading()}
+
+@app.post("/admin/kb/reload", status_code=202)
+def kb_reload():
+    """Reconstruiește KB în fundal; cererile continuă pe versiunea curentă până la înlocuire."""
+    started = kb.reload_in_background()
+    db.publish_change("kb")
+    return {"status": "started" if started else "already_running", "version": kb.current().info()["version"]}
+
+# ---------------- RETENTION ADMIN ----------------
+@app.post("/admin/retention/run")
+def run_retention():
+    """Aplică imediat politicile de retenție; returnează câte amintiri au fost arhivate."""
+    return {"archived": retention.run()}
+
+# ---------------- PAGINATION ----------------
+# listările sunt paginate după id (keyset): ?after_id=<ultimul id primit>&limit=N
+PAGE_LIMIT = 50
+PAGE_LIMIT_MAX = 1000
+# cu ?stream=true tot setul e trimis ca JSON în flux, citit din SQLite pe pagini de atâtea rânduri
+STREAM_PAGE_SIZE = 1000
+
+def page_response(key: str, rows, limit: int, to_item) -> dict:
+    """O pagină + cursorul pentru următoarea (None dacă nu mai există)."""
+    return {key: [to_item(r) for r in rows], "next_after_id": rows[-1][0] if len(rows) == limit else None}
+
+def stream_json(key: str, pages, to_item) -> StreamingResponse:
+    """Același format ca `page_response`, construit incremental, pagină cu pagină."""
+    def body():
+        yield f'{{"{key}": ['
+        sep = ""
+        for rows in pages:
+            yield sep + ",".join(json.dumps(to_item(r), ensure_ascii=False) for r in rows)
+            sep = ","
+        yield '], "next_after_id": null}'
+    return StreamingResponse(body(), media_type="application/json")
+
+def memory_item(row) -> dict:
+    return {"id": row[0], "text": row[1], "timestamp": row[2]}
+
+def profile_item(row) -> dict:
+    return {"id": row[0], "category": row[1], "info": row[2], "timestamp": row[3]}
+
+# -------------------- MEMORY LISTING --------------------
+@app.get("/memories")
+def list_memories(user_id: str = db.DEFAULT_USER, after_id: int = Query(0, ge=0),
+                  limit: int = Query(PAGE_LIMIT, ge=1, le=PAGE_LIMIT_MAX), stream: bool = False):
+    """Amintirile utilizatorului, în ordinea id-urilor, paginate după id."""
+    if stream:
+        pages = db.iter_pages(lambda after, n: db.list_memories(user_id, after, n), after_id, STREAM_PAGE_SIZE)
+        return stream_json("memories", pages, memory_item)
+    return page_response("memories", db.list_memories(user_id, after_id, limit), limit, memory_item)
+
+# ---------------- BACKUP ADMIN ----------------
+@app.post("/admin/backup")
+def run_backup():
+    """Backup online verificat al bazei de date (nu blochează scrierile)."""
+    try:
+        path = backup.run()
+    except (sqlite3.Error, OSError, backup.BackupError) as e:
+        raise HTTPException(status_code=500, detail=f"Backup eșuat: {e}")
+    return {"status": "ok", "path": path}
+
+# -------------------- IMPORT / EXPORT --------------------
+# câte bucăți din corpul cererii așteaptă importul (memorie constantă, cu backpressure)
+IMPORT_QUEUE_CHUNKS = 16
+# pus în coadă când corpul cererii nu mai poate fi citit până la capăt
+IMPORT_ABORT = object()
+
+@app.get("/export")
+def export_data(user_id: str | None = None, types: str = ",".join(bulk.TYPES),
+                session_id: List[str] = Query(default=[])):
+    """
+    Exportă amintirile, profilul și contextul ca NDJSON în flux. Fără `user_id`
+    sunt exportați toți utilizatorii; contextul e exportat pentru sesiunile
+    `session_id` (implicit sesiunea utilizatorului).
+    """
+    kinds = [t for t in types.split(",") if t]
+    if any(t not in bulk.TYPES for t in kinds):
+        raise HTTPException(status_code=400, detail=f"Tipuri permise: {', '.join(bulk.TYPES)}.")
+    sessions = session_id or [user_id or context.DEFAULT_SESSION]
+    batches = bulk.export_records(user_id, kinds, sessions)
+    return StreamingResponse(bulk.to_ndjson(batches), media_type="application/x-ndjson")
+
+@app.post("/import")
+async def import_data(request: Request, user_id: str = db.DEFAULT_USER):
+    """
+    Importă NDJSON în flux (vezi `app/bulk.py`); `user_id` e folosit pentru
+    înregistrările fără utilizator. Nimic nu e scris până la ultima linie
+    validă; scrierea se face apoi în tranzacții scurte.
+    """
+    chunks: "queue.Queue[bytes | object | None]" = queue.Queue(maxsize=IMPORT_QUEUE_CHUNKS)
+
+    def lines():
+        rest = b""
+        while (chunk := chunks.get()) is not None:
+            if chunk is IMPORT_ABORT:
+                raise bulk.ImportAborted()
+            *complete, rest = (rest + chunk).split(b"\n")
+            yield from complete
+        yield rest
+
+    future = asyncio.get_running_loop().run_in_executor(
+        None, lambda: bulk.import_records(bulk.parse_ndjson(lines()), user_id)
+    )
+
+    async def feed(item: bytes | None) -> None:
+        while not future.done():
+            try:
+                chunks.put_nowait(item)
+                return
+            except queue.Full:
+                await asyncio.sleep(0.005)
+
+    def abort() -> None:
+        # fără await: rulează și când cererea e anulată; bucățile încă necitite nu mai contează
+        while not future.done():
+            try:
+                chunks.put_nowait(IMPORT_ABORT)
+                return
+            except queue.Full:
+                try:
+                    chunks.get_nowait()
+                except queue.Empty:
+                    pass
+
+    complete = False
+    try:
+        async for chunk in request.stream():
+            if future.done():
+                break
+            await feed(chunk)
+        await feed(None)
+        complete = True
+    finally:
+        if not complete:
+            # clientul s-a deconectat: firul de import primește semnalul de oprire și nu scrie nimic
+            abort()
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    try:
+        stats = await future
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "imported", "imported": stats}
+
 # -------------------- USER PROFILE MANAGEMENT --------------------
 @app.get("/profile")
-def list_profile():
-    """Returnează toate informațiile din profilul personal."""
-    prof = db.get_profile()
-    results = [{"id": i+1, "category": cat, "info": info} for i, (cat, info) in enumerate(prof)]
-    return {"profile": results}
+def list_profile(user_id: str = db.DEFAULT_USER, category: str | None = None, after_id: int = Query(0, ge=0),
+                 limit: int = Query(PAGE_LIMIT, ge=1, le=PAGE_LIMIT_MAX), stream: bool = False):
+    """Informațiile din profilul personal (id-uri reale), opțional filtrate pe categorie, paginate după id."""
+    if stream:
+        pages = db.iter_pages(lambda after, n: db.list_profile(user_id, category, after, n), after_id, STREAM_PAGE_SIZE)
+        return stream_json("profile", pages, profile_item)
+    return page_response("profile", db.list_profile(user_id, category, after_id, limit), limit, profile_item)
 
 @app.put("/profile/{profile_id}")
 def update_profile(profile_id: int, msg: Message):
     """Actualizează o intrare din profilul personal."""
-    conn = db.get_connection()
-    cur = conn.cursor()
-    cur.execute("UPDATE user_profile SET info=? WHERE id=?", (msg.message, profile_id))
-    conn.commit()
-    conn.close()
+    db.update_profile_entry(profile_id, msg.message, msg.user_id)
     return {"status": "updated", "id": profile_id, "new_info": msg.message}
 
 @app.delete("/profile/{profile_id}")
-def delete_profile(profile_id: int):
+def delete_profile(profile_id: int, user_id: str = db.DEFAULT_USER):
     """Șterge o intrare din profilul personal."""
-    db.delete_profile_entry(profile_id)
+    db.delete_profile_entry(profile_id, user_id)
     return {"status": "deleted", "id": profile_id}
 
 # ---------------- STATIC FRONTEND ----------------
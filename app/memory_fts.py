@@ -0,0 +1,183 @@
+"""
+Retriever de amintiri bazat pe SQLite FTS5 (`memory.retriever: fts`).
+
+Tabela virtuală `memory_fts` oglindește `memory` (ținută la zi prin
+triggere, vezi `db.init_db`) și folosește tokenizer-ul `unicode61
+remove_diacritics 2`. Pentru fiecare mesaj sunt citite din SQLite doar
+primele N amintiri după BM25; scorarea TF-IDF și fuzzy din /chat rulează
+apoi numai pe acești candidați, deci costul nu depinde de mărimea tabelei.
+Utilizatorul e un token în coloana `user_key`, intersectat în MATCH cu
+termenii mesajului.
+
+Dacă niciun termen nu apare în amintiri (de ex. o greșeală de tastare),
+fuzzy-ul rulează pe ultimele FUZZY_FALLBACK amintiri ale utilizatorului:
+o amintire mai veche, scrisă greșit, nu mai e găsită ca în indexul din RAM.
+
+IDF-ul folosește DF-ul din `memory_fts_vocab` (fts5vocab) și numărul total
+de amintiri, ținute într-un cache cu TTL: scorurile pot rămâne în urmă cu
+câteva secunde față de ultimele scrieri.
+"""
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app import db, normalize
+from app.memory_index import FUZZY_SCORE_CUTOFF, fuzzy_key, looks_personal_memory
+
+# câți candidați BM25 primește scorarea TF-IDF/fuzzy
+CANDIDATES: int = 100
+# câte amintiri recente primește fuzzy-ul când BM25 nu găsește niciun candidat
+FUZZY_FALLBACK: int = 500
+# cât timp (secunde) sunt refolosite DF-ul termenilor și numărul de amintiri
+STATS_TTL: float = 30.0
+# termeni ținuți în cache-ul de DF
+DF_CACHE_SIZE: int = 100000
+
+_stats_lock = threading.Lock()
+_df_cache: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+_doc_count: Tuple[int, float] = (0, 0.0)
+
+
+def _fold(term: str) -> str:
+    # forma termenului în indexul FTS (fără diacritice)
+    return normalize.strip_diacritics(term)
+
+
+def match_query(tokens: Iterable[str]) -> Optional[str]:
+    """Expresia MATCH: oricare dintre termeni (fiecare între ghilimele)."""
+    terms = list(dict.fromkeys(_fold(t) for t in tokens))
+    return " OR ".join(f'"{t}"' for t in terms) if terms else None
+
+
+def doc_count() -> int:
+    global _doc_count
+    count, stamp = _doc_count
+    now = time.monotonic()
+    if now - stamp > STATS_TTL:
+        count = db.connection().execute("SELECT COUNT(*) FROM memory").fetchone()[0]
+        _doc_count = (count, now)
+    return count
+
+
+def doc_freqs(terms: Sequence[str]) -> Dict[str, int]:
+    """DF-ul (numărul de amintiri) pentru termenii dați, din fts5vocab, cu cache TTL."""
+    now = time.monotonic()
+    result: Dict[str, int] = {}
+    missing: List[str] = []
+    with _stats_lock:
+        for term in terms:
+            cached = _df_cache.get(term)
+            if cached is not None and now - cached[1] <= STATS_TTL:
+                result[term] = cached[0]
+            else:
+                missing.append(term)
+    if missing:
+        found = dict(db.connection().execute(
+            f"SELECT term, doc FROM memory_fts_vocab WHERE col = 'text' AND term IN ({','.join('?' * len(missing))})",
+            missing
+        ).fetchall())
+        with _stats_lock:
+            for term in missing:
+                result[term] = found.get(term, 0)
+                _df_cache[term] = (result[term], now)
+                _df_cache.move_to_end(term)
+            while len(_df_cache) > DF_CACHE_SIZE:
+                _df_cache.popitem(last=False)
+    return result
+
+
+def candidates(user_id: str, tokens: Iterable[str], limit: Optional[int] = None) -> List[Tuple[int, str]]:
+    """Primele `limit` amintiri ale utilizatorului după BM25 (id, text)."""
+    query = match_query(tokens)
+    if query is None:
+        return []
+    return db.connection().execute(
+        "SELECT m.id, m.text FROM memory_fts JOIN memory m ON m.id = memory_fts.rowid "
+        "WHERE memory_fts MATCH ? ORDER BY bm25(memory_fts, 1.0, 0.0) LIMIT ?",
+        (f'user_key : "{db.fts_user_key(user_id)}" AND text : ({query})', limit or CANDIDATES),
+    ).fetchall()
+
+
+def recent(user_id: str, limit: Optional[int] = None) -> List[Tuple[int, str]]:
+    """Ultimele `limit` amintiri ale utilizatorului (id, text), prin idx_memory_user."""
+    return db.connection().execute(
+        "SELECT id, text FROM memory WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+        (user_id, limit or FUZZY_FALLBACK),
+    ).fetchall()
+
+
+def bounded_rows(user_id: str, tokens: Iterable[str]) -> List[Tuple[int, str]]:
+    """
+    Amintirile în care caută uitarea: candidații BM25 plus cele recente,
+    ordonate după id. Înlocuiește `MemoryIndex.rows()` (toate amintirile).
+    """
+    rows = dict(candidates(user_id, tokens, CANDIDATES * 10))
+    rows.update(recent(user_id))
+    return sorted(rows.items())
+
+
+class FtsCandidates:
+    """
+    Candidații BM25 pentru un mesaj, cu aceeași interfață ca `MemoryIndex`
+    (`search`, `fuzzy_search`, `get`, `rows`), ca pipeline-ul /chat să nu
+    depindă de retriever.
+    """
+
+    def __init__(self, rows: List[Tuple[int, str]], exact: bool = True) -> None:
+        self.texts: Dict[int, str] = dict(sorted(rows))
+        # False: amintiri recente fără termeni comuni cu mesajul (doar pentru fuzzy)
+        self.exact = exact
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def rows(self) -> List[Tuple[int, str]]:
+        return list(self.texts.items())
+
+    def get(self, mem_id: int) -> Optional[str]:
+        return self.texts.get(mem_id)
+
+    def search(self, tokens: List[str], k: int = 1) -> List[Tuple[int, float]]:
+        """Top-k (id, scor cosinus TF-IDF) printre candidați, cu IDF-ul întregului corpus."""
+        if not self.texts or not tokens or not self.exact:
+            return []
+        doc_tfs = {mem_id: Counter(normalize.tokens(text, cached=False)) for mem_id, text in self.texts.items()}
+        terms = {t for tf in doc_tfs.values() for t in tf} | set(tokens)
+        folded = {t: _fold(t) for t in terms}
+        df = doc_freqs(list(set(folded.values())))
+        n = doc_count()
+        idf = {t: math.log((n + 1) / (df.get(folded[t], 0) + 1)) + 1 for t in terms}
+
+        q = {t: c * idf[t] for t, c in Counter(tokens).items()}
+        q_norm = math.sqrt(sum(v * v for v in q.values()))
+        scored = []
+        for mem_id, tf in doc_tfs.items():
+            num = sum(q[t] * c * idf[t] for t, c in tf.items() if t in q)
+            if num <= 0:
+                continue
+            d_norm = math.sqrt(sum((c * idf[t]) ** 2 for t, c in tf.items()))
+            scored.append((-num / (q_norm * d_norm), mem_id))
+        scored.sort()
+        return [(mem_id, -score) for score, mem_id in scored[:k]]
+
+    def fuzzy_search(self, query: str, personal_only: bool = False,
+                     score_cutoff: float = FUZZY_SCORE_CUTOFF) -> Tuple[Optional[int], float]:
+        """Ca `MemoryIndex.fuzzy_search`, doar pe candidați."""
+        from rapidfuzz import fuzz, process
+
+        items = [(i, t) for i, t in self.texts.items() if not personal_only or looks_personal_memory(t)]
+        if not items:
+            return None, 0
+        found = process.extractOne(fuzzy_key(query), [fuzzy_key(t) for _, t in items], scorer=fuzz.partial_ratio,
+                                   processor=None, score_cutoff=score_cutoff)
+        return (items[found[2]][0], found[1]) if found else (None, 0)
+
+
+def retrieve(user_id: str, tokens: Iterable[str]) -> FtsCandidates:
+    """Candidații pentru un mesaj; fără potriviri exacte, amintirile recente (pentru fuzzy)."""
+    rows = candidates(user_id, tokens)
+    if rows:
+        return FtsCandidates(rows)
+    return FtsCandidates(recent(user_id), exact=False)
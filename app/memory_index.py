@@ -0,0 +1,229 @@
+import importlib.util
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app import nlp_utils, normalize
+
+# rapidfuzz și numpy sunt importate abia la prima căutare fuzzy (pornire mai rapidă);
+# numpy e necesar doar pentru process.cdist (căutarea paralelă)
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+# amintirile care par să fie despre utilizator (folosite în modul "personal")
+PERSONAL_MEM_PATTERNS = ["imi ", "îmi ", "am ", "m-am", "prefer", "plac", "îmi place", "imi place"]
+
+# pragul sub care rapidfuzz abandonează devreme comparația
+FUZZY_SCORE_CUTOFF = 50
+# Costul căutării fuzzy e liniar în numărul de amintiri ale utilizatorului
+# (măsurat pe un nucleu, scripts/bench_chat.py: ~1.3 ms p50 la 2k, ~6.6 ms la
+# 10k, ~113 ms la 100k). Cu pragul 50 nu există un pre-filtru ieftin care să
+# nu schimbe rezultatele; pentru seturi mari, costul e mărginit de
+# `retention.max_memories_per_user`, de cdist pe mai multe nuclee sau de
+# retriever-ul `fts` (fuzzy doar pe candidații BM25 / amintirile recente).
+# de la câte amintiri căutarea fuzzy se împarte pe mai multe nuclee (process.cdist)
+FUZZY_PARALLEL_MIN = 20000
+# firele folosite de process.cdist (-1 = toate nucleele)
+FUZZY_WORKERS = -1
+
+
+def looks_personal_memory(text: str) -> bool:
+    return any(p in text.lower() for p in PERSONAL_MEM_PATTERNS)
+
+
+def fuzzy_key(text: str) -> str:
+    """Forma textului comparată de căutarea fuzzy: litere mici, fără diacritice."""
+    return normalize.strip_diacritics(text.lower())
+
+
+class MemoryIndex:
+    """
+    Index TF-IDF incremental pentru tabela `memory`.
+
+    Ține în RAM documentele pre-tokenizate într-un `nlp_utils.InvertedIndex`
+    (postări, DF și norme în cache), astfel încât /chat nu mai citește tot
+    SQLite-ul și nu mai reconstruiește vocabularul la fiecare mesaj.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self.loaded: bool = False
+        # id -> text; ordinea de inserare = ordinea id-urilor (ca în SQLite)
+        self.texts: Dict[int, str] = {}
+        self.index = nlp_utils.InvertedIndex()
+        # id -> (text normalizat, e personală); calculate o singură dată per amintire
+        self.fuzzy: Dict[int, Tuple[str, bool]] = {}
+        # listele paralele (id-uri, texte) date lui rapidfuzz, pe mod; refăcute după modificări
+        self._choices: Dict[bool, Tuple[List[int], List[str]]] = {}
+
+    # ------------------- ÎNTREȚINERE -------------------
+
+    def load(self, rows: Iterable[Tuple[int, str]]) -> None:
+        """Reconstruiește indexul din rânduri (id, text)."""
+        with self._lock:
+            self.texts.clear()
+            self.index.clear()
+            self.fuzzy.clear()
+            self._choices.clear()
+            for mem_id, text in sorted(rows, key=lambda r: r[0]):
+                self.texts[mem_id] = text
+                self.index.add(mem_id, normalize.tokens(text, cached=False))
+                self.fuzzy[mem_id] = (fuzzy_key(text), looks_personal_memory(text))
+            self.loaded = True
+
+    def ensure_loaded(self, loader: Callable[[], Iterable[Tuple[int, str]]]) -> "MemoryIndex":
+        """Încarcă indexul cu `loader()` dacă nu a fost încă încărcat."""
+        with self._lock:
+            if not self.loaded:
+                self.load(loader())
+        return self
+
+    def add(self, mem_id: int, text: str) -> None:
+        """Adaugă o amintire nouă în index (ignorat cât timp nu e încărcat)."""
+        with self._lock:
+            if not self.loaded:
+                return
+            appended = mem_id not in self.texts and (not self.texts or mem_id > next(reversed(self.texts)))
+            self.texts.pop(mem_id, None)
+            self.texts[mem_id] = text
+            self.index.add(mem_id, normalize.tokens(text, cached=False))
+            key = self.fuzzy[mem_id] = (fuzzy_key(text), looks_personal_memory(text))
+            if appended:
+                # cazul obișnuit (id nou, cel mai mare): listele rămân valide
+                for personal_only, (ids, keys) in self._choices.items():
+                    if key[1] or not personal_only:
+                        ids.append(mem_id)
+                        keys.append(key[0])
+            else:
+                self._choices.clear()
+
+    def update(self, mem_id: int, text: str) -> None:
+        """Actualizează textul unei amintiri, păstrându-i poziția."""
+        with self._lock:
+            if mem_id not in self.texts:
+                return
+            self.texts[mem_id] = text
+            self.index.add(mem_id, normalize.tokens(text, cached=False))
+            self.fuzzy[mem_id] = (fuzzy_key(text), looks_personal_memory(text))
+            self._choices.clear()
+
+    def remove(self, mem_id: int) -> None:
+        """Scoate o amintire din index."""
+        with self._lock:
+            if self.texts.pop(mem_id, None) is not None:
+                self.index.remove(mem_id)
+                self.fuzzy.pop(mem_id, None)
+                self._choices.clear()
+
+    def remove_many(self, mem_ids: Iterable[int]) -> None:
+        """Scoate mai multe amintiri din index, sub un singur lock."""
+        with self._lock:
+            for mem_id in mem_ids:
+                if self.texts.pop(mem_id, None) is not None:
+                    self.index.remove(mem_id)
+                    self.fuzzy.pop(mem_id, None)
+            self._choices.clear()
+
+    def reset(self) -> None:
+        """Golește indexul; va fi reîncărcat la următoarea utilizare."""
+        with self._lock:
+            self.texts.clear()
+            self.index.clear()
+            self.fuzzy.clear()
+            self._choices.clear()
+            self.loaded = False
+
+    # ------------------- INTEROGARE -------------------
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def rows(self) -> List[Tuple[int, str]]:
+        """Returnează amintirile (id, text) în ordinea id-urilor."""
+        with self._lock:
+            return list(self.texts.items())
+
+    def get(self, mem_id: int) -> Optional[str]:
+        return self.texts.get(mem_id)
+
+    def search(self, tokens: List[str], k: int = 1) -> List[Tuple[int, float]]:
+        """
+        Returnează top-k amintiri (id, scor cosinus) pentru tokenii dați.
+        Scorurile sunt identice cu `tfidf_vector` + `cosine_sim` pe tot corpusul;
+        la egalitate câștigă id-ul mai mic.
+        """
+        with self._lock:
+            return self.index.search(tokens, k)
+
+    def _fuzzy_choices(self, personal_only: bool) -> Tuple[List[int], List[str]]:
+        choices = self._choices.get(personal_only)
+        if choices is None:
+            items = [(i, key) for i, (key, personal) in self.fuzzy.items() if personal or not personal_only]
+            choices = self._choices[personal_only] = ([i for i, _ in items], [key for _, key in items])
+        return choices
+
+    def fuzzy_search(self, query: str, personal_only: bool = False,
+                     score_cutoff: float = FUZZY_SCORE_CUTOFF) -> Tuple[Optional[int], float]:
+        """
+        Cea mai apropiată amintire după `fuzz.partial_ratio` pe textele
+        normalizate: (id, scor) sau (None, 0). Doar scorurile >= `score_cutoff`
+        sunt luate în calcul; la egalitate câștigă id-ul mai mic.
+        """
+        from rapidfuzz import fuzz, process
+
+        with self._lock:
+            ids, keys = self._fuzzy_choices(personal_only)
+            if not keys:
+                return None, 0
+            query = fuzzy_key(query)
+            if HAS_NUMPY and FUZZY_WORKERS != 1 and len(keys) >= FUZZY_PARALLEL_MIN:
+                import numpy as np
+
+                scores = process.cdist([query], keys, scorer=fuzz.partial_ratio,
+                                       score_cutoff=score_cutoff, workers=FUZZY_WORKERS)[0]
+                pos = int(np.argmax(scores))
+                best = float(scores[pos])
+                return (ids[pos], best) if best >= score_cutoff else (None, 0)
+            found = process.extractOne(query, keys, scorer=fuzz.partial_ratio,
+                                       processor=None, score_cutoff=score_cutoff)
+            return (ids[found[2]], found[1]) if found else (None, 0)
+
+
+class MemoryIndexCache:
+    """
+    LRU de indexuri per utilizator: doar utilizatorii activi recent își
+    țin amintirile în RAM; ceilalți sunt reîncărcați din SQLite la nevoie.
+    """
+
+    def __init__(self, max_users: int = 100) -> None:
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._indexes: "OrderedDict[str, MemoryIndex]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+    def get(self, user_id: str, loader: Callable[[], Iterable[Tuple[int, str]]]) -> MemoryIndex:
+        """Indexul utilizatorului, încărcat cu `loader()` la prima utilizare."""
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                index = self._indexes[user_id] = MemoryIndex()
+                while len(self._indexes) > self.max_users:
+                    self._indexes.popitem(last=False)
+            else:
+                self._indexes.move_to_end(user_id)
+        return index.ensure_loaded(loader)
+
+    def peek(self, user_id: str) -> Optional[MemoryIndex]:
+        """Indexul utilizatorului dacă este deja în RAM (fără încărcare)."""
+        return self._indexes.get(user_id)
+
+    def discard(self, user_id: str) -> None:
+        """Aruncă indexul unui utilizator (după modificări în bloc); reîncărcat la nevoie."""
+        with self._lock:
+            self._indexes.pop(user_id, None)
+
+    def reset(self) -> None:
+        """Aruncă toate indexurile; vor fi reîncărcate la următoarea utilizare."""
+        with self._lock:
+            self._indexes.clear()
@@ -0,0 +1,164 @@
+"""
+Instrumentare ușoară, expusă în formatul text Prometheus (`/metrics`).
+
+Fără dependențe externe: contoare, histograme și gauge-uri calculate la
+citire, fiecare cu un lock propriu. Costul unei observații este un
+`bisect` și două incrementări.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+REGISTRY: List["_Metric"] = []
+
+
+def _labels_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_labels_text(self.labelnames, labels)} {_fmt(v)}" for labels, v in items
+        ]
+
+
+class Gauge(_Metric):
+    """Gauge calculat la citire printr-o funcție (de ex. mărimea unui cache)."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Callable[[], float]) -> None:
+        super().__init__(name, help)
+        self._fn = fn
+
+    def render(self) -> List[str]:
+        try:
+            value = self._fn()
+        except Exception:
+            return []
+        return self._header() + [f"{self.name} {_fmt(value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [contoare per bucket (+Inf la final), sumă]
+        self._data: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._data.get(labels)
+            if data is None:
+                data = self._data[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            data[0][idx] += 1
+            data[1] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        """Cronometrează blocul `with` și înregistrează durata (secunde)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def count(self, *labels: str) -> int:
+        data = self._data.get(labels)
+        return sum(data[0]) if data else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, (list(d[0]), d[1])) for labels, d in self._data.items())
+        lines = self._header()
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = 'le="' + _fmt(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels_text(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels_text(self.labelnames, labels)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{_labels_text(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    """Toate metricile înregistrate, în formatul text Prometheus 0.0.4."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# -------------------- METRICI BODAI --------------------
+
+CHAT_STAGE_SECONDS = Histogram(
+    "bodai_chat_stage_seconds", "Durata fiecărei etape din pipeline-ul /chat.", ["stage"]
+)
+CHAT_ANSWERS = Counter(
+    "bodai_chat_answers_total", "Numărul de răspunsuri, după etapa care a răspuns.", ["stage"]
+)
+DB_CALL_SECONDS = Histogram(
+    "bodai_db_call_seconds", "Durata apelurilor din app/db.py (număr de apeluri în _count).", ["op"]
+)
+DB_ERRORS = Counter(
+    "bodai_db_errors_total", "Apeluri din app/db.py terminate cu excepție.", ["op"]
+)
@@ -1,29 +1,21 @@
-import re
 import math
+import heapq
 from collections import Counter
 from typing import List, Dict, Tuple
 
+from app import normalize
+
 
 # -------------------- UTILITARE TEXT --------------------
 
 def remove_diacritics(text: str) -> str:
-    """Elimină diacriticele românești dintr-un text."""
-    replacements = {
-        "ă": "a", "â": "a", "î": "i",
-        "ș": "s", "ş": "s", "ț": "t", "ţ": "t",
-        "Ă": "A", "Â": "A", "Î": "I",
-        "Ș": "S", "Ş": "S", "Ț": "T", "Ţ": "T"
-    }
-    for k, v in replacements.items():
-        text = text.replace(k, v)
-    return text
+    """Elimină diacriticele românești dintr-un text (vezi `app.normalize`)."""
+    return normalize.strip_diacritics(text)
 
 
 def tokenize(text: str) -> List[str]:
     """Transformă textul în listă de cuvinte simple, fără semne de punctuație."""
-    text = text.lower()
-    text = re.sub(r"[^a-z0-9ăâîșşțţ]", " ", text)
-    return [t for t in text.split() if t]
+    return normalize.tokenize(text)
 
 
 # -------------------- TF-IDF --------------------
@@ -71,3 +63,106 @@ def cosine_sim(vecA: Dict[str, float], vecB: Dict[str, float]) -> float:
     if denA == 0 or denB == 0:
         return 0.0
     return num / (denA * denB)
+
+
+# -------------------- INDEX INVERSAT --------------------
+
+class InvertedIndex:
+    """
+    Index inversat TF-IDF: termen -> {doc_id: tf}.
+
+    `search` punctează doar documentele care au cel puțin un termen comun
+    cu interogarea, deci costul depinde de lungimea listelor de postări ale
+    termenilor din interogare, nu de mărimea corpusului. Scorurile sunt
+    aceleași ca `tfidf_vector` + `cosine_sim` pe tot corpusul.
+    """
+
+    def __init__(self) -> None:
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_tfs: Dict[int, Dict[str, int]] = {}
+        # normele depind de N și DF; sunt valide doar pentru generația curentă
+        self._gen: int = 0
+        self._norms: Dict[int, Tuple[int, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.doc_tfs)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self.doc_tfs
+
+    def df(self, term: str) -> int:
+        return len(self.postings.get(term, ()))
+
+    def add(self, doc_id: int, tokens: List[str]) -> None:
+        """Adaugă (sau înlocuiește) un document deja tokenizat."""
+        self.remove(doc_id)
+        tf = dict(Counter(tokens))
+        self.doc_tfs[doc_id] = tf
+        for term, count in tf.items():
+            self.postings.setdefault(term, {})[doc_id] = count
+        self._gen += 1
+
+    def remove(self, doc_id: int) -> bool:
+        """Scoate un document din index. Returnează False dacă nu exista."""
+        tf = self.doc_tfs.pop(doc_id, None)
+        if tf is None:
+            return False
+        for term in tf:
+            plist = self.postings[term]
+            del plist[doc_id]
+            if not plist:
+                del self.postings[term]
+        self._norms.pop(doc_id, None)
+        self._gen += 1
+        return True
+
+    def clear(self) -> None:
+        self.postings.clear()
+        self.doc_tfs.clear()
+        self._norms.clear()
+        self._gen += 1
+
+    def idf(self, term: str) -> float:
+        N = len(self.doc_tfs)
+        return math.log((N + 1) / (self.df(term) + 1)) + 1
+
+    def norm(self, doc_id: int) -> float:
+        """Norma L2 a vectorului TF-IDF al documentului (cache per generație)."""
+        cached = self._norms.get(doc_id)
+        if cached is not None and cached[0] == self._gen:
+            return cached[1]
+        value = math.sqrt(sum((c * self.idf(t)) ** 2 for t, c in self.doc_tfs[doc_id].items()))
+        self._norms[doc_id] = (self._gen, value)
+        return value
+
+    def scores(self, query_tokens: List[str]) -> Dict[int, float]:
+        """Returnează {doc_id: scor cosinus} pentru documentele candidate."""
+        qtf = Counter(t for t in query_tokens if t in self.postings)
+        if not qtf:
+            return {}
+        idf = {t: self.idf(t) for t in qtf}
+        qvec = {t: c * idf[t] for t, c in qtf.items()}
+        qnorm = math.sqrt(sum(v * v for v in qvec.values()))
+        if qnorm == 0:
+            return {}
+
+        acc: Dict[int, float] = {}
+        for term, weight in qvec.items():
+            w = weight * idf[term]
+            for doc_id, count in self.postings[term].items():
+                acc[doc_id] = acc.get(doc_id, 0.0) + w * count
+
+        result: Dict[int, float] = {}
+        for doc_id, num in acc.items():
+            dnorm = self.norm(doc_id)
+            if num > 0 and dnorm > 0:
+                result[doc_id] = num / (qnorm * dnorm)
+        return result
+
+    def search(self, query_tokens: List[str], k: int = 1) -> List[Tuple[int, float]]:
+        """
+        Returnează top-k documente (doc_id, scor), descrescător după scor.
+        La egalitate câștigă id-ul mai mic, ca în bucla din `main.chat`.
+        """
+        scored = self.scores(query_tokens)
+        return heapq.nsmallest(k, scored.items(), key=lambda r: (-r[1], r[0]))
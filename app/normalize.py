@@ -0,0 +1,81 @@
+"""
+Normalizarea textului: diacritice, litere mici și tokenizare.
+
+Tabela de diacritice e calculată o singură dată (`str.maketrans`), regexul
+de tokenizare e precompilat, iar tokenii textelor scurte (mesaje, întrebări
+repetate) sunt ținuți într-un cache LRU mărginit. `normalize()` produce
+într-un singur pas toate formele de care are nevoie pipeline-ul /chat.
+"""
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple
+
+_DIACRITICS = str.maketrans({
+    "ă": "a", "â": "a", "î": "i",
+    "ș": "s", "ş": "s", "ț": "t", "ţ": "t",
+    "Ă": "A", "Â": "A", "Î": "I",
+    "Ș": "S", "Ş": "S", "Ț": "T", "Ţ": "T",
+})
+_NON_WORD = re.compile(r"[^a-z0-9ăâîșşțţ]")
+
+# câte texte distincte își păstrează tokenii în cache
+TOKEN_CACHE_SIZE = 8192
+# textele mai lungi nu intră în cache (ar evacua mesajele scurte, repetate des)
+MAX_CACHED_LENGTH = 256
+
+
+class NormalizedText(NamedTuple):
+    """Formele unui mesaj, calculate o singură dată per mesaj."""
+    text: str                 # textul original
+    lower: str                # litere mici
+    folded: str               # litere mici, fără diacritice
+    tokens: Tuple[str, ...]   # ca `tokenize(text)`
+
+
+def strip_diacritics(text: str) -> str:
+    """Elimină diacriticele românești (inclusiv variantele cu sedilă)."""
+    return text.translate(_DIACRITICS)
+
+
+def _split(lower: str) -> Tuple[str, ...]:
+    return tuple(_NON_WORD.sub(" ", lower).split())
+
+
+def _tokens(text: str) -> Tuple[str, ...]:
+    return _split(text.lower())
+
+
+_cached_tokens = lru_cache(maxsize=TOKEN_CACHE_SIZE)(_tokens)
+
+
+def set_cache_size(maxsize: int) -> None:
+    """Recreează cache-ul de tokeni cu altă capacitate (0 = dezactivat)."""
+    global _cached_tokens, TOKEN_CACHE_SIZE
+    TOKEN_CACHE_SIZE = maxsize
+    _cached_tokens = lru_cache(maxsize=maxsize)(_tokens)
+
+
+def cache_info():
+    return _cached_tokens.cache_info()
+
+
+def tokens(text: str, cached: bool = True) -> Tuple[str, ...]:
+    """Tokenii textului, ca tuplu imuabil (din cache pentru textele scurte)."""
+    if cached and len(text) <= MAX_CACHED_LENGTH:
+        return _cached_tokens(text)
+    return _tokens(text)
+
+
+def tokenize(text: str, cached: bool = True) -> List[str]:
+    """Transformă textul în listă de cuvinte simple, fără semne de punctuație."""
+    return list(tokens(text, cached))
+
+
+def normalize(text: str) -> NormalizedText:
+    """Toate formele unui mesaj (litere mici, fără diacritice, tokeni) dintr-o trecere."""
+    lower = text.lower()
+    if len(text) <= MAX_CACHED_LENGTH:
+        toks = _cached_tokens(text)
+    else:
+        toks = _split(lower)
+    return NormalizedText(text, lower, lower.translate(_DIACRITICS), toks)
@@ -1,9 +1,15 @@
 import re, random
 
+# (cuvinte cheie, răspunsuri posibile); ordinea listei dă precedența
+PATTERN_KEYWORDS = [
+    (["salut", "buna", "hello", "hi"], ["Salut!", "Bună, eu sunt BODAI."]),
+    (["multumesc", "merci", "thank", "thanks"], ["Cu plăcere!", "Oricând."]),
+    (["cine esti", "what are you"], ["Sunt BODAI, asistentul tău personal."])
+]
+
 patterns = [
-    (re.compile(r"\b(salut|buna|hello|hi)\b"), ["Salut!", "Bună, eu sunt BODAI."]),
-    (re.compile(r"\b(multumesc|merci|thanks?)\b"), ["Cu plăcere!", "Oricând."]),
-    (re.compile(r"\b(cine esti|what are you)\b"), ["Sunt BODAI, asistentul tău personal."])
+    (re.compile(r"\b(" + "|".join(map(re.escape, keywords)) + r")\b"), responses)
+    for keywords, responses in PATTERN_KEYWORDS
 ]
 
 def match_pattern(text: str):
@@ -11,3 +17,7 @@ def match_pattern(text: str):
         if regex.search(text):
             return random.choice(responses)
     return None
+
+def pattern_response(responses):
+    """Alege un răspuns pentru un pattern găsit de router."""
+    return random.choice(responses)
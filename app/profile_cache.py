@@ -0,0 +1,88 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# categoriile folosite de învățarea automată din /chat
+CATEGORIES = ("hobby", "preferinta", "loc", "profesie", "identitate")
+LIKE_CATEGORIES = ("hobby", "preferinta")
+
+
+class Profile:
+    """
+    Profilul unui utilizator, pre-grupat pe categorii.
+    `rows` păstrează ordinea din `db.get_profile` (cele mai noi întâi).
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, str]]) -> None:
+        self.rows: List[Tuple[str, str]] = []
+        self.by_category: Dict[str, List[str]] = {cat: [] for cat in CATEGORIES}
+        self.likes: List[str] = []
+        for category, info in rows:
+            self._append(category, info)
+
+    def _append(self, category: str, info: str) -> None:
+        self.rows.append((category, info))
+        self.by_category.setdefault(category, []).append(info)
+        if category in LIKE_CATEGORIES:
+            self.likes.append(info)
+
+    def prepend(self, category: str, info: str) -> None:
+        """Adaugă o intrare nouă (devine cea mai recentă)."""
+        self.rows.insert(0, (category, info))
+        self.by_category.setdefault(category, []).insert(0, info)
+        if category in LIKE_CATEGORIES:
+            self.likes.insert(0, info)
+
+    def first(self, category: str) -> Optional[str]:
+        """Cea mai recentă informație din categorie."""
+        values = self.by_category.get(category)
+        return values[0] if values else None
+
+
+class ProfileCache:
+    """
+    Cache in-process de profiluri (LRU per utilizator), cu write-through
+    pentru adăugări și invalidare pentru modificări/ștergeri.
+    """
+
+    def __init__(self, max_users: int = 100) -> None:
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._profiles: "OrderedDict[str, Profile]" = OrderedDict()
+        # numărul de scrieri per utilizator; o încărcare concurentă cu o scriere nu e păstrată
+        self._writes: Dict[str, int] = {}
+
+    def get(self, user_id: str, loader: Callable[[], Iterable[Tuple[str, str]]]) -> Profile:
+        """Profilul utilizatorului; la ratare este încărcat cu `loader()`."""
+        with self._lock:
+            profile = self._profiles.get(user_id)
+            if profile is not None:
+                self._profiles.move_to_end(user_id)
+                return profile
+            seen = self._writes.get(user_id, 0)
+        profile = Profile(loader())
+        with self._lock:
+            if self._writes.get(user_id, 0) == seen:
+                self._profiles[user_id] = profile
+                while len(self._profiles) > self.max_users:
+                    self._profiles.popitem(last=False)
+        return profile
+
+    def add(self, user_id: str, category: str, info: str) -> None:
+        """Write-through pentru o intrare nouă (doar dacă profilul e în cache)."""
+        with self._lock:
+            self._writes[user_id] = self._writes.get(user_id, 0) + 1
+            profile = self._profiles.get(user_id)
+            if profile is not None:
+                profile.prepend(category, info)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._writes[user_id] = self._writes.get(user_id, 0) + 1
+            self._profiles.pop(user_id, None)
+
+    def reset(self) -> None:
+        with self._lock:
+            for user_id in self._profiles:
+                self._writes[user_id] = self._writes.get(user_id, 0) + 1
+            self._profiles.clear()
@@ -0,0 +1,70 @@
+"""
+Cache de răspunsuri pentru /chat (LRU + TTL).
+
+Cheia conține utilizatorul, textul normalizat al mesajului, versiunile
+datelor utilizatorului (`db.data_version`: amintiri, profil) și versiunea
+KB. Versiunile cresc la fiecare scriere, deci după o modificare intrările
+vechi nu mai sunt găsite și ies din LRU. TTL-ul mărginește doar ce nu este
+versionat (statisticile globale BM25/IDF ale retriever-ului `fts`).
+
+Sunt păstrate numai răspunsurile etapelor deterministe și fără efecte
+secundare; ce etape sunt excluse decide apelantul (vezi main.UNCACHED_STAGES).
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+from app import metrics
+
+# intrări păstrate (0 = cache dezactivat) și durata lor de viață (secunde)
+MAX_ENTRIES: int = 10000
+TTL: float = 300.0
+
+REQUESTS = metrics.Counter("bodai_reply_cache_requests_total", "Căutări în cache-ul de răspunsuri.", ["result"])
+
+
+class ReplyCache:
+    """LRU cu expirare: cheie -> răspuns."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl: float = TTL) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, str]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[str]:
+        if not self.max_entries:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    REQUESTS.inc("hit")
+                    return entry[1]
+                del self._entries[key]
+        REQUESTS.inc("miss")
+        return None
+
+    def put(self, key: Hashable, reply: str) -> None:
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, reply)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def hit_ratio() -> float:
+    """Fracțiunea căutărilor găsite în cache, de la pornire (0 dacă nu a fost nicio căutare)."""
+    hits, misses = REQUESTS.value("hit"), REQUESTS.value("miss")
+    return hits / (hits + misses) if hits + misses else 0.0
@@ -0,0 +1,231 @@
+"""
+Retenția amintirilor: arhivare după vârstă și mărime, deduplicare și
+întreținerea periodică a bazei de date (ANALYZE / VACUUM).
+
+Amintirile scoase din setul activ sunt mutate în tabela `memory_archive`
+(cu același id, momentul și motivul arhivării), pe care retrieval-ul din
+/chat nu o citește. Astfel setul activ, și odată cu el costul per mesaj,
+rămâne mărginit în timp.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app import db, metrics, normalize
+
+log = logging.getLogger("bodai.retention")
+
+# amintirile mai vechi de atâtea zile sunt arhivate (0 = niciodată)
+MAX_AGE_DAYS: float = 0
+# câte amintiri active păstrează fiecare utilizator; cele mai vechi sunt arhivate (0 = nelimitat)
+MAX_MEMORIES_PER_USER: int = 0
+# scorul `fuzz.ratio` (pe textul normalizat) de la care două amintiri sunt duplicate (0 = dezactivat)
+DEDUP_THRESHOLD: float = 0
+# la câte ore rulează retenția în fundal (0 = doar manual)
+INTERVAL_HOURS: float = 0
+# VACUUM după o rulare care a arhivat ceva (eliberează spațiul pe disc, dar rescrie
+# toată baza și blochează scrierile cât durează; opțional, vezi și `--vacuum` din CLI)
+VACUUM: bool = False
+
+# câte id-uri sunt mutate per executemany
+CHUNK_SIZE = 1000
+# în câte blocuri intră o amintire la deduplicare (cei mai lungi tokeni ai ei)
+BLOCK_TOKENS = 3
+
+ARCHIVED = metrics.Counter("bodai_memories_archived_total", "Amintiri mutate în arhivă, după motiv.", ["reason"])
+
+
+def configure(cfg: dict) -> None:
+    """Aplică secțiunea `retention` din configs/app.yaml."""
+    global MAX_AGE_DAYS, MAX_MEMORIES_PER_USER, DEDUP_THRESHOLD, INTERVAL_HOURS, VACUUM
+    MAX_AGE_DAYS = cfg.get("max_age_days", MAX_AGE_DAYS)
+    MAX_MEMORIES_PER_USER = cfg.get("max_memories_per_user", MAX_MEMORIES_PER_USER)
+    DEDUP_THRESHOLD = cfg.get("dedup_threshold", DEDUP_THRESHOLD)
+    INTERVAL_HOURS = cfg.get("interval_hours", INTERVAL_HOURS)
+    VACUUM = cfg.get("vacuum", VACUUM)
+    # indexul din RAM nu încarcă mai mult decât setul activ permis
+    db.MAX_INDEXED_MEMORIES = MAX_MEMORIES_PER_USER or None
+
+# -------------------- ARHIVARE --------------------
+
+def archive(rows: Iterable[Tuple[int, str]], reason: str, now: Optional[int] = None) -> int:
+    """
+    Mută amintirile (id, user_id) în `memory_archive`, într-o singură
+    tranzacție, și le scoate din indexurile din RAM. Returnează numărul lor.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    now = int(time.time()) if now is None else now
+    with db.transaction() as conn:
+        for start in range(0, len(rows), CHUNK_SIZE):
+            chunk = rows[start:start + CHUNK_SIZE]
+            conn.executemany(
+                "INSERT OR REPLACE INTO memory_archive (id, text, timestamp, user_id, archived_at, reason) "
+                "SELECT id, text, timestamp, user_id, ?, ? FROM memory WHERE id=?",
+                ((now, reason, mem_id) for mem_id, _ in chunk),
+            )
+            conn.executemany("DELETE FROM memory WHERE id=?", ((mem_id,) for mem_id, _ in chunk))
+        db.record_changes(conn, "memory_reset", ((user_id, None) for user_id in {u for _, u in rows}))
+
+    by_user: Dict[str, List[int]] = {}
+    for mem_id, user_id in rows:
+        by_user.setdefault(user_id, []).append(mem_id)
+    for user_id, ids in by_user.items():
+        index = db.memory_indexes.peek(user_id)
+        if index is not None:
+            index.remove_many(ids)
+        db.bump_version("memory", user_id)
+    ARCHIVED.inc(reason, amount=len(rows))
+    return len(rows)
+
+
+def archive_older_than(max_age_days: float, now: Optional[int] = None) -> int:
+    """Arhivează amintirile mai vechi de `max_age_days` zile."""
+    now = int(time.time()) if now is None else now
+    cutoff = now - int(max_age_days * 86400)
+    rows = db.connection().execute(
+        "SELECT id, user_id FROM memory WHERE timestamp < ?", (cutoff,)
+    ).fetchall()
+    return archive(rows, "age", now)
+
+
+def enforce_size(max_per_user: int, now: Optional[int] = None) -> int:
+    """Păstrează cel mult `max_per_user` amintiri active per utilizator (cele mai noi)."""
+    conn = db.connection()
+    over = conn.execute(
+        "SELECT user_id, COUNT(*) FROM memory GROUP BY user_id HAVING COUNT(*) > ?", (max_per_user,)
+    ).fetchall()
+    rows: List[Tuple[int, str]] = []
+    for user_id, count in over:
+        rows.extend(conn.execute(
+            "SELECT id, user_id FROM memory WHERE user_id=? ORDER BY id LIMIT ?", (user_id, count - max_per_user)
+        ).fetchall())
+    return archive(rows, "size", now)
+
+
+def _dedup_key(text: str) -> str:
+    # textul fără diacritice, majuscule și punctuație
+    return " ".join(normalize.tokens(normalize.strip_diacritics(text), cached=False))
+
+
+def _block_keys(key: str) -> List[str]:
+    # cei mai lungi BLOCK_TOKENS tokeni distincți: o greșeală într-unul nu scoate textul din celelalte blocuri
+    return sorted(set(key.split()), key=lambda t: (-len(t), t))[:BLOCK_TOKENS]
+
+
+def find_duplicates(rows: Iterable[Tuple[int, str]], threshold: float) -> List[int]:
+    """
+    Id-urile amintirilor aproape identice cu una mai nouă (se păstrează cea
+    mai recentă). Comparația `fuzz.ratio` se face doar cu amintirile care au
+    în comun unul dintre cei mai lungi BLOCK_TOKENS tokeni, deci costul
+    rămâne aproape liniar, iar o greșeală de tastare în cel mai lung cuvânt
+    nu ascunde duplicatul.
+    """
+    from rapidfuzz import fuzz, process
+
+    blocks: Dict[str, List[str]] = {}
+    duplicates: List[int] = []
+    for mem_id, text in sorted(rows, key=lambda r: r[0], reverse=True):
+        key = _dedup_key(text)
+        if not key:
+            continue
+        keys = _block_keys(key)
+        candidates = list(dict.fromkeys(k for block in keys for k in blocks.get(block, ())))
+        if key in candidates or (threshold < 100 and candidates and process.extractOne(
+                key, candidates, scorer=fuzz.ratio, processor=None, score_cutoff=threshold)):
+            duplicates.append(mem_id)
+        else:
+            for block in keys:
+                blocks.setdefault(block, []).append(key)
+    return duplicates
+
+
+def dedupe(threshold: float, now: Optional[int] = None) -> int:
+    """Arhivează duplicatele aproape identice, per utilizator."""
+    conn = db.connection()
+    users = [r[0] for r in conn.execute("SELECT DISTINCT user_id FROM memory")]
+    rows: List[Tuple[int, str]] = []
+    for user_id in users:
+        dup_ids = find_duplicates(
+            conn.execute("SELECT id, text FROM memory WHERE user_id=?", (user_id,)).fetchall(), threshold
+        )
+        rows.extend((mem_id, user_id) for mem_id in dup_ids)
+    return archive(rows, "duplicate", now)
+
+# -------------------- ÎNTREȚINERE --------------------
+
+def optimize(vacuum: bool = False) -> None:
+    """ANALYZE pentru planificator și, opțional, VACUUM + checkpoint WAL."""
+    conn = db.connection()
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA optimize")
+    if vacuum:
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def run(now: Optional[int] = None) -> Dict[str, int]:
+    """Aplică toate politicile configurate; returnează câte amintiri a arhivat fiecare."""
+    started = time.perf_counter()
+    stats = {"age": 0, "size": 0, "duplicate": 0}
+    if DEDUP_THRESHOLD:
+        stats["duplicate"] = dedupe(DEDUP_THRESHOLD, now)
+    if MAX_AGE_DAYS:
+        stats["age"] = archive_older_than(MAX_AGE_DAYS, now)
+    if MAX_MEMORIES_PER_USER:
+        stats["size"] = enforce_size(MAX_MEMORIES_PER_USER, now)
+    archived = sum(stats.values())
+    optimize(vacuum=VACUUM and archived > 0)
+    log.info("Retenție: %d amintiri arhivate %s (%.3fs).", archived, stats, time.perf_counter() - started)
+    return stats
+
+# -------------------- PROGRAMARE --------------------
+
+_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def _loop(interval: float) -> None:
+    while not _stop.wait(interval):
+        try:
+            run()
+        except Exception as e:  # un eșec nu oprește rulările următoare
+            log.warning("Retenția a eșuat: %s", e)
+
+
+def start(interval_hours: Optional[float] = None) -> None:
+    """Rulează retenția periodic, pe un fir de fundal."""
+    global _thread
+    interval_hours = INTERVAL_HOURS if interval_hours is None else interval_hours
+    if interval_hours <= 0 or (_thread is not None and _thread.is_alive()):
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, args=(interval_hours * 3600,), name="retention", daemon=True)
+    _thread.start()
+
+
+def stop() -> None:
+    """Oprește firul retenției și așteaptă terminarea lui (un start() ulterior pornește unul nou)."""
+    global _thread
+    _stop.set()
+    if _thread is not None and _thread is not threading.current_thread():
+        _thread.join()
+    _thread = None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import yaml
+
+    parser = argparse.ArgumentParser(description="Rulează o dată politicile de retenție.")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM la final (blochează scrierile cât durează)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    with open("configs/app.yaml", encoding="utf-8") as f:
+        configure(yaml.safe_load(f).get("retention", {}))
+    print(run())
+    if args.vacuum:
+        optimize(vacuum=True)
@@ -0,0 +1,125 @@
+"""
+Router de intenții compilat într-un automat Aho-Corasick.
+
+Toate declanșatoarele (subșiruri, prefixe, cuvinte întregi) sunt parcurse
+într-o singură trecere liniară peste text, indiferent de numărul lor.
+Fiecare regulă are o prioritate (ordinea în care a fost adăugată), iar
+`scan` întoarce regulile declanșate în ordinea priorităților, deci
+precedența verificărilor secvențiale de dinainte se păstrează.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional
+
+
+class Rule(NamedTuple):
+    name: str
+    pattern: str
+    kind: str  # "contains" | "prefix" | "word"
+    priority: int
+    payload: Any
+
+
+class Hit(NamedTuple):
+    rule: Rule
+    start: int
+    end: int
+
+
+KINDS = ("contains", "prefix", "word")
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class IntentRouter:
+    def __init__(self) -> None:
+        self.rules: List[Rule] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        self._compiled = False
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def add(self, name: str, pattern: str, kind: str = "contains", payload: Any = None) -> Rule:
+        """Adaugă o regulă; prioritatea este ordinea adăugării (0 = cea mai mare)."""
+        if kind not in KINDS:
+            raise ValueError(f"Tip de regulă necunoscut: {kind}")
+        if not pattern:
+            raise ValueError("Șablonul regulii nu poate fi gol.")
+        rule = Rule(name, pattern, kind, len(self.rules), payload)
+        self.rules.append(rule)
+        self._compiled = False
+        return rule
+
+    def compile(self) -> "IntentRouter":
+        """Construiește automatul (trie + legături de eșec)."""
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+        for idx, rule in enumerate(self.rules):
+            state = 0
+            for ch in rule.pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(idx)
+
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0) if goto[f].get(ch, 0) != nxt else 0
+                out[nxt] = out[nxt] + out[fail[nxt]]
+
+        self._goto, self._fail, self._out = goto, fail, out
+        self._compiled = True
+        return self
+
+    def scan(self, text: str) -> List[Hit]:
+        """
+        Toate regulile declanșate de text (prima apariție a fiecăreia),
+        sortate după prioritate. O singură trecere peste text.
+        """
+        if not self._compiled:
+            self.compile()
+        goto, fail, out, rules = self._goto, self._fail, self._out, self.rules
+        found: Dict[int, Hit] = {}
+        state = 0
+        n = len(text)
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+            for idx in out[state]:
+                if idx in found:
+                    continue
+                rule = rules[idx]
+                start = i - len(rule.pattern) + 1
+                if rule.kind == "prefix" and start != 0:
+                    continue
+                if rule.kind == "word" and (
+                    (start > 0 and _is_word_char(text[start - 1]))
+                    or (i + 1 < n and _is_word_char(text[i + 1]))
+                ):
+                    continue
+                found[idx] = Hit(rule, start, i + 1)
+        return [found[idx] for idx in sorted(found)]
+
+    def match(self, text: str) -> Optional[Hit]:
+        """Regula cu prioritatea cea mai mare declanșată de text (sau None)."""
+        hits = self.scan(text)
+        return hits[0] if hits else None
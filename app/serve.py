@@ -0,0 +1,90 @@
+"""
+Launcher-ul serverului, condus de blocul `server` din configs/app.yaml:
+
+    python -m app.serve [--workers N] [--host H] [--port P]
+
+Cu `workers` > 1 (procese uvicorn separate):
+- indexul KB e construit o singură dată, aici, în `data/kb.cache`, cu
+  backend-ul sparse (impus; fără numpy/scipy launcher-ul refuză să pornească);
+  fiecare worker îl mapează (mmap) din același fișier, deci paginile lui sunt
+  partajate prin page cache-ul sistemului;
+- contextul conversațiilor stă în SQLite (`context_log`), iar modificările
+  amintirilor, profilurilor și KB sunt anunțate celorlalți workeri prin
+  `change_log` (vezi app/changes.py);
+- retenția și backup-ul rulează o singură dată, în procesul acesta.
+
+`reload` e ignorat cu mai mulți workeri (uvicorn nu le suportă împreună).
+"""
+import argparse
+import json
+import logging
+import os
+from typing import List, Optional
+
+import uvicorn
+import yaml
+
+from app import backup, changes, db, kb, retention
+
+log = logging.getLogger("bodai.serve")
+
+CONFIG_FILE = "configs/app.yaml"
+
+
+def prepare(config: dict, workers: int) -> None:
+    """Pregătește starea comună (schema, cache-ul KB, joburile de fundal) înainte de workeri."""
+    nlp_cfg = config.get("nlp", {})
+    retriever = nlp_cfg.get("memory_retriever", "index")
+    db.FTS_ENABLED = retriever == "fts"
+    retention.configure(config.get("retention", {}))
+    backup.configure(config.get("database", {}))
+    changes.ENABLED = workers > 1
+    # o singură dată, înainte ca workerii să pornească în paralel
+    db.init_db()
+
+    kb.configure(config.get("kb", {}), nlp_cfg.get("backend"), workers)
+    info = kb.load().info()  # rescrie data/kb.cache dacă lipsește sau e vechi
+    log.info("KB %s pregătit (%d intrări, backend %s, din cache: %s).",
+             info["version"], info["entries"], info["backend"], info["from_cache"])
+    if workers == 1:
+        return
+
+    retention.start()
+    backup.start()
+    if retriever == "index":
+        log.warning("memory_retriever: index ține amintirile în RAM în fiecare worker; "
+                    "cu memory_retriever: fts ele rămân doar în SQLite.")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Pornește serverul BODAI.")
+    parser.add_argument("--workers", type=int, help="procese worker (implicit server.workers)")
+    parser.add_argument("--host", help="implicit server.host")
+    parser.add_argument("--port", type=int, help="implicit server.port")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    with open(CONFIG_FILE, encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    server = config.get("server", {})
+    workers = max(1, args.workers or int(server.get("workers", 1)))
+    reload = bool(server.get("reload", False))
+    if reload and workers > 1:
+        log.warning("server.reload e ignorat cu %d workeri.", workers)
+        reload = False
+
+    prepare(config, workers)
+    # workerii (app/main.py) citesc numărul efectiv de procese și configurația deja parsată de aici
+    os.environ["BODAI_WORKERS"] = str(workers)
+    os.environ["BODAI_CONFIG"] = json.dumps(config)
+    uvicorn.run(
+        "app.main:app",
+        host=args.host or server.get("host", "127.0.0.1"),
+        port=args.port or int(server.get("port", 8000)),
+        workers=workers,
+        reload=reload,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Backend vectorizat (NumPy/SciPy) pentru scorarea TF-IDF.
+
+Corpusul este ținut ca matrice CSR cu rânduri normalizate L2, iar o
+interogare (sau un lot de interogări) este punctată printr-un singur
+produs matrice-vector. Formula IDF este aceeași ca în `nlp_utils`
+(`log((N+1)/(df+1)) + 1`), deci scorurile respectă pragurile existente.
+Modulul e opțional: dacă numpy/scipy lipsesc, `AVAILABLE` este False.
+numpy/scipy sunt importate abia la construirea primului index (`load()`).
+"""
+import importlib.util
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app import nlp_utils
+
+np = None
+sparse = None
+
+AVAILABLE: bool = all(importlib.util.find_spec(name) is not None for name in ("numpy", "scipy"))
+
+
+def load() -> None:
+    """Importă numpy și scipy.sparse (o singură dată)."""
+    global np, sparse
+    if sparse is None:
+        import numpy
+        from scipy import sparse as scipy_sparse
+        np, sparse = numpy, scipy_sparse
+
+
+class SparseTfidfIndex:
+    """Index TF-IDF static, stocat ca matrice CSR (documente x termeni)."""
+
+    def __init__(self, docs: Sequence[List[str]], doc_ids: Optional[Sequence[int]] = None) -> None:
+        if not AVAILABLE:
+            raise RuntimeError("Backend-ul sparse necesită numpy și scipy.")
+        load()
+        self.doc_ids = np.asarray(doc_ids if doc_ids is not None else range(len(docs)), dtype=np.int64)
+        vocab, df, N = nlp_utils.build_tfidf(list(docs))
+        self.vocab: Dict[str, int] = vocab
+        self.N = N
+
+        df_arr = np.zeros(len(vocab), dtype=np.float64)
+        for term, col in vocab.items():
+            df_arr[col] = df[term]
+        self.idf = np.log((N + 1) / (df_arr + 1)) + 1
+
+        indptr = [0]
+        indices: List[int] = []
+        counts: List[int] = []
+        for doc in docs:
+            tf: Dict[int, int] = {}
+            for token in doc:
+                col = vocab[token]
+                tf[col] = tf.get(col, 0) + 1
+            indices.extend(tf.keys())
+            counts.extend(tf.values())
+            indptr.append(len(indices))
+
+        matrix = sparse.csr_matrix(
+            (np.asarray(counts, dtype=np.float64), np.asarray(indices, dtype=np.int64), np.asarray(indptr)),
+            shape=(len(docs), len(vocab)),
+        )
+        self.matrix = _normalize_rows(matrix.multiply(self.idf).tocsr())
+
+    @classmethod
+    def from_inverted(cls, index: "nlp_utils.InvertedIndex") -> "SparseTfidfIndex":
+        """Construiește backend-ul dintr-un `InvertedIndex` existent (reindexare în bloc)."""
+        doc_ids = sorted(index.doc_tfs)
+        docs = [[t for t, c in index.doc_tfs[d].items() for _ in range(c)] for d in doc_ids]
+        return cls(docs, doc_ids)
+
+    @classmethod
+    def from_arrays(cls, vocab: Dict[str, int], idf: "np.ndarray", data: "np.ndarray", indices: "np.ndarray",
+                    indptr: "np.ndarray", shape: Tuple[int, int], doc_ids: "np.ndarray") -> "SparseTfidfIndex":
+        """
+        Reface indexul din tablourile deja calculate (de ex. mapate din
+        cache-ul KB), fără copiere și fără renormalizare.
+        """
+        if not AVAILABLE:
+            raise RuntimeError("Backend-ul sparse necesită numpy și scipy.")
+        load()
+        self = cls.__new__(cls)
+        self.vocab = vocab
+        self.idf = idf
+        self.N = shape[0]
+        self.doc_ids = doc_ids
+        self.matrix = sparse.csr_matrix((data, indices, indptr), shape=shape, copy=False)
+        return self
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    # ------------------- INTEROGARE -------------------
+
+    def query_matrix(self, queries: Sequence[List[str]]) -> "sparse.csr_matrix":
+        """Transformă un lot de interogări tokenizate în matrice CSR normalizată."""
+        indptr = [0]
+        indices: List[int] = []
+        counts: List[int] = []
+        for tokens in queries:
+            tf: Dict[int, int] = {}
+            for token in tokens:
+                col = self.vocab.get(token)
+                if col is not None:
+                    tf[col] = tf.get(col, 0) + 1
+            indices.extend(tf.keys())
+            counts.extend(tf.values())
+            indptr.append(len(indices))
+        q = sparse.csr_matrix(
+            (np.asarray(counts, dtype=np.float64), np.asarray(indices, dtype=np.int64), np.asarray(indptr)),
+            shape=(len(queries), len(self.vocab)),
+        )
+        return _normalize_rows(q.multiply(self.idf).tocsr())
+
+    def score(self, query_tokens: List[str]) -> "np.ndarray":
+        """Scorurile cosinus ale unei interogări față de toate documentele."""
+        q = self.query_matrix([query_tokens])
+        return np.asarray((self.matrix @ q.T).todense()).ravel()
+
+    def score_batch(self, queries: Sequence[List[str]]) -> "sparse.csr_matrix":
+        """Scorurile unui lot de interogări (interogări x documente), ca matrice rară."""
+        return (self.query_matrix(queries) @ self.matrix.T).tocsr()
+
+    def search(self, query_tokens: List[str], k: int = 1) -> List[Tuple[int, float]]:
+        """Top-k documente (doc_id, scor); la egalitate câștigă id-ul mai mic."""
+        scores = self.score(query_tokens)
+        return _top_k(self.doc_ids, np.flatnonzero(scores > 0), scores, k)
+
+    def search_batch(self, queries: Sequence[List[str]], k: int = 1) -> List[List[Tuple[int, float]]]:
+        """Top-k pentru fiecare interogare dintr-un lot."""
+        result = self.score_batch(queries)
+        out: List[List[Tuple[int, float]]] = []
+        for row in range(result.shape[0]):
+            start, end = result.indptr[row], result.indptr[row + 1]
+            cols, vals = result.indices[start:end], result.data[start:end]
+            keep = vals > 0
+            out.append(_top_k(self.doc_ids[cols[keep]], None, vals[keep], k))
+        return out
+
+
+def _normalize_rows(matrix: "sparse.csr_matrix") -> "sparse.csr_matrix":
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return (sparse.diags(1.0 / norms) @ matrix).tocsr()
+
+
+def _top_k(ids: "np.ndarray", positions: Optional["np.ndarray"], scores: "np.ndarray", k: int) -> List[Tuple[int, float]]:
+    if positions is not None:
+        ids, scores = ids[positions], scores[positions]
+    if not len(ids):
+        return []
+    order = np.lexsort((ids, -scores))[:k]
+    return [(int(ids[i]), float(scores[i])) for i in order]
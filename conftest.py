@@ -0,0 +1,41 @@
+"""
+Configurația comună a testelor (pytest).
+
+Aplicația folosește căi relative (configs/app.yaml, data/, static/), deci
+testele rulează într-un director temporar cu o copie a configurației, a
+KB-ului și a frontend-ului: baza de date și jurnalele din repo nu sunt atinse.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+# client manual pentru un server pornit (necesită `requests`), nu un test
+collect_ignore = ["test_chat.py"]
+
+WORKDIR = tempfile.mkdtemp(prefix="bodai-tests-")
+shutil.copytree(os.path.join(ROOT, "configs"), os.path.join(WORKDIR, "configs"))
+shutil.copytree(os.path.join(ROOT, "static"), os.path.join(WORKDIR, "static"))
+os.makedirs(os.path.join(WORKDIR, "data"))
+shutil.copy(os.path.join(ROOT, "data", "knowledge.json"), os.path.join(WORKDIR, "data", "knowledge.json"))
+os.chdir(WORKDIR)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def context_files():
+    """
+    Jurnalele de context sunt scrise în fundal (și la atexit): căile relative
+    ar fi rezolvate în directorul curent de atunci, nu neapărat WORKDIR.
+    """
+    from app import context
+
+    context.CONTEXT_FILE = os.path.join(WORKDIR, "data", "context.jsonl")
+    context.CONTEXT_DIR = os.path.join(WORKDIR, "data", "context")
+    context.LEGACY_CONTEXT_FILE = os.path.join(WORKDIR, "data", "context.json")
+    yield
+    context.flush_context()
@@ -1,11 +1,5 @@
 #!/bin/bash
-DB_PATH="data/bodai.sqlite3"
-BACKUP_DIR="backups"
-
-mkdir -p "$BACKUP_DIR"
-TS=$(date +"%Y-%m-%d_%H%M%S")
-
-cp "$DB_PATH" "$BACKUP_DIR/bodai_$TS.sqlite3"
-
-# Șterge backup-urile mai vechi de 14 zile
-find "$BACKUP_DIR" -name "bodai_*.sqlite3" -type f -mtime +14 -delete
+# Backup online (API-ul de backup SQLite + integrity_check), sigur și cu aplicația pornită.
+# Directorul și retenția vin din configs/app.yaml (database.backup_dir, database.backup_retain_days).
+cd "$(dirname "$0")/.." || exit 1
+exec python -m app.backup
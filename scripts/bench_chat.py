@@ -0,0 +1,293 @@
+"""
+Benchmark reproductibil pentru pipeline-ul /chat și nlp_utils.
+
+Generează o memorie și o knowledge base sintetice (română/engleză) de
+mărime configurabilă, într-un director temporar, apoi măsoară latența
+(p50/p99) și throughput-ul fiecărei etape din chat() și al funcțiilor
+din nlp_utils, in-process, prin TestClient-ul FastAPI.
+
+Exemple:
+    python scripts/bench_chat.py --memories 10000 --kb 1000 --out bench.json
+    python scripts/bench_chat.py --memories 100000 --compare bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# utilizatorul amintirilor sintetice și al apelurilor /chat, /chat/batch
+BENCH_USER = "bench"
+
+# -------------------- DATE SINTETICE --------------------
+
+RO_SUBJECTS = ["cafeaua", "ceaiul", "muntele", "marea", "pizza", "fotbalul", "cartea", "filmul",
+               "bicicleta", "muzica", "pisica", "grădina", "orașul", "trenul", "concertul", "plimbarea"]
+RO_PLACES = ["Brașov", "Cluj", "Iași", "Sibiu", "Constanța", "Timișoara", "București", "Oradea"]
+RO_PEOPLE = ["Ion", "Maria", "Andrei", "Ioana", "Mihai", "Elena", "Radu", "Ana"]
+EN_SUBJECTS = ["coffee", "mountains", "the sea", "football", "books", "movies", "music", "cats"]
+
+MEMORY_TEMPLATES = [
+    "îmi place {s} dimineața",
+    "am fost la {p} cu {n}",
+    "am mâncat {s} ieri seară",
+    "{n} lucrează în {p}",
+    "prefer {s} în weekend",
+    "am ieșit cu {n} la {s}",
+    "i really like {e} on sundays",
+    "{n} told me about {e} in {p}",
+]
+KB_TEMPLATES = [
+    ("ce este {s} în {p}", "Despre {s} din {p} știu doar ce mi-ai spus."),
+    ("cum ajung la {p}", "Poți ajunge la {p} cu trenul sau cu mașina."),
+    ("what do you know about {e}", "I know a few things about {e}."),
+    ("cine este {n} din {p}", "{n} este o persoană din {p}."),
+]
+QUERY_TEMPLATES = [
+    "{s}", "{n} {p}", "ce mai face {n}", "îți amintești de {s}", "what about {e}",
+    "ce este {s} în {p}", "cum ajung la {p}", "sunt obosit azi", "salut", "ceva complet nou {s}",
+]
+
+
+def _fill(template: str, rng: random.Random) -> str:
+    return template.format(
+        s=rng.choice(RO_SUBJECTS), p=rng.choice(RO_PLACES),
+        n=rng.choice(RO_PEOPLE), e=rng.choice(EN_SUBJECTS),
+    )
+
+
+def generate_memories(n: int, rng: random.Random):
+    return [_fill(rng.choice(MEMORY_TEMPLATES), rng) + f" #{i}" for i in range(n)]
+
+
+def generate_kb(n: int, rng: random.Random):
+    kb = []
+    for i in range(n):
+        q, a = rng.choice(KB_TEMPLATES)
+        s, p, nn, e = rng.choice(RO_SUBJECTS), rng.choice(RO_PLACES), rng.choice(RO_PEOPLE), rng.choice(EN_SUBJECTS)
+        kb.append({"q": q.format(s=s, p=p, n=nn, e=e) + f" {i}", "a": a.format(s=s, p=p, n=nn, e=e)})
+    return kb
+
+
+def generate_queries(n: int, rng: random.Random):
+    return [_fill(rng.choice(QUERY_TEMPLATES), rng) for _ in range(n)]
+
+
+def prepare_workdir(workdir: str, kb) -> None:
+    """Creează în `workdir` structura de care are nevoie app.main (configs, static, data)."""
+    shutil.copytree(os.path.join(REPO_ROOT, "configs"), os.path.join(workdir, "configs"))
+    shutil.copytree(os.path.join(REPO_ROOT, "static"), os.path.join(workdir, "static"))
+    os.makedirs(os.path.join(workdir, "data"))
+    with open(os.path.join(workdir, "data", "knowledge.json"), "w", encoding="utf-8") as f:
+        json.dump(kb, f, ensure_ascii=False)
+
+
+# -------------------- MĂSURARE --------------------
+
+def _percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def measure(fn, inputs, repeat: int = 1):
+    """Rulează `fn` pe fiecare input și întoarce statisticile de latență (ms)."""
+    samples = []
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            for item in inputs:
+                t0 = time.perf_counter_ns()
+                fn(item)
+                samples.append((time.perf_counter_ns() - t0) / 1e6)
+    total = time.perf_counter() - start
+    samples.sort()
+    return {
+        "n": len(samples),
+        "p50_ms": round(_percentile(samples, 50), 4),
+        "p99_ms": round(_percentile(samples, 99), 4),
+        "mean_ms": round(sum(samples) / len(samples), 4) if samples else 0.0,
+        "throughput_per_s": round(len(samples) / total, 1) if total > 0 else 0.0,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(args) -> dict:
+    rng = random.Random(args.seed)
+    memories = generate_memories(args.memories, rng)
+    kb = generate_kb(args.kb, rng)
+    queries = generate_queries(args.queries, rng)
+    stages = set(args.stages.split(",")) if args.stages else None
+
+    def wanted(name: str) -> bool:
+        return stages is None or name in stages
+
+    workdir = tempfile.mkdtemp(prefix="bodai-bench-")
+    prepare_workdir(workdir, kb)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+    results = {}
+    try:
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            from app import db, nlp_utils, main, normalize
+            from fastapi.testclient import TestClient
+        results["startup_s"] = round(time.perf_counter() - t0, 3)
+        # schema, contextul și KB sunt pregătite în afara importului (lifespan în server)
+        t0 = time.perf_counter()
+        main.warm_up()
+        results["warm_up_s"] = round(time.perf_counter() - t0, 3)
+
+        now = int(time.time())
+        with db.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO memory (text, timestamp, user_id) VALUES (?, ?, ?)",
+                ((m, now, BENCH_USER) for m in memories),
+            )
+
+        t0 = time.perf_counter()
+        mem_index = db.get_memory_index(BENCH_USER)
+        results["memory_index_load_s"] = round(time.perf_counter() - t0, 3)
+
+        norms = [nlp_utils.remove_diacritics(q.lower()) for q in queries]
+        tokens = [nlp_utils.tokenize(q) for q in queries]
+        normalized = [(q, normalize.normalize(q)) for q in queries]
+        stats = {}
+
+        # ---- nlp_utils izolat ----
+        if wanted("tokenize"):
+            stats["tokenize"] = measure(nlp_utils.tokenize, queries)
+        if wanted("build_tfidf"):
+            docs = [nlp_utils.tokenize(m) for m in memories[: args.tfidf_docs]]
+            stats["build_tfidf"] = measure(nlp_utils.build_tfidf, [docs], repeat=3)
+        if wanted("cosine_sim"):
+            docs = [nlp_utils.tokenize(m) for m in memories[:1000]]
+            vocab, df, N = nlp_utils.build_tfidf(docs)
+            vecs = [nlp_utils.tfidf_vector(d, vocab, df, N) for d in docs]
+            pairs = [(rng.choice(vecs), rng.choice(vecs)) for _ in range(len(queries))]
+            stats["cosine_sim"] = measure(lambda p: nlp_utils.cosine_sim(*p), pairs)
+
+        # ---- etapele din chat() ----
+        if wanted("triggers"):
+            stats["triggers"] = measure(
+                lambda i: (main.chat_router.scan(norms[i]), main.reply_router.scan(queries[i].lower())),
+                range(len(queries)),
+            )
+        if wanted("route"):
+            # pașii 0) – 2) din compute_reply: o trecere a routerului + regulile declanșate
+            def route(item):
+                user_text, norm = item
+                for hit in main.chat_router.scan(norm.folded):
+                    if main.route_reply(hit.rule, user_text, BENCH_USER) is not None:
+                        break
+
+            stats["route"] = measure(route, normalized)
+        if wanted("memory_tfidf"):
+            stats["memory_tfidf"] = measure(lambda t: main.search_memory_tfidf(mem_index, t), tokens)
+        if wanted("memory_fuzzy"):
+            fuzzy_queries = queries[: args.fuzzy_queries]
+            stats["memory_fuzzy"] = measure(lambda q: main.search_memory_fuzzy(mem_index, q, False), fuzzy_queries)
+        if wanted("kb"):
+            stats["kb"] = measure(main.search_kb, tokens)
+
+        # ---- end-to-end prin FastAPI ----
+        if wanted("chat") or wanted("chat_batch"):
+            with TestClient(main.app) as client:
+                if wanted("chat"):
+                    main.replies.clear()
+                    stats["chat"] = measure(
+                        lambda q: client.post("/chat", json={"message": q, "user_id": BENCH_USER}),
+                        queries[: args.e2e_queries],
+                    )
+                if wanted("chat_batch"):
+                    batch = queries[: args.e2e_queries]
+                    main.replies.clear()  # altfel lotul ar fi servit din cache-ul umplut de etapa "chat"
+                    t0 = time.perf_counter()
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        client.post("/chat/batch", json={"messages": batch, "user_id": BENCH_USER})
+                    elapsed = time.perf_counter() - t0
+                    stats["chat_batch"] = {
+                        "n": len(batch),
+                        "total_s": round(elapsed, 4),
+                        "throughput_per_s": round(len(batch) / elapsed, 1) if elapsed > 0 else 0.0,
+                    }
+        results["stages"] = stats
+    finally:
+        os.chdir(cwd)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": int(time.time()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "memories": args.memories,
+            "kb": args.kb,
+            "queries": args.queries,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline_path: str) -> None:
+    """Afișează raportul p50/p99 față de un rezultat anterior (>1 = mai lent)."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = baseline["results"].get("stages", {})
+    print(f"{'etapă':<16}{'p50 vechi':>12}{'p50 nou':>12}{'raport':>10}{'p99 raport':>12}")
+    for name, cur in current["results"]["stages"].items():
+        prev = old.get(name)
+        if not prev or "p50_ms" not in cur or not prev.get("p50_ms"):
+            continue
+        p50_ratio = cur["p50_ms"] / prev["p50_ms"]
+        p99_ratio = cur["p99_ms"] / prev["p99_ms"] if prev.get("p99_ms") else float("nan")
+        print(f"{name:<16}{prev['p50_ms']:>12.4f}{cur['p50_ms']:>12.4f}{p50_ratio:>10.2f}{p99_ratio:>12.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark pentru pipeline-ul /chat BODAI.")
+    parser.add_argument("--memories", type=int, default=10000, help="numărul de amintiri sintetice")
+    parser.add_argument("--kb", type=int, default=1000, help="numărul de intrări în knowledge base")
+    parser.add_argument("--queries", type=int, default=500, help="numărul de interogări per etapă")
+    parser.add_argument("--fuzzy-queries", type=int, default=100, help="interogări pentru etapa fuzzy (lentă)")
+    parser.add_argument("--e2e-queries", type=int, default=200, help="interogări pentru /chat și /chat/batch")
+    parser.add_argument("--tfidf-docs", type=int, default=10000, help="documente pentru build_tfidf izolat")
+    parser.add_argument("--stages", default="", help="etape separate prin virgulă (implicit toate)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="fișierul JSON cu rezultate (implicit stdout)")
+    parser.add_argument("--compare", help="rezultat JSON anterior cu care se compară")
+    parser.add_argument("--keep", action="store_true", help="păstrează directorul temporar")
+    args = parser.parse_args()
+
+    result = run(args)
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import os
+import sqlite3
+import threading
+import time
+
+from app import backup, db, main
+
+
+def fill(user_id, count):
+    """Destule pagini încât copia incrementală să aibă mulți pași."""
+    main.warm_up()
+    with db.transaction() as conn:
+        conn.executemany("INSERT INTO memory (text, timestamp, user_id) VALUES (?, ?, ?)",
+                         [(f"amintire de umplutura numarul {i} " + "x" * 200, i, user_id) for i in range(count)])
+
+
+def check(path):
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("PRAGMA integrity_check").fetchall() == [("ok",)]
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+        return conn.execute("SELECT COUNT(*) FROM memory WHERE user_id='backup-fill'").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_backup_copy_is_verified(tmp_path, monkeypatch):
+    fill("backup-fill", 300)
+    monkeypatch.setattr(backup, "PAGES_PER_STEP", 4)
+    monkeypatch.setattr(backup, "STEP_PAUSE", 0)
+    before = backup.BACKUPS.value("backup")
+    path = backup.backup(str(tmp_path))
+    assert backup.BACKUPS.value("backup") == before + 1
+    assert os.path.dirname(path) == str(tmp_path)
+    assert not os.path.exists(path + ".tmp")
+    assert check(path) >= 300
+
+
+def test_concurrent_writer_falls_back_to_vacuum_into(tmp_path, monkeypatch):
+    """Un scriitor care confirmă continuu repornește copia; după MAX_RESTARTS se trece la VACUUM INTO."""
+    fill("backup-fill", 300)
+    monkeypatch.setattr(backup, "PAGES_PER_STEP", 1)
+    monkeypatch.setattr(backup, "STEP_PAUSE", 0.01)
+    monkeypatch.setattr(backup, "MAX_RESTARTS", 1)
+    stop = threading.Event()
+    written = []
+
+    def writer():
+        conn = sqlite3.connect(db.DB_PATH, timeout=5, isolation_level=None)
+        deadline = time.monotonic() + 10  # fără fallback, copia s-ar termina abia după scriitor
+        try:
+            while not stop.is_set() and time.monotonic() < deadline:
+                conn.execute("INSERT INTO memory (text, timestamp, user_id) VALUES (?, ?, ?)",
+                             ("scriere concurenta", int(time.time()), "backup-writer"))
+                written.append(1)
+                time.sleep(0.002)
+        finally:
+            conn.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    before = backup.BACKUPS.value("vacuum_into")
+    try:
+        path = backup.backup(str(tmp_path))
+    finally:
+        stop.set()
+        thread.join(10)
+    assert written
+    assert backup.BACKUPS.value("vacuum_into") == before + 1
+    assert check(path) >= 300
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+
+
+def test_prune_removes_only_expired_backups(tmp_path):
+    old = tmp_path / f"{backup.PREFIX}2000-01-01_000000.sqlite3"
+    recent = tmp_path / f"{backup.PREFIX}2000-01-02_000000.sqlite3"
+    other = tmp_path / "altceva.sqlite3"
+    for path in (old, recent, other):
+        path.write_bytes(b"")
+    expired = time.time() - 3 * 86400
+    os.utime(old, (expired, expired))
+    os.utime(other, (expired, expired))
+    assert backup.prune(str(tmp_path), retain_days=2) == 1
+    assert sorted(os.listdir(tmp_path)) == ["altceva.sqlite3", recent.name]
+
+
+def test_run_prunes_with_configured_retention(tmp_path, monkeypatch):
+    fill("backup-fill", 10)
+    monkeypatch.setattr(backup, "BACKUP_DIR", backup.BACKUP_DIR)
+    monkeypatch.setattr(backup, "RETAIN_DAYS", backup.RETAIN_DAYS)
+    backup.configure({"backup_dir": str(tmp_path) + "/", "backup_retain_days": 1})
+    stale = tmp_path / f"{backup.PREFIX}2000-01-01_000000.sqlite3"
+    stale.write_bytes(b"")
+    expired = time.time() - 2 * 86400
+    os.utime(stale, (expired, expired))
+    path = backup.run()
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+    assert check(path) >= 10
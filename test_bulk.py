@@ -0,0 +1,131 @@
+import asyncio
+import json
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app import bulk, db, main
+
+
+def ndjson(records):
+    return "".join(json.dumps(r) + "\n" for r in records).encode()
+
+
+def test_import_and_export_roundtrip():
+    main.warm_up()
+    body = ndjson([{"type": "memory", "text": f"amintire {i}"} for i in range(5)]
+                  + [{"type": "profile", "category": "loc", "info": "Iasi"}])
+    client = TestClient(main.app)
+    r = client.post("/import?user_id=bulk-rt", content=body)
+    assert r.status_code == 200
+    assert r.json()["imported"] == {"memory": 5, "profile": 1, "context": 0}
+
+    lines = client.get("/export?user_id=bulk-rt&types=memory,profile").text.splitlines()
+    assert [json.loads(line)["type"] for line in lines] == ["memory"] * 5 + ["profile"]
+
+
+def test_import_invalid_line_rolls_back():
+    main.warm_up()
+    body = ndjson([{"type": "memory", "text": "ok"}]) + b"{nu e json\n"
+    r = TestClient(main.app).post("/import?user_id=bulk-bad", content=body)
+    assert r.status_code == 400
+    assert db.list_memories("bulk-bad") == []
+
+
+def test_import_client_disconnect_releases_write_lock():
+    """Un client care se deconectează în timpul upload-ului nu lasă tranzacția deschisă."""
+    main.warm_up()
+    first = ndjson([{"type": "memory", "text": "partial"}])
+    messages = [
+        {"type": "http.request", "body": first, "more_body": True},
+        {"type": "http.disconnect"},
+    ]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        pass
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/import", "raw_path": b"/import", "root_path": "",
+        "query_string": b"user_id=bulk-disconnect", "headers": [(b"content-type", b"application/x-ndjson")],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+
+    async def call():
+        try:
+            await main.app(scope, receive, send)
+        except Exception:
+            pass  # ClientDisconnect ajunge până la server
+
+    asyncio.run(call())
+
+    # scrierea din alt fir trebuie să obțină lock-ul imediat, nu după busy_timeout
+    result = {}
+
+    def write():
+        try:
+            result["id"] = db.add_memory("dupa deconectare", "bulk-disconnect")
+        except Exception as e:
+            result["error"] = e
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    writer.join(timeout=db.PRAGMAS["busy_timeout"] / 1000 + 5)
+    assert "error" not in result and "id" in result
+    # amintirea trimisă înainte de deconectare nu a fost importată
+    assert [r[1] for r in db.list_memories("bulk-disconnect")] == ["dupa deconectare"]
+
+
+def test_stalled_upload_does_not_hold_the_write_lock():
+    """Cât timp clientul încă trimite date, ceilalți scriitori nu așteaptă după import."""
+    main.warm_up()
+    resume = asyncio.Event()
+    chunks = [ndjson([{"type": "memory", "text": "prima"}]), ndjson([{"type": "memory", "text": "a doua"}])]
+    sent = []
+
+    async def receive():
+        if len(chunks) == 1:
+            await resume.wait()
+        if chunks:
+            return {"type": "http.request", "body": chunks.pop(0), "more_body": bool(chunks)}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/import", "raw_path": b"/import", "root_path": "",
+        "query_string": b"user_id=bulk-stall", "headers": [(b"content-type", b"application/x-ndjson")],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+
+    async def scenario():
+        request = asyncio.ensure_future(main.app(scope, receive, send))
+        await asyncio.sleep(0.2)  # prima bucată e citită, clientul „se blochează”
+        started = time.monotonic()
+        await asyncio.get_running_loop().run_in_executor(None, db.add_memory, "in timpul importului", "bulk-stall")
+        waited = time.monotonic() - started
+        resume.set()
+        await request
+        return waited
+
+    waited = asyncio.run(scenario())
+    assert waited < 1
+    assert sent[0]["status"] == 200
+    assert sorted(r[1] for r in db.list_memories("bulk-stall")) == ["a doua", "in timpul importului", "prima"]
+
+
+def test_import_commits_in_chunks(monkeypatch):
+    main.warm_up()
+    monkeypatch.setattr(bulk, "COMMIT_EVERY", 2)
+    body = ndjson([{"type": "memory", "text": f"m{i}"} for i in range(5)])
+    r = TestClient(main.app).post("/import?user_id=bulk-chunks", content=body)
+    assert r.json()["imported"]["memory"] == 5
+    assert [r[1] for r in db.list_memories("bulk-chunks")] == [f"m{i}" for i in range(5)]
@@ -0,0 +1,88 @@
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app import db, main
+
+
+def test_batch_replies_in_order():
+    with TestClient(main.app) as client:
+        r = client.post("/chat/batch", json={"messages": ["tine minte ca ador marea", " ", "tine minte ca am o pisica"],
+                                              "user_id": "batch-order"})
+    replies = r.json()["replies"]
+    assert replies[0] == {"reply": "Am notat: ador marea"}
+    assert replies[1] == {"error": "Mesajul este gol."}
+    assert replies[2] == {"reply": "Am notat: am o pisica"}
+
+
+def test_batch_commits_in_chunks(monkeypatch):
+    """Scrierile primelor mesaje sunt vizibile altor conexiuni înainte de sfârșitul lotului."""
+    main.warm_up()
+    monkeypatch.setattr(main, "BATCH_COMMIT_EVERY", 2)
+    reached, proceed = threading.Event(), threading.Event()
+    original = main.process_message
+
+    def process_message(user_text, uid, sid):
+        if user_text == "opreste":
+            reached.set()
+            proceed.wait(10)
+        return original(user_text, uid, sid)
+
+    monkeypatch.setattr(main, "process_message", process_message)
+    messages = ["tine minte ca unu", "tine minte ca doi", "opreste", "tine minte ca trei"]
+    worker = threading.Thread(target=main.process_batch, args=(messages, "batch-chunks", "batch-chunks"))
+    worker.start()
+    try:
+        assert reached.wait(10)
+        other = sqlite3.connect(db.DB_PATH, timeout=0.5)
+        count = other.execute("SELECT COUNT(*) FROM memory WHERE user_id='batch-chunks'").fetchone()[0]
+        other.close()
+        assert count == 2
+    finally:
+        proceed.set()
+        worker.join(10)
+    assert [r[1] for r in db.list_memories("batch-chunks")] == ["unu", "doi", "trei"]
+
+
+def test_timed_out_request_keeps_its_slot(monkeypatch):
+    """După 504, locul de concurență e eliberat abia când firul termină efectiv."""
+    finished = threading.Event()
+
+    def slow():
+        finished.wait(10)
+        return "gata"
+
+    async def scenario():
+        monkeypatch.setattr(main, "chat_slots", asyncio.Semaphore(1))
+        monkeypatch.setattr(main, "chat_executor", ThreadPoolExecutor(max_workers=1))
+        with pytest.raises(HTTPException) as error:
+            await main.run_chat(slow, timeout=0.05)
+        assert error.value.status_code == 504
+        assert main.chat_slots.locked()
+        finished.set()
+        await asyncio.wait_for(main.chat_slots.acquire(), 5)
+        main.chat_slots.release()
+
+    asyncio.run(scenario())
+
+
+def test_timed_out_batch_skips_remaining_chunks(monkeypatch):
+    main.warm_up()
+    monkeypatch.setattr(main, "BATCH_COMMIT_EVERY", 1)
+    cancel = threading.Event()
+    original = main.process_message
+
+    def process_message(user_text, uid, sid):
+        reply = original(user_text, uid, sid)
+        cancel.set()  # timeout-ul expiră în timpul primului mesaj
+        return reply
+
+    monkeypatch.setattr(main, "process_message", process_message)
+    results = main.process_batch(["tine minte ca unu", "tine minte ca doi"], "batch-cancel", "batch-cancel", cancel)
+    assert len(results) == 1
+    assert [r[1] for r in db.list_memories("batch-cancel")] == ["unu"]
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from app import context
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    monkeypatch.setattr(context, "BACKEND", "file")
+    monkeypatch.setattr(context, "CONTEXT_FILE", str(tmp_path / "context.jsonl"))
+    monkeypatch.setattr(context, "CONTEXT_DIR", str(tmp_path / "context"))
+    monkeypatch.setattr(context, "LEGACY_CONTEXT_FILE", str(tmp_path / "context.json"))
+    context.flush_context()
+    context._sessions.clear()
+    yield tmp_path
+    context.flush_context()
+    context._sessions.clear()
+
+
+def reload(session_id=context.DEFAULT_SESSION):
+    """Golește RAM-ul, ca la o repornire: sesiunea e recitită de pe disc."""
+    context.flush_context()
+    context._sessions.clear()
+    return context.get_context(session_id)
+
+
+def test_legacy_context_migrated_once(files):
+    legacy = [{"role": "user", "text": "salut"}, {"role": "bot", "text": "Salut!"}]
+    (files / "context.json").write_text(json.dumps(legacy), encoding="utf-8")
+
+    assert context.get_context() == legacy
+    assert not (files / "context.json").exists()
+    assert (files / "context.json.migrated").exists()
+
+    context.clear_context()
+    assert reload() == []
+
+
+def test_clear_removes_legacy_left_by_an_earlier_migration(files):
+    (files / "context.json").write_text(json.dumps([{"role": "user", "text": "vechi"}]), encoding="utf-8")
+    (files / "context.jsonl").write_text(json.dumps({"role": "user", "text": "nou"}) + "\n", encoding="utf-8")
+
+    assert reload() == [{"role": "user", "text": "nou"}]
+    context.clear_context()
+    assert reload() == []
+
+
+def test_writer_flush_persists_sessions(files):
+    context.add_message("user", "unu", "s1")
+    context.add_message("bot", "doi", "s1")
+    context.add_message("user", "alta", "s2")
+    assert reload("s1") == [{"role": "user", "text": "unu"}, {"role": "bot", "text": "doi"}]
+    assert reload("s2") == [{"role": "user", "text": "alta"}]
+
+
+def test_writer_keeps_last_messages_after_clear(files, monkeypatch):
+    monkeypatch.setattr(context, "MAX_CONTEXT", 3)
+    for i in range(5):
+        context.add_message("user", f"m{i}", "s3")
+    assert [e["text"] for e in reload("s3")] == ["m2", "m3", "m4"]
+    context.add_message("user", "inainte", "s3")
+    context.clear_context("s3")
+    context.add_message("user", "dupa", "s3")
+    assert reload("s3") == [{"role": "user", "text": "dupa"}]
@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+from app import db, main
+
+
+@pytest.fixture(autouse=True)
+def ready():
+    main.warm_up()
+
+
+def count(user_id):
+    return db.connection().execute("SELECT COUNT(*) FROM memory WHERE user_id=?", (user_id,)).fetchone()[0]
+
+
+def test_nested_transactions_commit_once():
+    with db.transaction() as outer:
+        db.add_memory("unu", "db-nested")
+        with db.transaction() as inner:
+            assert inner is outer
+            db.add_memory("doi", "db-nested")
+        # tranzacția interioară nu a făcut COMMIT: alt fir nu vede încă nimic
+        seen = []
+        reader = threading.Thread(target=lambda: seen.append(count("db-nested")))
+        reader.start()
+        reader.join()
+        assert seen == [0]
+    assert count("db-nested") == 2
+
+
+def test_error_in_nested_transaction_rolls_back_everything():
+    epoch = db.data_version("db-rollback")[0]
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.add_memory("unu", "db-rollback")
+            with db.transaction():
+                db.add_memory("doi", "db-rollback")
+                raise RuntimeError("eșec")
+    assert count("db-rollback") == 0
+    # indexurile din RAM pot conține scrierile anulate: epoca nouă invalidează cache-urile
+    assert db.data_version("db-rollback")[0] == epoch + 1
+    assert len(db.get_memory_index("db-rollback")) == 0
+
+
+def test_versions_grow_again_after_commit():
+    with db.transaction():
+        db.add_memory("unu", "db-versions")
+        assert db.has_pending_changes()
+        during = db.data_version("db-versions")
+    # un răspuns calculat înainte de COMMIT rămâne sub o cheie care nu mai e folosită
+    assert not db.has_pending_changes()
+    assert db.data_version("db-versions")[1] > during[1]
+
+
+def test_connections_are_per_thread():
+    own = db.connection()
+    assert db.connection() is own
+    other = []
+    worker = threading.Thread(target=lambda: other.append(db.connection()))
+    worker.start()
+    worker.join()
+    assert other[0] is not own
+
+
+def test_close_connections_forces_reconnect():
+    old = db.connection()
+    db.close_connections()
+    new = db.connection()
+    assert new is not old
+    assert new.execute("SELECT 1").fetchone() == (1,)
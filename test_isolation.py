@@ -0,0 +1,75 @@
+from fastapi.testclient import TestClient
+
+from app import context, db, main
+
+
+def chat(client, message, user_id, session_id=None):
+    r = client.post("/chat", json={"message": message, "user_id": user_id, "session_id": session_id})
+    assert r.status_code == 200
+    return r.json()["reply"]
+
+
+def test_users_do_not_see_each_other():
+    with TestClient(main.app) as client:
+        assert chat(client, "tine minte ca ador marea albastra", "iso-a") == "Am notat: ador marea albastra"
+        assert chat(client, "imi place sahul", "iso-a").startswith("Am notat în profilul tău")
+        chat(client, "salut", "iso-b")
+
+        assert client.get("/memories", params={"user_id": "iso-b"}).json()["memories"] == []
+        assert client.get("/profile", params={"user_id": "iso-b"}).json()["profile"] == []
+        assert [m["text"] for m in client.get("/memories", params={"user_id": "iso-a"}).json()["memories"]] \
+            == ["ador marea albastra"]
+
+        # retrieval-ul și profilul lui B nu folosesc datele lui A (nici din cache-ul de răspunsuri)
+        assert "ador" not in chat(client, "marea albastra", "iso-b")
+        assert chat(client, "ce stii despre mine", "iso-b").startswith("Încă nu știu")
+        assert "sahul" in chat(client, "ce stii despre mine", "iso-a")
+
+        texts = lambda sid: [m["text"] for m in client.get("/context", params={"session_id": sid}).json()["context"]]
+        assert "tine minte ca ador marea albastra" in texts("iso-a")
+        assert "tine minte ca ador marea albastra" not in texts("iso-b")
+        assert "salut" not in texts("iso-a")
+
+        client.delete("/context", params={"session_id": "iso-b"})
+        assert texts("iso-b") == []
+        assert "imi place sahul" in texts("iso-a")
+
+
+def test_sessions_of_one_user_are_separate():
+    with TestClient(main.app) as client:
+        chat(client, "tine minte ca am o bicicleta", "iso-multi", "iso-multi-1")
+        chat(client, "salut", "iso-multi", "iso-multi-2")
+        first = client.get("/context", params={"session_id": "iso-multi-1"}).json()["context"]
+        second = client.get("/context", params={"session_id": "iso-multi-2"}).json()["context"]
+    assert [m["text"] for m in first] == ["tine minte ca am o bicicleta", "Am notat: am o bicicleta"]
+    assert second[0]["text"] == "salut"
+    # amintirile țin de utilizator, nu de sesiune
+    assert [r[1] for r in db.list_memories("iso-multi")] == ["am o bicicleta"]
+
+
+def test_evicted_session_is_reloaded_from_disk(monkeypatch):
+    monkeypatch.setattr(context, "MAX_SESSIONS", 2)
+    context.flush_context()
+    context._sessions.clear()
+    for sid in ("iso-ev-1", "iso-ev-2", "iso-ev-3"):
+        context.add_message("user", f"mesaj din {sid}", sid)
+        context.add_message("bot", f"raspuns pentru {sid}", sid)
+    assert "iso-ev-1" not in context._sessions
+    assert context.active_sessions() == 2
+    # fără flush explicit: reîncărcarea așteaptă scrierile încă în coadă
+    assert [m["text"] for m in context.get_context("iso-ev-1")] == ["mesaj din iso-ev-1", "raspuns pentru iso-ev-1"]
+    assert "iso-ev-2" not in context._sessions
+    assert [m["text"] for m in context.get_context("iso-ev-2")] == ["mesaj din iso-ev-2", "raspuns pentru iso-ev-2"]
+
+
+def test_evicted_memory_index_is_reloaded(monkeypatch):
+    main.warm_up()
+    monkeypatch.setattr(db.memory_indexes, "max_users", 1)
+    db.add_memory("ador muntele", "iso-idx-a")
+    db.add_memory("am un caine", "iso-idx-b")
+    first = db.get_memory_index("iso-idx-a")
+    assert db.get_memory_index("iso-idx-b").rows()[0][1] == "am un caine"
+    assert db.memory_indexes.peek("iso-idx-a") is None
+    reloaded = db.get_memory_index("iso-idx-a")
+    assert reloaded is not first
+    assert [t for _, t in reloaded.rows()] == ["ador muntele"]
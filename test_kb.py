@@ -0,0 +1,55 @@
+import pytest
+
+from app import kb, tfidf_sparse
+
+
+@pytest.fixture(autouse=True)
+def restore(monkeypatch):
+    monkeypatch.setattr(kb, "BACKEND", kb.BACKEND)
+
+
+def test_single_worker_keeps_configured_backend():
+    kb.configure({}, "python", workers=1)
+    assert kb.BACKEND == "python"
+
+
+def test_multiple_workers_force_sparse_backend():
+    if not tfidf_sparse.AVAILABLE:
+        pytest.skip("numpy/scipy lipsesc")
+    kb.configure({}, "python", workers=4)
+    assert kb.BACKEND == "sparse"
+
+
+def test_multiple_workers_without_sparse_refuse_to_start(monkeypatch):
+    monkeypatch.setattr(tfidf_sparse, "AVAILABLE", False)
+    with pytest.raises(RuntimeError):
+        kb.configure({}, "python", workers=2)
+
+
+ITEMS = [{"q": "ce este bodai", "a": "Un asistent."}, {"q": "cum te numesti", "a": "BODAI."},
+         {"q": "ce stii sa faci", "a": "Țin minte."}, {"q": "ce este marea neagra", "a": "O mare."}]
+QUERIES = ["ce este", "bodai", "cum te numesti tu", "marea", "nimic comun", "ce ce este bodai"]
+
+
+def test_python_cache_is_mapped_and_scores_identically(tmp_path):
+    from app import normalize
+
+    built = kb.build(ITEMS, "v1", "python")
+    path = str(tmp_path / "kb.cache")
+    kb.save_cache(built, path)
+    loaded = kb.load_cache(path, "v1")
+    assert isinstance(loaded.index, kb.MappedIndex) and loaded.backend == "python" and loaded.from_cache
+    assert loaded.questions == built.questions and loaded.answers == built.answers
+    for query in QUERIES:
+        tokens = list(normalize.tokens(query))
+        assert loaded.index.search(tokens, k=4) == built.index.search(tokens, k=4), query
+
+
+def test_cache_of_another_version_is_ignored(tmp_path):
+    path = str(tmp_path / "kb.cache")
+    kb.save_cache(kb.build(ITEMS, "v1", "python"), path)
+    assert kb.load_cache(path, "v2") is None
+    with open(path, "r+b") as f:
+        f.seek(20)
+        f.write(b"\xff" * 8)  # antet JSON corupt
+    assert kb.load_cache(path, "v1") is None
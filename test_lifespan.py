@@ -0,0 +1,35 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from app import kb, main, retention
+
+
+def wait_ready(client, timeout=10):
+    deadline = time.monotonic() + timeout
+    while client.get("/health/ready").status_code != 200:
+        assert time.monotonic() < deadline, "serviciul nu a devenit pregătit"
+        time.sleep(0.01)
+
+
+def test_second_lifespan_cycle_serves_chat():
+    for cycle in range(2):
+        with TestClient(main.app) as client:
+            wait_ready(client)
+            r = client.post("/chat", json={"message": "salut", "user_id": f"lifespan-{cycle}"})
+            assert r.status_code == 200, r.text
+            # joburile de fundal sunt (re)pornite la fiecare ciclu
+            assert kb._watcher is not None and kb._watcher.is_alive()
+            assert retention._thread is not None and retention._thread.is_alive()
+        assert not main.ready.is_set()
+        assert kb._watcher is None and retention._thread is None
+
+
+def test_worker_config_from_launcher_skips_yaml(monkeypatch):
+    """Cu BODAI_CONFIG (setat de app/serve.py) configurația nu mai e citită din YAML."""
+    monkeypatch.setenv("BODAI_CONFIG", '{"app_name": "BODAI", "version": "x", "chat": {"max_concurrency": 2}}')
+    monkeypatch.setattr(main, "CONFIG_FILE", "lipseste.yaml")
+    assert main.load_config()["chat"] == {"max_concurrency": 2}
+    monkeypatch.delenv("BODAI_CONFIG")
+    monkeypatch.setattr(main, "CONFIG_FILE", "configs/app.yaml")
+    assert main.load_config() == main.config
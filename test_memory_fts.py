@@ -0,0 +1,60 @@
+import pytest
+
+from app import db, main, memory_fts
+
+
+@pytest.fixture
+def fts(monkeypatch):
+    main.warm_up()
+    monkeypatch.setattr(db, "FTS_ENABLED", True)
+    db.init_db()
+    monkeypatch.setattr(memory_fts, "_df_cache", memory_fts._df_cache.__class__())
+
+
+def texts(rows):
+    return [text for _, text in rows]
+
+
+def test_candidates_are_filtered_by_user_inside_match(fts):
+    db.add_memory("am o pisica neagra", "fts-ana")
+    db.add_memory("am o pisica alba", "fts-ana-maria")
+    # "fts-ana-maria" conține tokenii lui "fts-ana": tokenul de utilizator trebuie să fie exact
+    assert texts(memory_fts.candidates("fts-ana", ["pisica"])) == ["am o pisica neagra"]
+    assert texts(memory_fts.candidates("fts-ana-maria", ["pisica"])) == ["am o pisica alba"]
+    assert memory_fts.candidates("fts-altcineva", ["pisica"]) == []
+
+
+def test_fts_follows_updates_and_deletes(fts):
+    mem_id = db.add_memory("lucrez la fabrica", "fts-sync")
+    db.delete_memories([mem_id], "fts-sync")
+    assert memory_fts.candidates("fts-sync", ["fabrica"]) == []
+
+
+def test_old_single_column_index_is_rebuilt(fts):
+    db.add_memory("ador muntele", "fts-migrare")
+    with db.transaction() as conn:
+        db._drop_fts(conn)
+        conn.execute("CREATE VIRTUAL TABLE memory_fts USING fts5(text, content='memory', content_rowid='id')")
+    db.init_db()
+    assert texts(memory_fts.candidates("fts-migrare", ["muntele"])) == ["ador muntele"]
+
+
+def test_typo_falls_back_to_recent_memories(fts):
+    db.add_memory("sora mea se numeste ioana", "fts-typo")
+    found = memory_fts.retrieve("fts-typo", ["ionaa"])
+    assert not found.exact and found.search(["ionaa"]) == []
+    best_id, score = found.fuzzy_search("sora mea se numeste ionaa")
+    assert found.get(best_id) == "sora mea se numeste ioana" and score > 50
+
+
+def test_forget_does_not_load_the_ram_index(fts, monkeypatch):
+    monkeypatch.setattr(main, "MEMORY_RETRIEVER", "fts")
+    db.add_memory("imi place ciocolata", "fts-forget")
+    db.add_memory("imi place marea", "fts-forget")
+
+    def no_index(uid):
+        raise AssertionError("indexul din RAM nu trebuie încărcat în modul fts")
+
+    monkeypatch.setattr(db, "get_memory_index", no_index)
+    assert main.process_message("uita ca ciocolata", "fts-forget", "fts-forget") == "Am uitat: imi place ciocolata"
+    assert texts(memory_fts.recent("fts-forget")) == ["imi place marea"]
@@ -0,0 +1,60 @@
+import re
+
+from fastapi.testclient import TestClient
+
+from app import main, metrics
+
+SAMPLE = re.compile(r'^([a-z_]+)(\{[^}]*\})? (\S+)$')
+
+
+def scrape(client):
+    """Eșantioanele din /metrics: {(nume, etichete): valoare}; verifică și formatul liniilor."""
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"] == metrics.CONTENT_TYPE
+    samples = {}
+    for line in r.text.splitlines():
+        if line.startswith("#"):
+            assert line.startswith(("# HELP ", "# TYPE "))
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        samples[(match.group(1), match.group(2) or "")] = float(match.group(3))
+    return r.text, samples
+
+
+def buckets(samples, name, labels):
+    """Valorile `_bucket` ale unei serii, în ordinea limitelor (+Inf la final)."""
+    found = []
+    for (sample, text), value in samples.items():
+        if sample == name + "_bucket" and text.startswith("{" + labels + ","):
+            le = re.search(r'le="([^"]+)"', text).group(1)
+            found.append((float("inf") if le == "+Inf" else float(le), value))
+    return [value for _, value in sorted(found)]
+
+
+def test_chat_is_counted_and_timed():
+    with TestClient(main.app) as client:
+        _, before = scrape(client)
+        r = client.post("/chat", json={"message": "tine minte ca ador metricile", "user_id": "metrics-user"})
+        assert r.json()["reply"] == "Am notat: ador metricile"
+        text, after = scrape(client)
+
+    assert "# TYPE bodai_chat_stage_seconds histogram" in text
+    assert "# TYPE bodai_chat_answers_total counter" in text
+    answers = ("bodai_chat_answers_total", '{stage="learn"}')
+    assert after[answers] == before.get(answers, 0) + 1
+
+    for stage in ("total", "route", "learn"):
+        labels = f'stage="{stage}"'
+        count = ("bodai_chat_stage_seconds_count", "{" + labels + "}")
+        total = ("bodai_chat_stage_seconds_sum", "{" + labels + "}")
+        assert after[count] == before.get(count, 0) + 1
+        assert after[total] > before.get(total, 0)
+        series = buckets(after, "bodai_chat_stage_seconds", labels)
+        assert len(series) == len(metrics.DEFAULT_BUCKETS) + 1
+        assert series == sorted(series)
+        assert series[-1] == after[count]
+
+    add_memory = ("bodai_db_call_seconds_count", '{op="add_memory"}')
+    assert after[add_memory] >= before.get(add_memory, 0) + 1
@@ -0,0 +1,80 @@
+from fastapi.testclient import TestClient
+
+from app import bulk, db, main
+
+
+def fill(user_id, memories, profile=0):
+    main.warm_up()
+    with db.transaction():
+        for i in range(memories):
+            db.add_memory(f"amintirea {i}", user_id)
+        for i in range(profile):
+            db.add_profile_info("hobby" if i % 3 else "job", f"informatia {i}", user_id)
+
+
+def walk(client, path, key, limit, **params):
+    """Urmează `next_after_id` până la capăt; returnează elementele și mărimile paginilor."""
+    items, sizes, after_id = [], [], 0
+    while after_id is not None:
+        page = client.get(path, params={**params, "after_id": after_id, "limit": limit}).json()
+        items.extend(page[key])
+        sizes.append(len(page[key]))
+        after_id = page["next_after_id"]
+        if after_id is not None:
+            assert after_id == page[key][-1]["id"]
+    return items, sizes
+
+
+def test_iter_pages_continues_after_full_pages():
+    fill("page-iter", 23)
+    pages = list(db.iter_pages(lambda after, n: db.list_memories("page-iter", after, n), 0, 5))
+    assert [len(rows) for rows in pages] == [5, 5, 5, 5, 3]
+    assert [r[1] for rows in pages for r in rows] == [f"amintirea {i}" for i in range(23)]
+    # ultima pagină completă: o singură interogare în plus, care nu întoarce nimic
+    assert [len(rows) for rows in db.iter_pages(lambda after, n: db.list_memories("page-iter", after, n), 0, 23)] == [23]
+    start = pages[1][-1][0]
+    assert [r[1] for rows in db.iter_pages(lambda after, n: db.list_memories("page-iter", after, n), start, 5)
+            for r in rows] == [f"amintirea {i}" for i in range(10, 23)]
+
+
+def test_memories_cursor_walks_every_page():
+    fill("page-mem", 12)
+    with TestClient(main.app) as client:
+        items, sizes = walk(client, "/memories", "memories", 5, user_id="page-mem")
+        assert sizes == [5, 5, 2]
+        assert [m["text"] for m in items] == [f"amintirea {i}" for i in range(12)]
+        # ultima pagină exact plină: cursorul duce la o pagină goală, fără cursor
+        items, sizes = walk(client, "/memories", "memories", 6, user_id="page-mem")
+        assert sizes == [6, 6, 0]
+        assert len(items) == 12
+        streamed = client.get("/memories", params={"user_id": "page-mem", "stream": "true", "after_id": items[3]["id"]})
+        assert streamed.json() == {"memories": items[4:], "next_after_id": None}
+        assert client.get("/memories", params={"user_id": "page-mem", "limit": 0}).status_code == 422
+        assert client.get("/memories", params={"user_id": "page-mem", "limit": main.PAGE_LIMIT_MAX + 1}).status_code == 422
+
+
+def test_profile_category_filter_is_paginated():
+    fill("page-prof", 0, profile=14)
+    with TestClient(main.app) as client:
+        items, sizes = walk(client, "/profile", "profile", 4, user_id="page-prof", category="hobby")
+        assert sizes == [4, 4, 1]
+        assert {p["category"] for p in items} == {"hobby"}
+        assert [p["info"] for p in items] == [f"informatia {i}" for i in range(14) if i % 3]
+        everything, _ = walk(client, "/profile", "profile", 4, user_id="page-prof")
+        assert [p["id"] for p in everything] == sorted(p["id"] for p in everything)
+        assert len(everything) == 14
+        streamed = client.get("/profile", params={"user_id": "page-prof", "category": "job", "stream": "true"})
+        assert [p["info"] for p in streamed.json()["profile"]] == [f"informatia {i}" for i in range(0, 14, 3)]
+        assert walk(client, "/profile", "profile", 4, user_id="page-prof", category="lipsa") == ([], [0])
+
+
+def test_export_reads_every_page(monkeypatch):
+    fill("page-export", 11, profile=4)
+    monkeypatch.setattr(bulk, "CHUNK_SIZE", 3)
+    batches = list(bulk.export_records("page-export", ("memory", "profile")))
+    assert [len(b) for b in batches] == [3, 3, 3, 2, 3, 1]
+    assert [r["text"] for b in batches[:4] for r in b] == [f"amintirea {i}" for i in range(11)]
+    assert [r["info"] for b in batches[4:] for r in b] == [f"informatia {i}" for i in range(4)]
+    with TestClient(main.app) as client:
+        lines = client.get("/export", params={"user_id": "page-export"}).text.splitlines()
+    assert len(lines) == 15
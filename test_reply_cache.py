@@ -0,0 +1,55 @@
+import pytest
+
+from app import db, kb, main, reply_cache
+
+
+@pytest.fixture
+def ready():
+    main.warm_up()
+
+
+def test_lru_evicts_oldest_and_ttl_expires():
+    cache = reply_cache.ReplyCache(max_entries=2, ttl=60)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"  # "a" devine cea mai recentă
+    cache.put("c", "3")
+    assert cache.get("b") is None and cache.get("a") == "1" and cache.get("c") == "3"
+
+    expired = reply_cache.ReplyCache(max_entries=2, ttl=0)
+    expired.put("a", "1")
+    assert expired.get("a") is None and len(expired) == 0
+
+
+def key(uid, text):
+    return (uid, text, db.data_version(uid), kb.current().version)
+
+
+def test_profile_write_invalidates_profile_reply(ready):
+    uid = "cache-profile"
+    first = main.process_message("ce stii despre mine", uid, uid)
+    assert main.replies.get(key(uid, "ce stii despre mine")) == first
+
+    db.add_profile_info("loc", "Iasi", uid)
+    assert main.replies.get(key(uid, "ce stii despre mine")) is None
+    second = main.process_message("ce stii despre mine", uid, uid)
+    assert "Iasi" in second and second != first
+
+
+def test_memory_write_changes_the_key(ready):
+    uid = "cache-memory"
+    main.process_message("marea neagra", uid, uid)
+    before = key(uid, "marea neagra")
+    assert main.replies.get(before) is not None
+    db.add_memory("am fost la marea neagra", uid)
+    assert key(uid, "marea neagra") != before
+    assert "marea neagra" in main.process_message("marea neagra", uid, uid)
+
+
+def test_side_effect_stages_are_not_cached(ready):
+    uid = "cache-learn"
+    main.process_message("tine minte ca ador ciocolata", uid, uid)
+    assert main.replies.get(key(uid, "tine minte ca ador ciocolata")) is None
+    # același mesaj, trimis din nou, învață din nou
+    main.process_message("tine minte ca ador ciocolata", uid, uid)
+    assert [r[1] for r in db.list_memories(uid)] == ["ador ciocolata", "ador ciocolata"]
@@ -0,0 +1,33 @@
+import yaml
+
+from app import db, main, retention
+
+
+def test_typo_in_longest_word_is_a_duplicate():
+    rows = [(1, "am fost la munte cu bicicleta"), (2, "am fost la munte cu biciclete"), (3, "am fost la mare")]
+    # se păstrează cea mai nouă (id 2); blocul după cel mai lung cuvânt singur ar fi ratat perechea
+    assert retention.find_duplicates(rows, 95) == [1]
+
+
+def test_exact_duplicates_and_distinct_texts():
+    rows = [(1, "Îmi place cafeaua!"), (2, "imi place cafeaua"), (3, "imi place ceaiul")]
+    assert retention.find_duplicates(rows, 100) == [1]
+
+
+def test_dedup_vacuum_and_size_cap_are_opt_in():
+    with open("configs/app.yaml", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f)["retention"]
+    assert not cfg["dedup_threshold"] and not cfg["vacuum"] and not cfg["max_memories_per_user"]
+    assert retention.DEDUP_THRESHOLD == 0 and retention.VACUUM is False
+    assert retention.MAX_MEMORIES_PER_USER == 0 and db.MAX_INDEXED_MEMORIES is None
+
+
+def test_run_does_not_vacuum_by_default(monkeypatch):
+    main.warm_up()
+    db.add_memory("veche", "retention-vacuum")
+    monkeypatch.setattr(retention, "MAX_AGE_DAYS", 1)
+    calls = []
+    monkeypatch.setattr(retention, "optimize", lambda vacuum=False: calls.append(vacuum))
+    stats = retention.run(now=10 ** 10)
+    assert stats["age"] >= 1 and calls == [False]
+    assert db.list_memories("retention-vacuum") == []
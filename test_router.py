@@ -0,0 +1,56 @@
+import random
+import re
+
+from app import main
+from app.patterns import patterns
+from app.router import IntentRouter
+
+SAMPLES = [
+    "tine minte ca ador marea", "noteaza ca", "imi place fotbalul", "prefer ceaiul", "uita ca ador marea",
+    "salut", "salutare", "hi there", "this", "multumesc frumos", "cine esti tu", "ce faci", "buna ziua",
+    "ce stii despre mine", "spune ceva despre mine", "sunt din iasi si ma numesc ana", "nimic", "",
+]
+
+
+def sequential(text):
+    """Regulile declanșate, ca în verificările secvențiale de dinainte de router (ordinea pașilor)."""
+    fired = []
+    for rule in main.chat_router.rules:
+        if rule.kind == "prefix":
+            ok = text.startswith(rule.pattern)
+        elif rule.kind == "word":
+            ok = re.search(r"\b" + re.escape(rule.pattern) + r"\b", text) is not None
+        else:
+            ok = rule.pattern in text
+        if ok:
+            fired.append(rule.priority)
+    return fired
+
+
+def random_texts(n, seed=7):
+    rng = random.Random(seed)
+    vocab = [r.pattern for r in main.chat_router.rules] + ["x", "ana", "da", "nu", "marea", "hix", "_"]
+    return [rng.choice(["", " "]).join(rng.choice(vocab) + rng.choice(["", " ", ",", "s"])
+                                        for _ in range(rng.randint(1, 4))) for _ in range(n)]
+
+
+def test_router_matches_sequential_checks():
+    for text in SAMPLES + random_texts(2000):
+        assert [h.rule.priority for h in main.chat_router.scan(text)] == sequential(text), text
+
+
+def test_first_pattern_hit_is_the_group_match_pattern_picked():
+    for text in SAMPLES + random_texts(2000, seed=11):
+        expected = next((responses for regex, responses in patterns if regex.search(text)), None)
+        hit = next((h for h in main.chat_router.scan(text) if h.rule.name == "pattern"), None)
+        assert (hit.rule.payload if hit else None) == expected, text
+
+
+def test_router_priority_is_insertion_order():
+    router = IntentRouter()
+    router.add("b", "ab")
+    router.add("a", "b", kind="word")
+    router.add("p", "a", kind="prefix")
+    assert [h.rule.name for h in router.scan("ab b")] == ["b", "a", "p"]
+    assert router.match("xab").rule.name == "b"
+    assert router.scan("") == []
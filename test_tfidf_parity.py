@@ -0,0 +1,82 @@
+import pytest
+
+from app import normalize, nlp_utils, tfidf_sparse
+from app.memory_index import MemoryIndex
+
+CORPUS = [
+    "imi place marea si imi place muntele",
+    "am o pisica neagra",
+    "pisica mea doarme mult",
+    "ador marea albastra",
+    "lucrez ca programator in bucuresti",
+    "muntele e frumos iarna",
+    "am un caine si o pisica",
+    "marea neagra e calda vara",
+]
+QUERIES = ["pisica neagra", "marea", "imi place muntele iarna", "caine", "programator bucuresti marea", "zebra"]
+
+
+def reference(docs, query, k):
+    """Calea veche: `tfidf_vector` + `cosine_sim` pe tot corpusul, la egalitate id-ul mai mic."""
+    vocab, df, N = nlp_utils.build_tfidf(docs)
+    qvec = nlp_utils.tfidf_vector(query, vocab, df, N)
+    scored = [(i, nlp_utils.cosine_sim(qvec, nlp_utils.tfidf_vector(doc, vocab, df, N))) for i, doc in enumerate(docs)]
+    scored = [r for r in scored if r[1] > 0]
+    return sorted(scored, key=lambda r: (-r[1], r[0]))[:k]
+
+
+def assert_same_ranking(got, expected):
+    assert [i for i, _ in got] == [i for i, _ in expected]
+    assert [s for _, s in got] == pytest.approx([s for _, s in expected], rel=1e-9)
+
+
+@pytest.fixture
+def docs():
+    return [normalize.tokens(text, cached=False) for text in CORPUS]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_inverted_index_matches_cosine_path(docs, query):
+    index = nlp_utils.InvertedIndex()
+    for i, doc in enumerate(docs):
+        index.add(i, doc)
+    tokens = normalize.tokens(query, cached=False)
+    for k in (1, 3, len(docs)):
+        assert_same_ranking(index.search(tokens, k), reference(docs, tokens, k))
+
+
+def test_memory_index_matches_after_updates(docs):
+    """După adăugări și ștergeri incrementale, DF-ul și normele rămân cele ale corpusului curent."""
+    index = MemoryIndex()
+    index.load(enumerate(CORPUS[:4]))
+    for i in range(4, len(CORPUS)):
+        index.add(i, CORPUS[i])
+    index.remove(3)
+    index.remove(5)
+    kept = [i for i in range(len(CORPUS)) if i not in (3, 5)]
+    for query in QUERIES:
+        tokens = normalize.tokens(query, cached=False)
+        expected = [(kept[i], s) for i, s in reference([docs[i] for i in kept], tokens, len(kept))]
+        assert_same_ranking(index.search(tokens, len(kept)), expected)
+
+
+@pytest.mark.skipif(not tfidf_sparse.AVAILABLE, reason="numpy/scipy lipsesc")
+@pytest.mark.parametrize("query", QUERIES)
+def test_sparse_backend_matches_cosine_path(docs, query):
+    index = tfidf_sparse.SparseTfidfIndex(docs)
+    tokens = normalize.tokens(query, cached=False)
+    for k in (1, 3, len(docs)):
+        expected = reference(docs, tokens, k)
+        assert_same_ranking(index.search(tokens, k), expected)
+        assert_same_ranking(index.search_batch([tokens], k)[0], expected)
+
+
+@pytest.mark.skipif(not tfidf_sparse.AVAILABLE, reason="numpy/scipy lipsesc")
+def test_sparse_from_inverted_keeps_doc_ids(docs):
+    inverted = nlp_utils.InvertedIndex()
+    for i, doc in enumerate(docs):
+        inverted.add(100 + i, doc)
+    index = tfidf_sparse.SparseTfidfIndex.from_inverted(inverted)
+    for query in QUERIES:
+        tokens = normalize.tokens(query, cached=False)
+        assert_same_ranking(index.search(tokens, 3), inverted.search(tokens, 3))